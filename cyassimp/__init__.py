@@ -1,4 +1,15 @@
-from .cyassimpwrapper import AIImporter
+from .cyassimpwrapper import (AIImporter, AIBVH, TrilistTable, axis_conversion,
+                             compute_normals, load_stacked)
+from .textures import load_textured
+from .shared import load_shared, import_to_shared
+from .result import MeshResult, load_meshes
+from .batch import estimate_import_bytes, iload_budgeted, iload_prefetched
+from .index import index_directory, load_index
+
+import sys
+if sys.version_info >= (3, 7):
+    from .aio import aimport, AsyncImporter
+del sys
 
 from ._version import get_versions
 __version__ = get_versions()['version']
@@ -0,0 +1,101 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from .result import importer_for, extract_results
+
+
+class AsyncImporter(object):
+    r"""
+    Runs imports for asyncio code on a bounded pool of worker threads. Each
+    import releases the GIL while assimp parses, so the event loop keeps
+    running and up to ``max_concurrency`` imports proceed in parallel.
+    Further imports wait their turn.
+
+    Parameters
+    ----------
+    max_concurrency : int, optional
+        The most imports to run at once. Defaults to the number of CPUs.
+    """
+
+    def __init__(self, max_concurrency=None):
+        self.max_concurrency = max_concurrency or os.cpu_count() or 1
+        self._executor = ThreadPoolExecutor(self.max_concurrency)
+
+    async def aimport(self, source, hint='', mesh_filter=None):
+        r"""
+        Import every triangle mesh of a file, or of a file's contents.
+
+        Cancelling the awaiting task drops an import that has not started.
+        For one that is running, assimp is aborted at its next progress
+        update.
+
+        Parameters
+        ----------
+        source : string, path-like or bytes-like
+            A file path, or the contents of a file (see
+            :func:`cyassimp.result.importer_for`).
+        hint : string, optional
+            The file extension, used to pick a loader for contents.
+        mesh_filter : callable, optional
+            Passed to :class:`AIImporter` (and run on a worker thread).
+
+        Returns
+        -------
+        meshes : list of :class:`MeshResult`
+            As for :func:`cyassimp.load_meshes`.
+        """
+        importer = importer_for(source, hint=hint, mesh_filter=mesh_filter)
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._executor,
+                                              extract_results, importer)
+        except asyncio.CancelledError:
+            importer.cancel()
+            raise
+
+    def close(self, wait=True):
+        r"""
+        Shut down the worker threads, by default after running any imports
+        that are already queued.
+        """
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+_default_importer = None
+
+
+async def aimport(source, hint='', mesh_filter=None, importer=None):
+    r"""
+    Import every triangle mesh of a file, or of a file's contents, without
+    blocking the event loop. See :meth:`AsyncImporter.aimport`.
+
+    Parameters
+    ----------
+    source : string, path-like or bytes-like
+        A file path, or the contents of a file.
+    hint : string, optional
+        The file extension, used to pick a loader for contents.
+    mesh_filter : callable, optional
+        Passed to :class:`AIImporter`.
+    importer : :class:`AsyncImporter`, optional
+        The pool to import on. Defaults to a shared one, created on first
+        use, that runs one import per CPU at a time.
+
+    Returns
+    -------
+    meshes : list of :class:`MeshResult`
+        One result per triangle mesh.
+    """
+    global _default_importer
+    if importer is None:
+        if _default_importer is None:
+            _default_importer = AsyncImporter()
+        importer = _default_importer
+    return await importer.aimport(source, hint=hint, mesh_filter=mesh_filter)
@@ -0,0 +1,227 @@
+import os
+import os.path as op
+import struct
+from collections import deque
+from multiprocessing.pool import ThreadPool
+
+from .result import load_meshes
+
+# Rough peak bytes held per vertex and per face while importing: assimp's
+# own scene (positions, tcoords, faces with heap allocated indices), the
+# temporaries of JoinIdenticalVertices and the extracted arrays.
+VERTEX_BYTES = 96
+FACE_BYTES = 64
+# Without a cheap way of counting elements, the estimate is the file size
+# times one of these factors.
+TEXT_FORMATS = frozenset(['obj', 'ply', 'stl', 'off', 'dae', 'x3d', 'wrl',
+                          'gltf', 'ase', 'smd'])
+TEXT_BYTES_PER_BYTE = 4
+BINARY_BYTES_PER_BYTE = 8
+# how much of a PLY file to search for the end of the header
+_PLY_HEADER_BYTES = 65536
+# Formats that refer to other files assimp must open (.mtl, external .bin
+# buffers). These can't be imported from memory, so they are only read
+# ahead in to the OS cache and imported from their path.
+SIDECAR_FORMATS = frozenset(['obj', 'gltf'])
+# chunk size used to read files through when posix_fadvise is unavailable
+_READ_THROUGH_BYTES = 1 << 20
+
+
+def _probe_ply(path):
+    with open(path, 'rb') as f:
+        header = f.read(_PLY_HEADER_BYTES)
+    if not header.startswith(b'ply') or b'end_header' not in header:
+        return None
+    counts = {}
+    for line in header.split(b'end_header')[0].splitlines():
+        words = line.split()
+        if len(words) == 3 and words[0] == b'element':
+            counts[words[1]] = int(words[2])
+    return counts.get(b'vertex', 0), counts.get(b'face', 0)
+
+
+def _probe_stl(path, size):
+    # binary STL: 80 byte header, triangle count, 50 bytes per triangle
+    if size < 84:
+        return None
+    with open(path, 'rb') as f:
+        header = f.read(84)
+    n_faces = struct.unpack('<I', header[80:84])[0]
+    if header.startswith(b'solid') and 84 + 50 * n_faces != size:
+        return None
+    return 3 * n_faces, n_faces
+
+
+def estimate_import_bytes(path):
+    r"""
+    Estimate the peak memory an import of a file will take, without
+    importing it.
+
+    PLY headers and binary STL triangle counts are read to get the number of
+    vertices and faces. For every other format the estimate is a multiple of
+    the file size. The numbers are deliberately rough - they are meant for
+    budgeting many imports at once, not for predicting a single one.
+
+    Parameters
+    ----------
+    path : string
+        File path of the mesh.
+
+    Returns
+    -------
+    n_bytes : int
+        The estimated peak memory use.
+    """
+    size = op.getsize(path)
+    ext = op.splitext(path)[1].lower().lstrip('.')
+    counts = None
+    try:
+        if ext == 'ply':
+            counts = _probe_ply(path)
+        elif ext == 'stl':
+            counts = _probe_stl(path, size)
+    except (IOError, ValueError, struct.error):
+        counts = None
+    if counts is not None:
+        n_vertices, n_faces = counts
+        return n_vertices * VERTEX_BYTES + n_faces * FACE_BYTES
+    factor = (TEXT_BYTES_PER_BYTE if ext in TEXT_FORMATS
+              else BINARY_BYTES_PER_BYTE)
+    return size * factor
+
+
+def iload_budgeted(paths, max_bytes_in_flight, n_threads=None,
+                   mesh_filter=None, estimate=estimate_import_bytes):
+    r"""
+    Import files in parallel while keeping the estimated memory of the
+    imports in flight under a budget.
+
+    Each file is charged its estimated cost from when its import starts
+    until its result has been handed to the caller. A new import only
+    starts once its cost fits in what is left of the budget, so a slow
+    consumer holds back the imports too. A file estimated at more than the
+    whole budget is imported on its own.
+
+    Parameters
+    ----------
+    paths : iterable of string
+        File paths of the meshes.
+    max_bytes_in_flight : int
+        The memory budget, in bytes.
+    n_threads : int, optional
+        The most imports to run at once. Defaults to the number of CPUs.
+    mesh_filter : callable, optional
+        Passed to :class:`AIImporter`.
+    estimate : callable, optional
+        Maps a path to its estimated cost in bytes. Defaults to
+        :func:`estimate_import_bytes`.
+
+    Yields
+    ------
+    path : string
+        The file path, in the order given.
+    meshes : list of :class:`MeshResult`
+        One result per triangle mesh in the file.
+    """
+    if max_bytes_in_flight <= 0:
+        raise ValueError('max_bytes_in_flight must be positive')
+    pool = ThreadPool(n_threads)
+    pending = deque()
+    available = [max_bytes_in_flight]
+
+    def finish():
+        path, cost, result = pending.popleft()
+        meshes = result.get()
+        yield path, meshes
+        # the caller has moved on from this result
+        available[0] += cost
+
+    try:
+        for path in paths:
+            cost = min(estimate(path), max_bytes_in_flight)
+            while pending and cost > available[0]:
+                for item in finish():
+                    yield item
+            available[0] -= cost
+            pending.append((path, cost, pool.apply_async(
+                load_meshes, (path,), {'mesh_filter': mesh_filter})))
+        while pending:
+            for item in finish():
+                yield item
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def _read_ahead(path):
+    ext = op.splitext(path)[1].lower().lstrip('.')
+    if ext not in SIDECAR_FORMATS:
+        with open(path, 'rb') as f:
+            return memoryview(f.read()), ext
+    with open(path, 'rb') as f:
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+        else:
+            while f.read(_READ_THROUGH_BYTES):
+                pass
+    return None, ext
+
+
+def iload_prefetched(paths, prefetch=8, io_threads=4, mesh_filter=None):
+    r"""
+    Import files one after another, reading the upcoming files in the
+    background so that parsing never waits on I/O - useful when open and
+    read latency dominate, e.g. on network filesystems.
+
+    While a file is parsed, up to ``prefetch`` of the following files are
+    read on ``io_threads`` background threads. Self-contained formats are
+    read in to memory and handed to assimp from there. Formats that refer
+    to other files (see ``SIDECAR_FORMATS``) are instead read ahead in to
+    the OS cache and imported from their path.
+
+    Parameters
+    ----------
+    paths : iterable of string
+        File paths of the meshes.
+    prefetch : int, optional
+        How many files to read ahead of the one being parsed.
+    io_threads : int, optional
+        How many files to read at once.
+    mesh_filter : callable, optional
+        Passed to :class:`AIImporter`.
+
+    Yields
+    ------
+    path : string
+        The file path, in the order given.
+    meshes : list of :class:`MeshResult`
+        One result per triangle mesh in the file.
+    """
+    if prefetch < 1:
+        raise ValueError('prefetch must be at least 1')
+    paths = iter(paths)
+    pool = ThreadPool(io_threads)
+    pending = deque()
+    try:
+        for path in paths:
+            pending.append((path, pool.apply_async(_read_ahead, (path,))))
+            if len(pending) >= prefetch:
+                break
+        while pending:
+            # the file parsed next leaves the queue and one more joins it,
+            # so prefetch files are in flight while it is parsed
+            path, read = pending.popleft()
+            for next_path in paths:
+                pending.append((next_path,
+                                pool.apply_async(_read_ahead, (next_path,))))
+                break
+            data, ext = read.get()
+            if data is None:
+                meshes = load_meshes(path, mesh_filter=mesh_filter)
+            else:
+                meshes = load_meshes(data, hint=ext, mesh_filter=mesh_filter)
+            del data
+            yield path, meshes
+    finally:
+        pool.terminate()
+        pool.join()
@@ -1,38 +1,304 @@
 #include <iostream>
 #include <vector>
+#include <algorithm>
+#include <limits>
+#include <stdexcept>
+#include <set>
 #include <assimp/Importer.hpp>
+#include <assimp/BaseImporter.h>
 #include <assimp/scene.h>
 #include <assimp/postprocess.h>
 #include "assimpwrapper.h"
+#include "fastparse.h"
+
+// the post processing applied to every scene we hand back
+const unsigned int POST_PROCESS_FLAGS = aiProcess_RemoveComponent       |
+                                        aiProcess_JoinIdenticalVertices |
+                                        aiProcess_Triangulate           |
+                                        aiProcess_FindDegenerates       |
+                                        aiProcess_SortByPType;
+
+// the components stripped from every scene - we only want raw info
+const unsigned int REMOVED_COMPONENTS = aiComponent_NORMALS                 |
+                                        aiComponent_TANGENTS_AND_BITANGENTS |
+                                        aiComponent_ANIMATIONS              |
+                                        aiComponent_BONEWEIGHTS             |
+                                        aiComponent_LIGHTS                  |
+                                        aiComponent_CAMERAS;
+
+// the texture types we look for on materials, and the names we report -
+// the PBR types (e.g. glTF's base colour maps) only exist from assimp 5.1
+const aiTextureType TEXTURE_TYPES[] = {
+    aiTextureType_DIFFUSE, aiTextureType_SPECULAR, aiTextureType_AMBIENT,
+    aiTextureType_EMISSIVE, aiTextureType_HEIGHT, aiTextureType_NORMALS,
+    aiTextureType_SHININESS, aiTextureType_OPACITY,
+    aiTextureType_DISPLACEMENT, aiTextureType_LIGHTMAP,
+    aiTextureType_REFLECTION,
+#ifdef AI_MATKEY_BASE_COLOR_TEXTURE
+    aiTextureType_BASE_COLOR, aiTextureType_NORMAL_CAMERA,
+    aiTextureType_EMISSION_COLOR, aiTextureType_METALNESS,
+    aiTextureType_DIFFUSE_ROUGHNESS, aiTextureType_AMBIENT_OCCLUSION,
+    aiTextureType_SHEEN, aiTextureType_CLEARCOAT,
+    aiTextureType_TRANSMISSION,
+#endif
+    aiTextureType_UNKNOWN
+};
+const char* TEXTURE_TYPE_NAMES[] = {
+    "diffuse", "specular", "ambient", "emissive", "height", "normals",
+    "shininess", "opacity", "displacement", "lightmap", "reflection",
+#ifdef AI_MATKEY_BASE_COLOR_TEXTURE
+    "base_color", "normal_camera", "emission_color", "metalness",
+    "diffuse_roughness", "ambient_occlusion", "sheen", "clearcoat",
+    "transmission",
+#endif
+    "unknown"
+};
+const unsigned int N_TEXTURE_TYPES = sizeof(TEXTURE_TYPES) /
+                                     sizeof(TEXTURE_TYPES[0]);
+
+// reorders values (one per vertex) so that values[i] = old values[order[i]]
+template <typename T>
+void permute(T* values, const std::vector<unsigned int>& order){
+    if(!values)
+        return;
+    std::vector<T> old(values, values + order.size());
+    for(unsigned int i = 0; i < order.size(); i++)
+        values[i] = old[order[i]];
+}
 
 
 // *************** IMPORTER *************** //
 
+AssimpImporter::AssimpImporter(){
+    // nothing is read until read_file or read_memory is called
+    configure();
+}
+
 AssimpImporter::AssimpImporter(std::string path){
+    configure();
+    read_file(path, true);
+}
+
+AssimpImporter::AssimpImporter(std::string path, bool post_process){
+    configure();
+    read_file(path, post_process);
+}
+
+void AssimpImporter::configure(){
+    p_scene = NULL;
+    p_fast_scene = NULL;
+    cancelled = false;
+    removed_components = REMOVED_COMPONENTS;
+    // the importer takes ownership of the handler
+    importer.SetProgressHandler(new CancelProgressHandler(&cancelled));
     // we only want raw info - don't care about a lot of the stuff that Assimp
     // could give us back. Here we disable all that stuff.
-    importer.SetPropertyInteger(AI_CONFIG_PP_RVC_FLAGS,
-            aiComponent_NORMALS                 |
-            aiComponent_TANGENTS_AND_BITANGENTS |
-            aiComponent_ANIMATIONS              |
-            aiComponent_BONEWEIGHTS             |
-            aiComponent_LIGHTS                  |
-            aiComponent_CAMERAS                 |
-            0);
-    const aiScene* aiscene = importer.ReadFile(path,
-              aiProcess_RemoveComponent       |
-              aiProcess_JoinIdenticalVertices |
-              aiProcess_Triangulate           |
-              aiProcess_FindDegenerates       |
-              aiProcess_SortByPType);
+    importer.SetPropertyInteger(AI_CONFIG_PP_RVC_FLAGS, removed_components);
+}
+
+void AssimpImporter::keep_bone_weights(){
+    // opt in to the bones of meshes - must be called before reading
+    removed_components &= ~aiComponent_BONEWEIGHTS;
+    importer.SetPropertyInteger(AI_CONFIG_PP_RVC_FLAGS, removed_components);
+}
+
+void AssimpImporter::keep_animations(){
+    // opt in to the animations of the scene - must be called before reading
+    removed_components &= ~aiComponent_ANIMATIONS;
+    importer.SetPropertyInteger(AI_CONFIG_PP_RVC_FLAGS, removed_components);
+}
+
+void AssimpImporter::read_file(std::string path, bool post_process){
+    // if post_process is false the raw scene is kept so that meshes can be
+    // discarded (see keep_meshes) before any post processing is paid for.
+    set_scene(importer.ReadFile(path, post_process ? POST_PROCESS_FLAGS : 0));
+}
+
+void AssimpImporter::read_file(std::string path, bool post_process,
+                               std::string format){
+    /* As read_file, but with the loader of format (an extension, e.g.
+     * "ply") rather than the one the path's extension or contents point
+     * to. An empty format reads the file as usual.
+     */
+    if(format.empty()) {
+        read_file(path, post_process);
+        return;
+    }
+    std::string alias = path + "." + format;
+    // the importer takes ownership of the IO system
+    importer.SetIOHandler(new ForcedFormatIOSystem(path, alias));
+    const aiScene* aiscene = importer.ReadFile(
+        alias, post_process ? POST_PROCESS_FLAGS : 0);
+    // back to the default IO system
+    importer.SetIOHandler(NULL);
+    set_scene(aiscene);
+}
+
+void AssimpImporter::read_memory(const unsigned char* buffer, size_t length,
+                                 std::string hint, bool post_process){
+    // hint is the file extension that would identify the format, e.g. "obj"
+    unsigned int flags = post_process ? POST_PROCESS_FLAGS : 0;
+    set_scene(importer.ReadFileFromMemory(buffer, length, flags,
+                                          hint.c_str()));
+}
+
+bool AssimpImporter::read_file_fast(std::string path, std::string format,
+                                    unsigned int n_threads){
+    /* Tries the fast parser for format ("obj" or "ply") on the memory
+     * mapped file, returning false if it doesn't support the file - which
+     * should then be read with read_file. n_threads = 0 uses every core.
+     */
+    MappedFile file(path);
+    return set_fast_scene(fast_parse(file.data(), file.length(), format,
+                                     n_threads));
+}
+
+bool AssimpImporter::read_memory_fast(const unsigned char* buffer,
+                                      size_t length, std::string format,
+                                      unsigned int n_threads){
+    // as read_file_fast, falling back to read_memory
+    return set_fast_scene(fast_parse((const char*) buffer, length, format,
+                                     n_threads));
+}
+
+void AssimpImporter::set_scene(const aiScene* aiscene){
+    if(cancelled) {
+        throw std::string("The import was cancelled.");
+    }
     if(!aiscene) {
         throw std::string("We couldn't find a scene.");
     }
+    delete p_scene;
+    p_scene = new AssimpScene(aiscene);
+    delete p_fast_scene;
+    p_fast_scene = NULL;
+}
+
+bool AssimpImporter::set_fast_scene(aiScene* aiscene){
+    if(!aiscene)
+        return false;
+    if(cancelled) {
+        delete aiscene;
+        throw std::string("The import was cancelled.");
+    }
+    delete p_scene;
     p_scene = new AssimpScene(aiscene);
+    delete p_fast_scene;
+    p_fast_scene = aiscene;
+    return true;
+}
+
+bool AssimpImporter::supports_format(std::string format){
+    // format is an extension, e.g. "ply"
+    return importer.IsExtensionSupported("." + format);
+}
+
+void AssimpImporter::keep_formats(std::vector<std::string> formats){
+    /* Unregisters every loader that supports none of formats, so that
+     * files are only ever tried against the loaders left. Must be called
+     * before reading.
+     */
+    std::set<std::string> kept(formats.begin(), formats.end());
+    std::vector<Assimp::BaseImporter*> loaders;
+    for(size_t i = 0; i < importer.GetImporterCount(); i++)
+        loaders.push_back(importer.GetImporter(i));
+    for(size_t i = 0; i < loaders.size(); i++) {
+        std::set<std::string> extensions;
+        loaders[i]->GetExtensionList(extensions);
+        bool keep = false;
+        std::set<std::string>::iterator it;
+        for(it = extensions.begin(); it != extensions.end(); it++)
+            keep = keep || kept.count(*it);
+        if(!keep) {
+            importer.UnregisterLoader(loaders[i]);
+            removed_loaders.push_back(loaders[i]);
+        }
+    }
+}
+
+void AssimpImporter::cancel(){
+    // may be called from any thread - the next progress update aborts
+    // the import in progress
+    cancelled = true;
+}
+
+void AssimpImporter::keep_meshes(std::vector<unsigned int> indices){
+    /* Deletes every mesh of the raw scene whose index is not in indices,
+     * then runs the post processing on what is left. Must only be called
+     * on an importer constructed with post_process = false.
+     */
+    aiScene* aiscene = const_cast<aiScene*>(importer.GetScene());
+    std::vector<int> new_index(aiscene->mNumMeshes, -1);
+    for(unsigned int i = 0; i < indices.size(); i++) {
+        if(indices[i] < aiscene->mNumMeshes)
+            new_index[indices[i]] = 0;
+    }
+    unsigned int n_kept = 0;
+    for(unsigned int i = 0; i < aiscene->mNumMeshes; i++) {
+        if(new_index[i] == -1) {
+            delete aiscene->mMeshes[i];
+        }
+        else {
+            new_index[i] = n_kept;
+            aiscene->mMeshes[n_kept++] = aiscene->mMeshes[i];
+        }
+    }
+    aiscene->mNumMeshes = n_kept;
+    if(aiscene->mRootNode)
+        remap_node_meshes(aiscene->mRootNode, new_index);
+    delete p_scene;
+    p_scene = NULL;
+    const aiScene* processed = aiscene;
+    if(n_kept > 0)
+        processed = importer.ApplyPostProcessing(POST_PROCESS_FLAGS);
+    if(cancelled) {
+        throw std::string("The import was cancelled.");
+    }
+    if(!processed) {
+        throw std::string("Post processing the scene failed.");
+    }
+    p_scene = new AssimpScene(processed);
+}
+
+
+// *************** CANCELLATION *************** //
+
+CancelProgressHandler::CancelProgressHandler(const volatile bool* flag){
+    cancelled = flag;
+}
+
+bool CancelProgressHandler::Update(float percentage){
+    // assimp ignores the return value of Update, but swallows exceptions
+    // thrown during an import - so throwing is how we abort early
+    if(*cancelled)
+        throw std::runtime_error("The import was cancelled.");
+    return true;
 }
 
 AssimpImporter::~AssimpImporter(){
     delete p_scene;
+    delete p_fast_scene;
+    // the importer only deletes the loaders still registered
+    for(size_t i = 0; i < removed_loaders.size(); i++)
+        delete removed_loaders[i];
+}
+
+
+// *************** FORCED FORMAT *************** //
+
+ForcedFormatIOSystem::ForcedFormatIOSystem(std::string path_in,
+                                           std::string alias_in){
+    path = path_in;
+    alias = alias_in;
+}
+
+bool ForcedFormatIOSystem::Exists(const char* file) const {
+    return DefaultIOSystem::Exists(alias == file ? path.c_str() : file);
+}
+
+Assimp::IOStream* ForcedFormatIOSystem::Open(const char* file,
+                                             const char* mode){
+    return DefaultIOSystem::Open(alias == file ? path.c_str() : file, mode);
 }
 
 AssimpScene* AssimpImporter::get_scene(){
@@ -44,15 +310,35 @@ AssimpScene* AssimpImporter::get_scene(){
 
 AssimpScene::AssimpScene(const aiScene* aiscene){
     p_scene = aiscene;
+    p_texture_path = NO_TEXTURE_PATH;
+    for(unsigned int i = 0; i < p_scene->mNumMaterials; i++) {
+        aiMaterial* mat = p_scene->mMaterials[i];
+        material_textures.push_back(textures_on_material(mat));
+        if(p_texture_path == NO_TEXTURE_PATH)
+            p_texture_path = diffuse_texture_path_on_material(mat);
+    }
     for(unsigned int i = 0; i < p_scene->mNumMeshes; i++) {
         meshes.push_back(new AssimpMesh(p_scene->mMeshes[i], this));
     }
+    for(unsigned int i = 0; i < p_scene->mNumTextures; i++) {
+        embedded_textures.push_back(new AssimpTexture(p_scene->mTextures[i]));
+    }
+    for(unsigned int i = 0; i < p_scene->mNumAnimations; i++) {
+        animations.push_back(new AssimpAnimation(p_scene->mAnimations[i]));
+    }
 }
 
 AssimpScene::~AssimpScene(){
     std::vector<AssimpMesh*>::iterator it;
     for (it = meshes.begin(); it != meshes.end(); it++)
         delete *it;
+    std::vector<AssimpTexture*>::iterator t_it;
+    for (t_it = embedded_textures.begin(); t_it != embedded_textures.end();
+         t_it++)
+        delete *t_it;
+    std::vector<AssimpAnimation*>::iterator a_it;
+    for (a_it = animations.begin(); a_it != animations.end(); a_it++)
+        delete *a_it;
 }
 
 unsigned int AssimpScene::n_meshes(){
@@ -60,15 +346,22 @@ unsigned int AssimpScene::n_meshes(){
 }
 
 std::string AssimpScene::texture_path(){
-    // get the material that is attached to this mesh
-    std::string path = NO_TEXTURE_PATH;
-    for(unsigned int i = 0; i < p_scene->mNumMaterials; i++) {
-        aiMaterial* mat = p_scene->mMaterials[i];
-        std::string path = diffuse_texture_path_on_material(mat);
-        if(path != NO_TEXTURE_PATH)
-            return path;
-    }
-    return path;
+    // the first single diffuse texture found on any material
+    return p_texture_path;
+}
+
+void AssimpScene::instances(std::vector<unsigned int>& mesh_indices,
+                            std::vector<double>& transforms){
+    /* Walks the node hierarchy, appending the index of every mesh a node
+     * refers to together with the node's world transform - 16 doubles, a C
+     * contiguous (4, 4) affine - so that a mesh placed many times is still
+     * only stored once.
+     */
+    const double identity[16] = {1, 0, 0, 0, 0, 1, 0, 0,
+                                 0, 0, 1, 0, 0, 0, 0, 1};
+    if(p_scene->mRootNode)
+        collect_instances(p_scene->mRootNode, identity, mesh_indices,
+                          transforms);
 }
 
 
@@ -79,6 +372,20 @@ AssimpMesh::AssimpMesh(aiMesh* mesh, AssimpScene* scene_in){
     scene = scene_in;
 }
 
+std::string AssimpMesh::name(){
+    return std::string(p_mesh->mName.C_Str());
+}
+
+unsigned int AssimpMesh::material_index(){
+    return p_mesh->mMaterialIndex;
+}
+
+TextureMap AssimpMesh::textures(){
+    if(p_mesh->mMaterialIndex < scene->material_textures.size())
+        return scene->material_textures[p_mesh->mMaterialIndex];
+    return TextureMap();
+}
+
 unsigned int AssimpMesh::n_points(){
     return p_mesh->mNumVertices;
 }
@@ -131,14 +438,85 @@ void AssimpMesh::points(double* points){
     }
 }
 
+void AssimpMesh::points(const double* transform, double* points){
+    /* As points, with transform (a C contiguous (4, 4) affine transform, or
+     * NULL for none) applied to each point as it is read.
+     */
+    if(!transform) {
+        AssimpMesh::points(points);
+        return;
+    }
+    for(unsigned int i = 0; i < p_mesh->mNumVertices; i++) {
+        aiVector3D point = p_mesh->mVertices[i];
+        double x = point.x, y = point.y, z = point.z;
+        for(int c = 0; c < 3; c++) {
+            const double* row = transform + 4*c;
+            points[3*i + c] = row[0]*x + row[1]*y + row[2]*z + row[3];
+        }
+    }
+}
+
+void AssimpMesh::point_stats(const double* transform, double* points,
+                             double* stats){
+    /* As points, but also writes the summary statistics of the points in to
+     * stats, a C contiguous array of size (3, 3) holding the minimum, the
+     * maximum and the centroid - all NaN for a mesh without points. Only the
+     * statistics are computed if points is NULL.
+     * If transform is not NULL it is a C contiguous (4, 4) affine transform
+     * that is applied to each point as it is read (the statistics are of
+     * the transformed points).
+     */
+    double* min = stats;
+    double* max = stats + 3;
+    double* centroid = stats + 6;
+    for(int c = 0; c < 3; c++) {
+        min[c] = std::numeric_limits<double>::infinity();
+        max[c] = -std::numeric_limits<double>::infinity();
+        centroid[c] = 0;
+    }
+    for(unsigned int i = 0; i < p_mesh->mNumVertices; i++) {
+        aiVector3D point = p_mesh->mVertices[i];
+        double xyz[3] = {point.x, point.y, point.z};
+        if(transform) {
+            double x = xyz[0], y = xyz[1], z = xyz[2];
+            for(int c = 0; c < 3; c++) {
+                const double* row = transform + 4*c;
+                xyz[c] = row[0]*x + row[1]*y + row[2]*z + row[3];
+            }
+        }
+        for(int c = 0; c < 3; c++) {
+            if(points)
+                points[3*i + c] = xyz[c];
+            min[c] = std::min(min[c], xyz[c]);
+            max[c] = std::max(max[c], xyz[c]);
+            centroid[c] += xyz[c];
+        }
+    }
+    const double nan = std::numeric_limits<double>::quiet_NaN();
+    for(int c = 0; c < 3; c++) {
+        if(p_mesh->mNumVertices == 0)
+            min[c] = max[c] = centroid[c] = nan;
+        else
+            centroid[c] /= p_mesh->mNumVertices;
+    }
+}
+
 void AssimpMesh::trilist(unsigned int* trilist){
+    AssimpMesh::trilist(trilist, false);
+}
+
+void AssimpMesh::trilist(unsigned int* trilist, bool flip_winding){
     // it is YOUR responsibility to ensure this
     // mesh contains only triangles before calling this method.
+    // flip_winding swaps the last two indices of every triangle, to keep
+    // faces pointing outwards after a transform that mirrors the mesh.
+    int second = flip_winding ? 2 : 1;
+    int third = flip_winding ? 1 : 2;
     for(unsigned int i = 0; i < p_mesh->mNumFaces; i++) {
         aiFace face = p_mesh->mFaces[i];
         trilist[3*i] = face.mIndices[0];
-        trilist[3*i + 1] = face.mIndices[1];
-        trilist[3*i + 2] = face.mIndices[2];
+        trilist[3*i + 1] = face.mIndices[second];
+        trilist[3*i + 2] = face.mIndices[third];
     }
 }
 
@@ -157,15 +535,19 @@ void AssimpMesh::colour_per_vertex(int index, double* colour_per_vertex){
 }
 
 void AssimpMesh::tcoords(int index, double* tcoords){
+    AssimpMesh::tcoords(index, tcoords, false);
+}
+
+void AssimpMesh::tcoords(int index, double* tcoords, bool flip_v){
     /* Reads the (s,t) tcoords, removing the alpha channel component.
      * expects tcoords to be a C contiguous array of size
-     * (n_points, 2)
+     * (n_points, 2). flip_v replaces t with 1 - t.
      */
     aiVector3D* tcoord_array = p_mesh->mTextureCoords[index];
     for(unsigned int i = 0; i < p_mesh->mNumVertices; i++) {
         aiVector3D tcoord = tcoord_array[i];
         tcoords[2*i] = tcoord.x;
-        tcoords[2*i + 1] = tcoord.y;
+        tcoords[2*i + 1] = flip_v ? 1.0 - tcoord.y : tcoord.y;
     }
 }
 
@@ -183,6 +565,435 @@ void AssimpMesh::tcoords_with_alpha(int index, double* tcoords){
     }
 }
 
+void AssimpMesh::sample_texture(int index, const unsigned char* image,
+                                unsigned int height, unsigned int width,
+                                unsigned int n_channels,
+                                double* colour_per_vertex){
+    /* Bilinearly samples the (r,g,b) colour of a C contiguous uint8 image of
+     * size (height, width, n_channels) at the tcoords of each vertex, giving
+     * colours in [0, 1]. Single channel images are read as grey. tcoords are
+     * clamped to [0, 1] and (0, 0) is the bottom left of the image.
+     * Expects colour_per_vertex to be a C contiguous array of size
+     * (n_points, 3)
+     */
+    aiVector3D* tcoord_array = p_mesh->mTextureCoords[index];
+    for(unsigned int i = 0; i < p_mesh->mNumVertices; i++) {
+        aiVector3D tcoord = tcoord_array[i];
+        double u = std::min(std::max((double) tcoord.x, 0.0), 1.0);
+        double v = std::min(std::max((double) tcoord.y, 0.0), 1.0);
+        double x = u * (width - 1);
+        double y = (1.0 - v) * (height - 1);
+        unsigned int x0 = (unsigned int) x;
+        unsigned int y0 = (unsigned int) y;
+        unsigned int x1 = std::min(x0 + 1, width - 1);
+        unsigned int y1 = std::min(y0 + 1, height - 1);
+        double dx = x - x0;
+        double dy = y - y0;
+        const unsigned char* top = image + y0 * width * n_channels;
+        const unsigned char* bottom = image + y1 * width * n_channels;
+        const unsigned char* top_left = top + x0 * n_channels;
+        const unsigned char* top_right = top + x1 * n_channels;
+        const unsigned char* bottom_left = bottom + x0 * n_channels;
+        const unsigned char* bottom_right = bottom + x1 * n_channels;
+        for(unsigned int c = 0; c < 3; c++) {
+            unsigned int ch = n_channels < 3 ? 0 : c;
+            double upper = (1 - dx) * top_left[ch] + dx * top_right[ch];
+            double lower = (1 - dx) * bottom_left[ch] + dx * bottom_right[ch];
+            colour_per_vertex[3*i + c] = ((1 - dy)*upper + dy*lower) / 255.0;
+        }
+    }
+}
+
+uint64_t AssimpMesh::topology_hash(){
+    /* A 64-bit FNV-1a hash of the number of points and the triangle list.
+     * Two meshes with the same hash can be treated as sharing topology,
+     * so only the points need to be read from all but one of them.
+     */
+    uint64_t hash = FNV1A_OFFSET_BASIS;
+    hash = fnv1a_update(hash, p_mesh->mNumVertices);
+    hash = fnv1a_update(hash, p_mesh->mNumFaces);
+    for(unsigned int i = 0; i < p_mesh->mNumFaces; i++) {
+        aiFace face = p_mesh->mFaces[i];
+        for(unsigned int j = 0; j < face.mNumIndices; j++)
+            hash = fnv1a_update(hash, face.mIndices[j]);
+    }
+    return hash;
+}
+
+unsigned int AssimpMesh::n_bones(){
+    return p_mesh->mNumBones;
+}
+
+unsigned int AssimpMesh::n_bone_weights(){
+    unsigned int n_weights = 0;
+    for(unsigned int b = 0; b < p_mesh->mNumBones; b++)
+        n_weights += p_mesh->mBones[b]->mNumWeights;
+    return n_weights;
+}
+
+std::string AssimpMesh::bone_name(unsigned int index){
+    return std::string(p_mesh->mBones[index]->mName.C_Str());
+}
+
+void AssimpMesh::bone_offset_matrix(unsigned int index, double* matrix){
+    // the C contiguous (4, 4) transform from mesh space to bone space
+    const aiMatrix4x4& m = p_mesh->mBones[index]->mOffsetMatrix;
+    const ai_real* values = m[0];
+    for(int i = 0; i < 16; i++)
+        matrix[i] = values[i];
+}
+
+void AssimpMesh::skin_weights(int* indptr, int* indices, double* weights){
+    /* Writes the bone weights as a compressed sparse row matrix of shape
+     * (n_points, n_bones): indptr has n_points + 1 entries, indices and
+     * weights have n_bone_weights entries. Within a row the bone indices
+     * are ascending.
+     */
+    unsigned int n_points = p_mesh->mNumVertices;
+    for(unsigned int i = 0; i <= n_points; i++)
+        indptr[i] = 0;
+    for(unsigned int b = 0; b < p_mesh->mNumBones; b++) {
+        const aiBone* bone = p_mesh->mBones[b];
+        for(unsigned int w = 0; w < bone->mNumWeights; w++)
+            indptr[bone->mWeights[w].mVertexId + 1]++;
+    }
+    for(unsigned int i = 0; i < n_points; i++)
+        indptr[i + 1] += indptr[i];
+    // the next free slot of each row
+    std::vector<int> next(indptr, indptr + n_points);
+    for(unsigned int b = 0; b < p_mesh->mNumBones; b++) {
+        const aiBone* bone = p_mesh->mBones[b];
+        for(unsigned int w = 0; w < bone->mNumWeights; w++) {
+            int slot = next[bone->mWeights[w].mVertexId]++;
+            indices[slot] = b;
+            weights[slot] = bone->mWeights[w].mWeight;
+        }
+    }
+}
+
+
+// *************** TEXTURE *************** //
+
+AssimpTexture::AssimpTexture(aiTexture* texture){
+    p_texture = texture;
+}
+
+bool AssimpTexture::is_compressed(){
+    // compressed (e.g. PNG/JPEG) textures are stored with a height of 0
+    return p_texture->mHeight == 0;
+}
+
+unsigned int AssimpTexture::width(){
+    return p_texture->mWidth;
+}
+
+unsigned int AssimpTexture::height(){
+    return p_texture->mHeight;
+}
+
+unsigned int AssimpTexture::n_bytes(){
+    // for compressed textures mWidth is the size of the data in bytes
+    if(is_compressed())
+        return p_texture->mWidth;
+    return p_texture->mWidth * p_texture->mHeight * 4;
+}
+
+const unsigned char* AssimpTexture::data(){
+    return reinterpret_cast<const unsigned char*>(p_texture->pcData);
+}
+
+std::string AssimpTexture::format_hint(){
+    return std::string(p_texture->achFormatHint);
+}
+
+void AssimpTexture::rgba(unsigned char* rgba){
+    /* Reads the texels of an uncompressed texture, which assimp stores as
+     * BGRA. Expects rgba to be a C contiguous array of size
+     * (height, width, 4)
+     */
+    unsigned int n_texels = p_texture->mWidth * p_texture->mHeight;
+    for(unsigned int i = 0; i < n_texels; i++) {
+        aiTexel texel = p_texture->pcData[i];
+        rgba[4*i] = texel.r;
+        rgba[4*i + 1] = texel.g;
+        rgba[4*i + 2] = texel.b;
+        rgba[4*i + 3] = texel.a;
+    }
+}
+
+void AssimpMesh::optimize_locality(){
+    /* Reorders the faces of this triangle mesh for the post-transform
+     * vertex cache (see tipsify), then the vertices by their first use in
+     * the new faces (unused vertices last). The aiMesh itself is rewritten,
+     * so everything copied out afterwards follows the new order.
+     * face_order and vertex_order keep the old index of each face and
+     * vertex.
+     */
+    unsigned int n_faces = p_mesh->mNumFaces;
+    unsigned int n_points = p_mesh->mNumVertices;
+    std::vector<unsigned int> tris(3 * n_faces);
+    face_order.resize(n_faces);
+    if(n_faces) {
+        trilist(&tris[0]);
+        tipsify(&tris[0], n_faces, n_points, VERTEX_CACHE_SIZE,
+                &face_order[0]);
+    }
+    std::vector<int> new_index(n_points, -1);
+    vertex_order.clear();
+    vertex_order.reserve(n_points);
+    for(unsigned int i = 0; i < n_faces; i++) {
+        for(int j = 0; j < 3; j++) {
+            unsigned int v = tris[3 * face_order[i] + j];
+            if(new_index[v] == -1) {
+                new_index[v] = vertex_order.size();
+                vertex_order.push_back(v);
+            }
+        }
+    }
+    for(unsigned int v = 0; v < n_points; v++) {
+        if(new_index[v] == -1) {
+            new_index[v] = vertex_order.size();
+            vertex_order.push_back(v);
+        }
+    }
+    // move the index arrays of the faces over rather than copying them
+    aiFace* faces = new aiFace[n_faces];
+    for(unsigned int i = 0; i < n_faces; i++) {
+        aiFace& old = p_mesh->mFaces[face_order[i]];
+        faces[i].mNumIndices = old.mNumIndices;
+        faces[i].mIndices = old.mIndices;
+        old.mNumIndices = 0;
+        old.mIndices = NULL;
+        for(unsigned int j = 0; j < faces[i].mNumIndices; j++)
+            faces[i].mIndices[j] = new_index[faces[i].mIndices[j]];
+    }
+    delete[] p_mesh->mFaces;
+    p_mesh->mFaces = faces;
+    permute(p_mesh->mVertices, vertex_order);
+    permute(p_mesh->mNormals, vertex_order);
+    permute(p_mesh->mTangents, vertex_order);
+    permute(p_mesh->mBitangents, vertex_order);
+    for(unsigned int k = 0; k < AI_MAX_NUMBER_OF_TEXTURECOORDS; k++)
+        permute(p_mesh->mTextureCoords[k], vertex_order);
+    for(unsigned int k = 0; k < AI_MAX_NUMBER_OF_COLOR_SETS; k++)
+        permute(p_mesh->mColors[k], vertex_order);
+    for(unsigned int b = 0; b < p_mesh->mNumBones; b++) {
+        aiBone* bone = p_mesh->mBones[b];
+        for(unsigned int w = 0; w < bone->mNumWeights; w++)
+            bone->mWeights[w].mVertexId = new_index[
+                bone->mWeights[w].mVertexId];
+    }
+    for(unsigned int a = 0; a < p_mesh->mNumAnimMeshes; a++) {
+        aiAnimMesh* anim = p_mesh->mAnimMeshes[a];
+        if(anim->mNumVertices != n_points)
+            continue;
+        permute(anim->mVertices, vertex_order);
+        permute(anim->mNormals, vertex_order);
+        permute(anim->mTangents, vertex_order);
+        permute(anim->mBitangents, vertex_order);
+        for(unsigned int k = 0; k < AI_MAX_NUMBER_OF_TEXTURECOORDS; k++)
+            permute(anim->mTextureCoords[k], vertex_order);
+        for(unsigned int k = 0; k < AI_MAX_NUMBER_OF_COLOR_SETS; k++)
+            permute(anim->mColors[k], vertex_order);
+    }
+}
+
+void AssimpMesh::adjacency(std::vector<unsigned int>& edges,
+                           std::vector<int>& vertex_faces_indptr,
+                           std::vector<int>& vertex_faces,
+                           std::vector<int>& face_faces_indptr,
+                           std::vector<int>& face_faces){
+    /* Builds the connectivity of this triangle mesh:
+     * - edges: the unique edges as (n_edges, 2) vertex pairs, the lower
+     *   index first, in ascending order
+     * - vertex_faces: the faces using each vertex, as CSR indices with
+     *   n_points + 1 vertex_faces_indptr
+     * - face_faces: the faces sharing an edge with each face, as CSR
+     *   indices with n_faces + 1 face_faces_indptr
+     * Every row of the CSR arrays is in ascending order.
+     */
+    unsigned int n_faces = p_mesh->mNumFaces;
+    unsigned int n_points = p_mesh->mNumVertices;
+    std::vector<unsigned int> tris(3 * n_faces);
+    if(n_faces)
+        trilist(&tris[0]);
+    vertex_faces_indptr.assign(n_points + 1, 0);
+    for(unsigned int i = 0; i < 3 * n_faces; i++)
+        vertex_faces_indptr[tris[i] + 1]++;
+    for(unsigned int v = 0; v < n_points; v++)
+        vertex_faces_indptr[v + 1] += vertex_faces_indptr[v];
+    vertex_faces.resize(3 * n_faces);
+    std::vector<int> next(vertex_faces_indptr.begin(),
+                          vertex_faces_indptr.end() - 1);
+    for(unsigned int i = 0; i < 3 * n_faces; i++) {
+        int slot = next[tris[i]]++;
+        vertex_faces[slot] = i / 3;
+    }
+    // each edge is found from its lower vertex, through that vertex's faces
+    edges.clear();
+    std::vector<unsigned int> neighbours;
+    for(unsigned int v = 0; v < n_points; v++) {
+        neighbours.clear();
+        for(int k = vertex_faces_indptr[v]; k < vertex_faces_indptr[v + 1];
+            k++) {
+            for(int j = 0; j < 3; j++) {
+                unsigned int w = tris[3 * vertex_faces[k] + j];
+                if(w > v)
+                    neighbours.push_back(w);
+            }
+        }
+        std::sort(neighbours.begin(), neighbours.end());
+        neighbours.erase(std::unique(neighbours.begin(), neighbours.end()),
+                         neighbours.end());
+        for(unsigned int i = 0; i < neighbours.size(); i++) {
+            edges.push_back(v);
+            edges.push_back(neighbours[i]);
+        }
+    }
+    // the faces across each edge are in the faces of both its vertices
+    face_faces_indptr.assign(n_faces + 1, 0);
+    face_faces.clear();
+    std::vector<int> across;
+    for(unsigned int f = 0; f < n_faces; f++) {
+        across.clear();
+        for(int j = 0; j < 3; j++) {
+            unsigned int a = tris[3*f + j];
+            unsigned int b = tris[3*f + (j + 1) % 3];
+            int i = vertex_faces_indptr[a];
+            int k = vertex_faces_indptr[b];
+            while(i < vertex_faces_indptr[a + 1] &&
+                  k < vertex_faces_indptr[b + 1]) {
+                if(vertex_faces[i] < vertex_faces[k]) {
+                    i++;
+                }
+                else if(vertex_faces[k] < vertex_faces[i]) {
+                    k++;
+                }
+                else {
+                    if(vertex_faces[i] != (int) f)
+                        across.push_back(vertex_faces[i]);
+                    i++;
+                    k++;
+                }
+            }
+        }
+        std::sort(across.begin(), across.end());
+        across.erase(std::unique(across.begin(), across.end()),
+                     across.end());
+        face_faces.insert(face_faces.end(), across.begin(), across.end());
+        face_faces_indptr[f + 1] = face_faces.size();
+    }
+}
+
+
+// *************** ANIMATION *************** //
+
+AssimpAnimation::AssimpAnimation(aiAnimation* animation){
+    p_animation = animation;
+}
+
+std::string AssimpAnimation::name(){
+    return std::string(p_animation->mName.C_Str());
+}
+
+double AssimpAnimation::duration(){
+    // in ticks
+    return p_animation->mDuration;
+}
+
+double AssimpAnimation::ticks_per_second(){
+    // 0 if the file doesn't say
+    return p_animation->mTicksPerSecond;
+}
+
+unsigned int AssimpAnimation::n_channels(){
+    return p_animation->mNumChannels;
+}
+
+std::string AssimpAnimation::channel_name(unsigned int channel){
+    // the name of the node the channel animates
+    return std::string(p_animation->mChannels[channel]->mNodeName.C_Str());
+}
+
+unsigned int AssimpAnimation::n_position_keys(unsigned int channel){
+    return p_animation->mChannels[channel]->mNumPositionKeys;
+}
+
+unsigned int AssimpAnimation::n_rotation_keys(unsigned int channel){
+    return p_animation->mChannels[channel]->mNumRotationKeys;
+}
+
+unsigned int AssimpAnimation::n_scaling_keys(unsigned int channel){
+    return p_animation->mChannels[channel]->mNumScalingKeys;
+}
+
+void AssimpAnimation::position_keys(unsigned int channel, double* times,
+                                    double* values){
+    const aiNodeAnim* anim = p_animation->mChannels[channel];
+    vector_keys(anim->mPositionKeys, anim->mNumPositionKeys, times, values);
+}
+
+void AssimpAnimation::rotation_keys(unsigned int channel, double* times,
+                                    double* values){
+    // quaternions are written as (w, x, y, z)
+    const aiNodeAnim* anim = p_animation->mChannels[channel];
+    for(unsigned int k = 0; k < anim->mNumRotationKeys; k++) {
+        const aiQuatKey& key = anim->mRotationKeys[k];
+        times[k] = key.mTime;
+        values[4*k] = key.mValue.w;
+        values[4*k + 1] = key.mValue.x;
+        values[4*k + 2] = key.mValue.y;
+        values[4*k + 3] = key.mValue.z;
+    }
+}
+
+void AssimpAnimation::scaling_keys(unsigned int channel, double* times,
+                                   double* values){
+    const aiNodeAnim* anim = p_animation->mChannels[channel];
+    vector_keys(anim->mScalingKeys, anim->mNumScalingKeys, times, values);
+}
+
+void AssimpAnimation::sample(unsigned int channel, const double* times,
+                             unsigned int n_times, double* positions,
+                             double* rotations, double* scales){
+    /* Evaluates the channel at each of times (in ticks, ascending): the
+     * positions and scales are interpolated linearly and the rotations
+     * spherically, holding the first and last keys outside of their range.
+     * Writes (n_times, 3) positions and scales and (n_times, 4) rotations
+     * as (w, x, y, z).
+     */
+    const aiNodeAnim* anim = p_animation->mChannels[channel];
+    sample_vector_keys(anim->mPositionKeys, anim->mNumPositionKeys,
+                       aiVector3D(0, 0, 0), times, n_times, positions);
+    sample_vector_keys(anim->mScalingKeys, anim->mNumScalingKeys,
+                       aiVector3D(1, 1, 1), times, n_times, scales);
+    const aiQuatKey* keys = anim->mRotationKeys;
+    unsigned int n_keys = anim->mNumRotationKeys;
+    unsigned int k = 0;
+    for(unsigned int i = 0; i < n_times; i++) {
+        aiQuaternion q;
+        if(n_keys > 0) {
+            // keys[k] is the last key at or before the time, if any
+            while(k + 1 < n_keys && keys[k + 1].mTime <= times[i])
+                k++;
+            if(k + 1 == n_keys || times[i] <= keys[k].mTime) {
+                q = keys[k].mValue;
+            }
+            else {
+                double f = ((times[i] - keys[k].mTime) /
+                            (keys[k + 1].mTime - keys[k].mTime));
+                aiQuaternion::Interpolate(q, keys[k].mValue,
+                                          keys[k + 1].mValue, (ai_real) f);
+                q.Normalize();
+            }
+        }
+        rotations[4*i] = q.w;
+        rotations[4*i + 1] = q.x;
+        rotations[4*i + 2] = q.y;
+        rotations[4*i + 3] = q.z;
+    }
+}
+
 
 // *************** HELPER ROUTINES *************** //
 
@@ -225,3 +1036,181 @@ std::string diffuse_texture_path_on_material(aiMaterial* mat){
     else
         return NO_TEXTURE_PATH;
 }
+
+TextureMap textures_on_material(aiMaterial* mat){
+    TextureMap textures;
+    aiString path;
+    for(unsigned int i = 0; i < N_TEXTURE_TYPES; i++) {
+        unsigned int texture_count = mat->GetTextureCount(TEXTURE_TYPES[i]);
+        for(unsigned int j = 0; j < texture_count; j++) {
+            if(mat->GetTexture(TEXTURE_TYPES[i], j, &path) == AI_SUCCESS)
+                textures[TEXTURE_TYPE_NAMES[i]].push_back(
+                    std::string(path.C_Str()));
+        }
+    }
+    return textures;
+}
+
+void remap_node_meshes(aiNode* node, const std::vector<int>& new_index){
+    // point the node (and its children) at the new mesh indices, dropping
+    // references to meshes that have been deleted (new index of -1)
+    unsigned int n_kept = 0;
+    for(unsigned int i = 0; i < node->mNumMeshes; i++) {
+        int index = new_index[node->mMeshes[i]];
+        if(index != -1)
+            node->mMeshes[n_kept++] = index;
+    }
+    node->mNumMeshes = n_kept;
+    if(n_kept == 0) {
+        delete[] node->mMeshes;
+        node->mMeshes = NULL;
+    }
+    for(unsigned int i = 0; i < node->mNumChildren; i++)
+        remap_node_meshes(node->mChildren[i], new_index);
+}
+
+void collect_instances(const aiNode* node, const double* parent,
+                       std::vector<unsigned int>& mesh_indices,
+                       std::vector<double>& transforms){
+    // world = parent * local, both row major with column vectors
+    const aiMatrix4x4& m = node->mTransformation;
+    const double local[16] = {m.a1, m.a2, m.a3, m.a4, m.b1, m.b2, m.b3, m.b4,
+                              m.c1, m.c2, m.c3, m.c4, m.d1, m.d2, m.d3, m.d4};
+    double world[16];
+    for(int r = 0; r < 4; r++) {
+        for(int c = 0; c < 4; c++) {
+            world[4*r + c] = 0;
+            for(int k = 0; k < 4; k++)
+                world[4*r + c] += parent[4*r + k] * local[4*k + c];
+        }
+    }
+    for(unsigned int i = 0; i < node->mNumMeshes; i++) {
+        mesh_indices.push_back(node->mMeshes[i]);
+        transforms.insert(transforms.end(), world, world + 16);
+    }
+    for(unsigned int i = 0; i < node->mNumChildren; i++)
+        collect_instances(node->mChildren[i], world, mesh_indices,
+                          transforms);
+}
+
+void vector_keys(const aiVectorKey* keys, unsigned int n_keys,
+                 double* times, double* values){
+    for(unsigned int k = 0; k < n_keys; k++) {
+        times[k] = keys[k].mTime;
+        values[3*k] = keys[k].mValue.x;
+        values[3*k + 1] = keys[k].mValue.y;
+        values[3*k + 2] = keys[k].mValue.z;
+    }
+}
+
+void sample_vector_keys(const aiVectorKey* keys, unsigned int n_keys,
+                        const aiVector3D& rest, const double* times,
+                        unsigned int n_times, double* values){
+    // linear interpolation at ascending times, or rest if there are no keys
+    unsigned int k = 0;
+    for(unsigned int i = 0; i < n_times; i++) {
+        aiVector3D v = rest;
+        if(n_keys > 0) {
+            while(k + 1 < n_keys && keys[k + 1].mTime <= times[i])
+                k++;
+            v = keys[k].mValue;
+            if(k + 1 < n_keys && times[i] > keys[k].mTime) {
+                double f = ((times[i] - keys[k].mTime) /
+                            (keys[k + 1].mTime - keys[k].mTime));
+                v += (keys[k + 1].mValue - keys[k].mValue) * (ai_real) f;
+            }
+        }
+        values[3*i] = v.x;
+        values[3*i + 1] = v.y;
+        values[3*i + 2] = v.z;
+    }
+}
+
+uint64_t fnv1a_update(uint64_t hash, unsigned int value){
+    // feed the four bytes of value into the hash, least significant first
+    for(int i = 0; i < 4; i++) {
+        hash ^= (value >> (8 * i)) & 0xff;
+        hash *= FNV1A_PRIME;
+    }
+    return hash;
+}
+
+void tipsify(const unsigned int* trilist, unsigned int n_tris,
+             unsigned int n_points, unsigned int cache_size,
+             unsigned int* face_order){
+    /* Orders the triangles for a post-transform vertex cache of cache_size
+     * vertices, by fanning around one vertex after another. After Sander,
+     * Nehab and Barczak, Fast Triangle Reordering for Vertex Locality and
+     * Reduced Overdraw, 2007. Linear in the number of triangles.
+     */
+    // the triangles of each vertex
+    std::vector<unsigned int> offsets(n_points + 1, 0);
+    for(unsigned int i = 0; i < 3 * n_tris; i++)
+        offsets[trilist[i] + 1]++;
+    for(unsigned int v = 0; v < n_points; v++)
+        offsets[v + 1] += offsets[v];
+    std::vector<unsigned int> adjacency(3 * n_tris);
+    std::vector<unsigned int> next(offsets.begin(), offsets.end() - 1);
+    for(unsigned int i = 0; i < 3 * n_tris; i++)
+        adjacency[next[trilist[i]]++] = i / 3;
+    // the triangles of each vertex still to be emitted
+    std::vector<long> live(n_points);
+    for(unsigned int v = 0; v < n_points; v++)
+        live[v] = offsets[v + 1] - offsets[v];
+    std::vector<long> cache_time(n_points, 0);
+    std::vector<bool> emitted(n_tris, false);
+    std::vector<unsigned int> dead_end, candidates;
+    long time = cache_size + 1;
+    unsigned int cursor = 0;
+    unsigned int n_emitted = 0;
+    long fanning = n_points > 0 ? 0 : -1;
+    while(fanning >= 0) {
+        candidates.clear();
+        for(unsigned int k = offsets[fanning]; k < offsets[fanning + 1];
+            k++) {
+            unsigned int t = adjacency[k];
+            if(emitted[t])
+                continue;
+            for(int j = 0; j < 3; j++) {
+                unsigned int v = trilist[3*t + j];
+                dead_end.push_back(v);
+                candidates.push_back(v);
+                live[v]--;
+                if(time - cache_time[v] > (long) cache_size)
+                    cache_time[v] = time++;
+            }
+            emitted[t] = true;
+            face_order[n_emitted++] = t;
+        }
+        // fan next around the candidate that will still be in the cache
+        // once its remaining triangles are emitted and has been there the
+        // longest
+        fanning = -1;
+        long priority = -1;
+        for(unsigned int i = 0; i < candidates.size(); i++) {
+            unsigned int v = candidates[i];
+            if(live[v] <= 0)
+                continue;
+            long p = 0;
+            if(time - cache_time[v] + 2 * live[v] <= (long) cache_size)
+                p = time - cache_time[v];
+            if(p > priority) {
+                priority = p;
+                fanning = v;
+            }
+        }
+        // otherwise a recently used vertex, or the next one with work left
+        while(fanning == -1 && !dead_end.empty()) {
+            unsigned int v = dead_end.back();
+            dead_end.pop_back();
+            if(live[v] > 0)
+                fanning = v;
+        }
+        while(fanning == -1 && cursor < n_points) {
+            if(live[cursor] > 0)
+                fanning = cursor;
+            else
+                cursor++;
+        }
+    }
+}
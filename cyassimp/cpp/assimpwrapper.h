@@ -2,40 +2,119 @@
 
 #include <string>
 #include <vector>
+#include <map>
+#include <stdint.h>
 #include <assimp/Importer.hpp>
+#include <assimp/ProgressHandler.hpp>
+#include <assimp/DefaultIOSystem.h>
+#include <assimp/anim.h>
 const std::string NO_TEXTURE_PATH = "NO_TEXTURE_PATH";
+const uint64_t FNV1A_OFFSET_BASIS = 14695981039346656037ULL;
+const uint64_t FNV1A_PRIME = 1099511628211ULL;
+// the post-transform vertex cache size faces are reordered for
+const unsigned int VERTEX_CACHE_SIZE = 16;
 
 // forward declarations
 struct aiScene;
+struct aiNode;
 struct aiMesh;
 struct aiMaterial;
+struct aiTexture;
+struct aiAnimation;
 class AssimpMesh;
+class AssimpAnimation;
+class AssimpTexture;
 class AssimpScene;
 class AssimpImporter;
+namespace Assimp{
+    class BaseImporter;
+}
+
+// texture type name (e.g. "diffuse") -> texture paths of that type
+typedef std::map<std::string, std::vector<std::string> > TextureMap;
 
 
 // *************** IMPORTER ************ //
 class AssimpImporter{
     Assimp::Importer importer;
     AssimpScene* p_scene;
+    // a scene built by the fast parsers rather than assimp, which we own
+    aiScene* p_fast_scene;
+    volatile bool cancelled;
+    unsigned int removed_components;
+    // loaders unregistered by keep_formats, which we now own
+    std::vector<Assimp::BaseImporter*> removed_loaders;
 
     public:
+    AssimpImporter();
     AssimpImporter(std::string path);
+    AssimpImporter(std::string path, bool post_process);
     ~AssimpImporter();
+    void read_file(std::string path, bool post_process);
+    void read_file(std::string path, bool post_process, std::string format);
+    void read_memory(const unsigned char* buffer, size_t length,
+                     std::string hint, bool post_process);
+    bool read_file_fast(std::string path, std::string format,
+                        unsigned int n_threads);
+    bool read_memory_fast(const unsigned char* buffer, size_t length,
+                          std::string format, unsigned int n_threads);
+    void cancel();
     AssimpScene* get_scene();
+    void keep_meshes(std::vector<unsigned int> indices);
+    void keep_bone_weights();
+    void keep_animations();
+    bool supports_format(std::string format);
+    void keep_formats(std::vector<std::string> formats);
+
+    private:
+    void configure();
+    void set_scene(const aiScene* aiscene);
+    bool set_fast_scene(aiScene* aiscene);
+};
+
+
+// *************** FORCED FORMAT *************** //
+// Serves the file at path under an alias ending in the extension of a
+// format, so that assimp picks that format's loader without probing. Every
+// other file (e.g. materials next to the model) is opened as usual.
+class ForcedFormatIOSystem : public Assimp::DefaultIOSystem{
+    std::string path;
+    std::string alias;
+
+    public:
+    ForcedFormatIOSystem(std::string path, std::string alias);
+    bool Exists(const char* file) const;
+    Assimp::IOStream* Open(const char* file, const char* mode);
+};
+
+
+// *************** CANCELLATION *************** //
+class CancelProgressHandler : public Assimp::ProgressHandler{
+    const volatile bool* cancelled;
+
+    public:
+    CancelProgressHandler(const volatile bool* cancelled);
+    bool Update(float percentage);
 };
 
 
 // *************** SCENE *************** //
 class AssimpScene{
     const aiScene* p_scene;
+    std::string p_texture_path;
 
     public:
     std::vector<AssimpMesh*> meshes;
+    std::vector<AssimpTexture*> embedded_textures;
+    std::vector<AssimpAnimation*> animations;
+    // the textures of each material, resolved once on construction
+    std::vector<TextureMap> material_textures;
     AssimpScene(const aiScene* scene);
     ~AssimpScene();
     unsigned int n_meshes();
     std::string texture_path();
+    void instances(std::vector<unsigned int>& mesh_indices,
+                   std::vector<double>& transforms);
 };
 
 
@@ -45,7 +124,13 @@ class AssimpMesh{
     AssimpScene* scene;
 
     public:
+    // set by optimize_locality - the old index of each face and vertex
+    std::vector<unsigned int> face_order;
+    std::vector<unsigned int> vertex_order;
     AssimpMesh(aiMesh* mesh, AssimpScene* scene);
+    std::string name();
+    unsigned int material_index();
+    TextureMap textures();
     unsigned int n_points();
     unsigned int n_faces();
     unsigned int n_tcoord_sets();
@@ -57,10 +142,68 @@ class AssimpMesh{
     bool is_trimesh();
     bool is_pointcloud();
     void points(double* points);
+    void points(const double* transform, double* points);
+    void point_stats(const double* transform, double* points, double* stats);
     void trilist(unsigned int* trilist);
+    void trilist(unsigned int* trilist, bool flip_winding);
     void tcoords(int index, double* tcoords);
+    void tcoords(int index, double* tcoords, bool flip_v);
     void colour_per_vertex(int index, double* colour_per_vertex);
     void tcoords_with_alpha(int index, double* tcoords);
+    void sample_texture(int index, const unsigned char* image,
+                        unsigned int height, unsigned int width,
+                        unsigned int n_channels, double* colour_per_vertex);
+    uint64_t topology_hash();
+    unsigned int n_bones();
+    unsigned int n_bone_weights();
+    std::string bone_name(unsigned int index);
+    void bone_offset_matrix(unsigned int index, double* matrix);
+    void skin_weights(int* indptr, int* indices, double* weights);
+    void optimize_locality();
+    void adjacency(std::vector<unsigned int>& edges,
+                   std::vector<int>& vertex_faces_indptr,
+                   std::vector<int>& vertex_faces,
+                   std::vector<int>& face_faces_indptr,
+                   std::vector<int>& face_faces);
+};
+
+
+// *************** TEXTURE *************** //
+class AssimpTexture{
+    aiTexture* p_texture;
+
+    public:
+    AssimpTexture(aiTexture* texture);
+    bool is_compressed();
+    unsigned int width();
+    unsigned int height();
+    unsigned int n_bytes();
+    const unsigned char* data();
+    std::string format_hint();
+    void rgba(unsigned char* rgba);
+};
+
+
+// *************** ANIMATION *************** //
+class AssimpAnimation{
+    aiAnimation* p_animation;
+
+    public:
+    AssimpAnimation(aiAnimation* animation);
+    std::string name();
+    double duration();
+    double ticks_per_second();
+    unsigned int n_channels();
+    std::string channel_name(unsigned int channel);
+    unsigned int n_position_keys(unsigned int channel);
+    unsigned int n_rotation_keys(unsigned int channel);
+    unsigned int n_scaling_keys(unsigned int channel);
+    void position_keys(unsigned int channel, double* times, double* values);
+    void rotation_keys(unsigned int channel, double* times, double* values);
+    void scaling_keys(unsigned int channel, double* times, double* values);
+    void sample(unsigned int channel, const double* times,
+                unsigned int n_times, double* positions, double* rotations,
+                double* scales);
 };
 
 
@@ -68,3 +211,17 @@ class AssimpMesh{
 unsigned int tcoords_mask(aiMesh* mesh, bool* has_tcoords);
 unsigned int colour_sets_mask(aiMesh* mesh, bool* has_colour_sets);
 std::string diffuse_texture_path_on_material(aiMaterial* mat);
+TextureMap textures_on_material(aiMaterial* mat);
+void remap_node_meshes(aiNode* node, const std::vector<int>& new_index);
+void collect_instances(const aiNode* node, const double* parent,
+                       std::vector<unsigned int>& mesh_indices,
+                       std::vector<double>& transforms);
+void vector_keys(const aiVectorKey* keys, unsigned int n_keys,
+                 double* times, double* values);
+void sample_vector_keys(const aiVectorKey* keys, unsigned int n_keys,
+                        const aiVector3D& rest, const double* times,
+                        unsigned int n_times, double* values);
+uint64_t fnv1a_update(uint64_t hash, unsigned int value);
+void tipsify(const unsigned int* trilist, unsigned int n_tris,
+             unsigned int n_points, unsigned int cache_size,
+             unsigned int* face_order);
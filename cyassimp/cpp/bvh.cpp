@@ -0,0 +1,432 @@
+#include <algorithm>
+#include <cmath>
+#include <limits>
+#include <utility>
+#include "bvh.h"
+
+const double INF = std::numeric_limits<double>::infinity();
+
+// orders primitives by the centre of their boxes along an axis
+struct CentreLess{
+    const double* lower;
+    const double* upper;
+    int axis;
+
+    CentreLess(const double* lower_in, const double* upper_in, int axis_in){
+        lower = lower_in;
+        upper = upper_in;
+        axis = axis_in;
+    }
+
+    bool operator()(unsigned int i, unsigned int j) const {
+        return (lower[3*i + axis] + upper[3*i + axis] <
+                lower[3*j + axis] + upper[3*j + axis]);
+    }
+};
+
+
+// *************** TREE *************** //
+
+void BVHTree::build(const std::vector<double>& lower,
+                    const std::vector<double>& upper, unsigned int n){
+    /* Builds the tree over n boxes, given by their lower and upper corners
+     * as (n, 3) arrays. Each node is split at the median of the box centres
+     * along the axis over which they are most spread.
+     */
+    bounds.clear();
+    info.clear();
+    order.resize(n);
+    for(unsigned int i = 0; i < n; i++)
+        order[i] = i;
+    if(n > 0)
+        add_node(lower, upper, 0, n);
+}
+
+int BVHTree::add_node(const std::vector<double>& lower,
+                      const std::vector<double>& upper, unsigned int start,
+                      unsigned int end){
+    int node = info.size() / 2;
+    bounds.resize(bounds.size() + 6);
+    info.resize(info.size() + 2);
+    double box[6] = {INF, INF, INF, -INF, -INF, -INF};
+    double centre_lower[3] = {INF, INF, INF};
+    double centre_upper[3] = {-INF, -INF, -INF};
+    for(unsigned int i = start; i < end; i++) {
+        unsigned int p = order[i];
+        for(int c = 0; c < 3; c++) {
+            double centre = (lower[3*p + c] + upper[3*p + c]) / 2;
+            box[c] = std::min(box[c], lower[3*p + c]);
+            box[3 + c] = std::max(box[3 + c], upper[3*p + c]);
+            centre_lower[c] = std::min(centre_lower[c], centre);
+            centre_upper[c] = std::max(centre_upper[c], centre);
+        }
+    }
+    std::copy(box, box + 6, bounds.begin() + 6*node);
+    if(end - start <= BVH_LEAF_SIZE) {
+        info[2*node] = start;
+        info[2*node + 1] = end - start;
+        return node;
+    }
+    int axis = 0;
+    for(int c = 1; c < 3; c++) {
+        if(centre_upper[c] - centre_lower[c] >
+           centre_upper[axis] - centre_lower[axis])
+            axis = c;
+    }
+    unsigned int mid = start + (end - start) / 2;
+    std::nth_element(order.begin() + start, order.begin() + mid,
+                     order.begin() + end,
+                     CentreLess(&lower[0], &upper[0], axis));
+    add_node(lower, upper, start, mid);
+    int second = add_node(lower, upper, mid, end);
+    info[2*node] = second;
+    info[2*node + 1] = 0;
+    return node;
+}
+
+
+// *************** BVH *************** //
+
+void AssimpBVH::build(AssimpMesh* mesh, const double* transform){
+    // straight from the aiMesh, with transform (may be NULL) applied
+    points.resize(3 * mesh->n_points());
+    trilist.resize(3 * mesh->n_faces());
+    if(!points.empty())
+        mesh->points(transform, &points[0]);
+    if(!trilist.empty())
+        mesh->trilist(&trilist[0]);
+    build_trees();
+}
+
+void AssimpBVH::build(const double* points_in, unsigned int n_points,
+                      const unsigned int* trilist_in, unsigned int n_tris){
+    points.assign(points_in, points_in + 3 * n_points);
+    trilist.assign(trilist_in, trilist_in + 3 * n_tris);
+    build_trees();
+}
+
+void AssimpBVH::build_trees(){
+    unsigned int n_tris = AssimpBVH::n_tris();
+    std::vector<double> lower(3 * n_tris, INF);
+    std::vector<double> upper(3 * n_tris, -INF);
+    for(unsigned int t = 0; t < n_tris; t++) {
+        for(int j = 0; j < 3; j++) {
+            const double* p = &points[3 * trilist[3*t + j]];
+            for(int c = 0; c < 3; c++) {
+                lower[3*t + c] = std::min(lower[3*t + c], p[c]);
+                upper[3*t + c] = std::max(upper[3*t + c], p[c]);
+            }
+        }
+    }
+    triangles.build(lower, upper, n_tris);
+    // a point is its own box
+    vertices.build(points, points, n_points());
+}
+
+unsigned int AssimpBVH::n_points(){
+    return points.size() / 3;
+}
+
+unsigned int AssimpBVH::n_tris(){
+    return trilist.size() / 3;
+}
+
+void AssimpBVH::closest_points(const double* queries, unsigned int n_queries,
+                               double* closest, double* distances,
+                               int* tri_indices){
+    /* For each of the (n_queries, 3) queries, writes the closest point on
+     * the surface, its distance and the index of the triangle it is on.
+     * Without triangles the distance is infinite and the index -1.
+     */
+    std::vector<int> stack;
+    for(unsigned int q = 0; q < n_queries; q++) {
+        const double* p = queries + 3*q;
+        double best = INF;
+        int best_tri = -1;
+        double candidate[3];
+        for(int c = 0; c < 3; c++)
+            closest[3*q + c] = std::numeric_limits<double>::quiet_NaN();
+        if(!triangles.info.empty())
+            stack.push_back(0);
+        while(!stack.empty()) {
+            int node = stack.back();
+            stack.pop_back();
+            if(box_distance2(&triangles.bounds[6*node], p) >= best)
+                continue;
+            int first = triangles.info[2*node];
+            int count = triangles.info[2*node + 1];
+            if(count > 0) {
+                for(int i = first; i < first + count; i++) {
+                    unsigned int t = triangles.order[i];
+                    closest_on_triangle(p, &points[3 * trilist[3*t]],
+                                        &points[3 * trilist[3*t + 1]],
+                                        &points[3 * trilist[3*t + 2]],
+                                        candidate);
+                    double d2 = 0;
+                    for(int c = 0; c < 3; c++)
+                        d2 += (candidate[c] - p[c]) * (candidate[c] - p[c]);
+                    if(d2 < best) {
+                        best = d2;
+                        best_tri = t;
+                        std::copy(candidate, candidate + 3, closest + 3*q);
+                    }
+                }
+            }
+            else {
+                // visit the nearer child first
+                int near = node + 1;
+                int far = first;
+                if(box_distance2(&triangles.bounds[6*far], p) <
+                   box_distance2(&triangles.bounds[6*near], p))
+                    std::swap(near, far);
+                stack.push_back(far);
+                stack.push_back(near);
+            }
+        }
+        distances[q] = std::sqrt(best);
+        tri_indices[q] = best_tri;
+    }
+}
+
+void AssimpBVH::intersect_rays(const double* origins,
+                               const double* directions,
+                               unsigned int n_rays, double* distances,
+                               int* tri_indices, double* barycentric){
+    /* Finds the first triangle hit by each ray. Writes the ray parameter t
+     * of the hit (origin + t * direction, infinite for a miss), the index
+     * of the triangle (-1 for a miss) and the (n_rays, 3) barycentric
+     * coordinates of the hit (NaN for a miss).
+     */
+    std::vector<int> stack;
+    for(unsigned int r = 0; r < n_rays; r++) {
+        const double* origin = origins + 3*r;
+        const double* direction = directions + 3*r;
+        double inv_direction[3];
+        for(int c = 0; c < 3; c++)
+            inv_direction[c] = 1.0 / direction[c];
+        double best = INF;
+        int best_tri = -1;
+        double best_u = std::numeric_limits<double>::quiet_NaN();
+        double best_v = best_u;
+        if(!triangles.info.empty())
+            stack.push_back(0);
+        while(!stack.empty()) {
+            int node = stack.back();
+            stack.pop_back();
+            if(!ray_hits_box(&triangles.bounds[6*node], origin,
+                             inv_direction, best))
+                continue;
+            int first = triangles.info[2*node];
+            int count = triangles.info[2*node + 1];
+            if(count > 0) {
+                for(int i = first; i < first + count; i++) {
+                    unsigned int t = triangles.order[i];
+                    double hit, u, v;
+                    if(ray_hits_triangle(origin, direction,
+                                         &points[3 * trilist[3*t]],
+                                         &points[3 * trilist[3*t + 1]],
+                                         &points[3 * trilist[3*t + 2]],
+                                         &hit, &u, &v) && hit < best) {
+                        best = hit;
+                        best_tri = t;
+                        best_u = u;
+                        best_v = v;
+                    }
+                }
+            }
+            else {
+                stack.push_back(first);
+                stack.push_back(node + 1);
+            }
+        }
+        distances[r] = best;
+        tri_indices[r] = best_tri;
+        barycentric[3*r] = 1 - best_u - best_v;
+        barycentric[3*r + 1] = best_u;
+        barycentric[3*r + 2] = best_v;
+    }
+}
+
+void AssimpBVH::nearest_points(const double* queries, unsigned int n_queries,
+                               unsigned int k, int* indices,
+                               double* distances){
+    /* Writes the indices of, and distances to, the k points nearest to
+     * each query - (n_queries, k) arrays, nearest first. If there are fewer
+     * than k points the rest are -1 and infinite.
+     */
+    std::vector<int> stack;
+    // a max heap of (squared distance, point index)
+    std::vector<std::pair<double, int> > heap;
+    for(unsigned int q = 0; q < n_queries; q++) {
+        const double* p = queries + 3*q;
+        heap.clear();
+        if(!vertices.info.empty() && k > 0)
+            stack.push_back(0);
+        while(!stack.empty()) {
+            int node = stack.back();
+            stack.pop_back();
+            double bound = heap.size() < k ? INF : heap.front().first;
+            if(box_distance2(&vertices.bounds[6*node], p) >= bound)
+                continue;
+            int first = vertices.info[2*node];
+            int count = vertices.info[2*node + 1];
+            if(count > 0) {
+                for(int i = first; i < first + count; i++) {
+                    unsigned int v = vertices.order[i];
+                    double d2 = 0;
+                    for(int c = 0; c < 3; c++)
+                        d2 += (points[3*v + c] - p[c]) * (points[3*v + c] -
+                                                          p[c]);
+                    if(heap.size() < k) {
+                        heap.push_back(std::make_pair(d2, (int) v));
+                        std::push_heap(heap.begin(), heap.end());
+                    }
+                    else if(d2 < heap.front().first) {
+                        std::pop_heap(heap.begin(), heap.end());
+                        heap.back() = std::make_pair(d2, (int) v);
+                        std::push_heap(heap.begin(), heap.end());
+                    }
+                }
+            }
+            else {
+                int near = node + 1;
+                int far = first;
+                if(box_distance2(&vertices.bounds[6*far], p) <
+                   box_distance2(&vertices.bounds[6*near], p))
+                    std::swap(near, far);
+                stack.push_back(far);
+                stack.push_back(near);
+            }
+        }
+        std::sort_heap(heap.begin(), heap.end());
+        for(unsigned int i = 0; i < k; i++) {
+            if(i < heap.size()) {
+                indices[k*q + i] = heap[i].second;
+                distances[k*q + i] = std::sqrt(heap[i].first);
+            }
+            else {
+                indices[k*q + i] = -1;
+                distances[k*q + i] = INF;
+            }
+        }
+    }
+}
+
+
+// *************** HELPER ROUTINES *************** //
+
+double box_distance2(const double* box, const double* p){
+    // squared distance from p to the box (lower corner, upper corner)
+    double d2 = 0;
+    for(int c = 0; c < 3; c++) {
+        double d = std::max(std::max(box[c] - p[c], 0.0), p[c] - box[3 + c]);
+        d2 += d * d;
+    }
+    return d2;
+}
+
+bool ray_hits_box(const double* box, const double* origin,
+                  const double* inv_direction, double t_max){
+    // the slab test, for hits at 0 <= t <= t_max
+    double t_min = 0;
+    for(int c = 0; c < 3; c++) {
+        double t0 = (box[c] - origin[c]) * inv_direction[c];
+        double t1 = (box[3 + c] - origin[c]) * inv_direction[c];
+        if(t0 > t1)
+            std::swap(t0, t1);
+        // NaN (a ray in the plane of a slab) leaves the range unchanged
+        if(t0 > t_min)
+            t_min = t0;
+        if(t1 < t_max)
+            t_max = t1;
+        if(t_min > t_max)
+            return false;
+    }
+    return true;
+}
+
+void closest_on_triangle(const double* p, const double* a, const double* b,
+                         const double* c, double* closest){
+    // after Ericson, Real-Time Collision Detection, 5.1.5
+    double ab[3], ac[3], ap[3], bp[3], cp[3];
+    for(int i = 0; i < 3; i++) {
+        ab[i] = b[i] - a[i];
+        ac[i] = c[i] - a[i];
+        ap[i] = p[i] - a[i];
+        bp[i] = p[i] - b[i];
+        cp[i] = p[i] - c[i];
+    }
+    double d1 = 0, d2 = 0, d3 = 0, d4 = 0, d5 = 0, d6 = 0;
+    for(int i = 0; i < 3; i++) {
+        d1 += ab[i] * ap[i];
+        d2 += ac[i] * ap[i];
+        d3 += ab[i] * bp[i];
+        d4 += ac[i] * bp[i];
+        d5 += ab[i] * cp[i];
+        d6 += ac[i] * cp[i];
+    }
+    // the weights of b and c, with a taking the rest
+    double v, w;
+    double vc = d1 * d4 - d3 * d2;
+    double vb = d5 * d2 - d1 * d6;
+    double va = d3 * d6 - d5 * d4;
+    if(d1 <= 0 && d2 <= 0) {
+        v = 0, w = 0;
+    }
+    else if(d3 >= 0 && d4 <= d3) {
+        v = 1, w = 0;
+    }
+    else if(d6 >= 0 && d5 <= d6) {
+        v = 0, w = 1;
+    }
+    else if(vc <= 0 && d1 >= 0 && d3 <= 0) {
+        v = d1 / (d1 - d3), w = 0;
+    }
+    else if(vb <= 0 && d2 >= 0 && d6 <= 0) {
+        v = 0, w = d2 / (d2 - d6);
+    }
+    else if(va <= 0 && d4 - d3 >= 0 && d5 - d6 >= 0) {
+        w = (d4 - d3) / ((d4 - d3) + (d5 - d6));
+        v = 1 - w;
+    }
+    else if(va + vb + vc != 0) {
+        v = vb / (va + vb + vc);
+        w = vc / (va + vb + vc);
+    }
+    else {
+        // degenerate
+        v = 0, w = 0;
+    }
+    for(int i = 0; i < 3; i++)
+        closest[i] = a[i] + v * ab[i] + w * ac[i];
+}
+
+bool ray_hits_triangle(const double* origin, const double* direction,
+                       const double* a, const double* b, const double* c,
+                       double* t, double* u, double* v){
+    // Moller-Trumbore, counting hits on either side of the triangle
+    double e1[3], e2[3], s[3], h[3], q[3];
+    for(int i = 0; i < 3; i++) {
+        e1[i] = b[i] - a[i];
+        e2[i] = c[i] - a[i];
+        s[i] = origin[i] - a[i];
+    }
+    for(int i = 0; i < 3; i++) {
+        h[i] = direction[(i + 1) % 3] * e2[(i + 2) % 3] -
+               direction[(i + 2) % 3] * e2[(i + 1) % 3];
+        q[i] = s[(i + 1) % 3] * e1[(i + 2) % 3] -
+               s[(i + 2) % 3] * e1[(i + 1) % 3];
+    }
+    double det = e1[0] * h[0] + e1[1] * h[1] + e1[2] * h[2];
+    if(det == 0)
+        return false;
+    *u = (s[0] * h[0] + s[1] * h[1] + s[2] * h[2]) / det;
+    if(*u < 0 || *u > 1)
+        return false;
+    *v = (direction[0] * q[0] + direction[1] * q[1] +
+          direction[2] * q[2]) / det;
+    if(*v < 0 || *u + *v > 1)
+        return false;
+    *t = (e2[0] * q[0] + e2[1] * q[1] + e2[2] * q[2]) / det;
+    return *t >= 0;
+}
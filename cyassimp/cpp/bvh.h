@@ -0,0 +1,72 @@
+#pragma once
+
+#include <vector>
+#include "assimpwrapper.h"
+
+// the most primitives kept in a leaf of a BVHTree
+const unsigned int BVH_LEAF_SIZE = 4;
+
+
+// *************** TREE *************** //
+// A bounding volume hierarchy over boxes, flattened in to arrays so that it
+// can be saved and restored as is. Nodes are laid out depth first, so the
+// first child of an inner node directly follows it.
+struct BVHTree{
+    // (n_nodes, 2, 3) - the lower and upper corners of each node's box
+    std::vector<double> bounds;
+    // (n_nodes, 2) - for a leaf, the start of its primitives in order and
+    // their (non-zero) count. For an inner node, the index of its second
+    // child and 0.
+    std::vector<int> info;
+    // the primitive indices, grouped by leaf
+    std::vector<unsigned int> order;
+
+    void build(const std::vector<double>& lower,
+               const std::vector<double>& upper, unsigned int n);
+
+    private:
+    int add_node(const std::vector<double>& lower,
+                 const std::vector<double>& upper, unsigned int start,
+                 unsigned int end);
+};
+
+
+// *************** BVH *************** //
+// The points and triangles of a mesh, with a tree over each for closest
+// point, ray and nearest neighbour queries.
+class AssimpBVH{
+    public:
+    // (n_points, 3) and (n_tris, 3)
+    std::vector<double> points;
+    std::vector<unsigned int> trilist;
+    BVHTree triangles;
+    BVHTree vertices;
+
+    void build(AssimpMesh* mesh, const double* transform);
+    void build(const double* points, unsigned int n_points,
+               const unsigned int* trilist, unsigned int n_tris);
+    unsigned int n_points();
+    unsigned int n_tris();
+    void closest_points(const double* queries, unsigned int n_queries,
+                        double* closest, double* distances,
+                        int* tri_indices);
+    void intersect_rays(const double* origins, const double* directions,
+                        unsigned int n_rays, double* distances,
+                        int* tri_indices, double* barycentric);
+    void nearest_points(const double* queries, unsigned int n_queries,
+                        unsigned int k, int* indices, double* distances);
+
+    private:
+    void build_trees();
+};
+
+
+// *************** HELPER ROUTINES *************** //
+double box_distance2(const double* box, const double* p);
+bool ray_hits_box(const double* box, const double* origin,
+                  const double* inv_direction, double t_max);
+void closest_on_triangle(const double* p, const double* a, const double* b,
+                         const double* c, double* closest);
+bool ray_hits_triangle(const double* origin, const double* direction,
+                       const double* a, const double* b, const double* c,
+                       double* t, double* u, double* v);
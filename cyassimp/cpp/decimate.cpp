@@ -0,0 +1,404 @@
+#include <algorithm>
+#include <cmath>
+#include "decimate.h"
+
+
+// *************** DECIMATOR *************** //
+
+QuadricDecimator::QuadricDecimator(AssimpMesh* mesh, const double* transform,
+                                   bool flip_winding){
+    /* Reads the mesh (with transform, which may be NULL, applied to the
+     * points) and builds the quadric of every vertex. flip_winding is
+     * passed through to AssimpMesh::trilist.
+     */
+    unsigned int n_points = mesh->n_points();
+    unsigned int n_faces = mesh->n_faces();
+    std::vector<double> points(3 * n_points);
+    std::vector<unsigned int> trilist(3 * n_faces);
+    double stats[9];
+    if(n_points)
+        mesh->point_stats(transform, &points[0], stats);
+    if(n_faces)
+        mesh->trilist(&trilist[0], flip_winding);
+    vertices.resize(n_points);
+    for(unsigned int i = 0; i < n_points; i++) {
+        Vertex& v = vertices[i];
+        std::copy(&points[3*i], &points[3*i] + 3, v.p);
+        std::fill(v.q, v.q + 10, 0.0);
+        v.border = false;
+    }
+    // errors are compared against thresholds relative to the mesh's size
+    scale2 = 0;
+    if(n_points) {
+        for(int c = 0; c < 3; c++) {
+            double extent = stats[3 + c] - stats[c];
+            scale2 += extent * extent;
+        }
+    }
+    triangles.resize(n_faces);
+    for(unsigned int i = 0; i < n_faces; i++) {
+        Triangle& t = triangles[i];
+        std::copy(&trilist[3*i], &trilist[3*i] + 3, t.v);
+        t.deleted = false;
+        t.dirty = false;
+    }
+    update_mesh(true);
+}
+
+void QuadricDecimator::simplify(unsigned int target_faces){
+    /* Collapses edges until at most target_faces triangles are left, or
+     * DECIMATE_MAX_ITERATIONS passes have been made. The cheapest edges go
+     * first: each pass collapses the edges under a threshold that grows
+     * with every pass. Collapses that would flip a triangle are skipped,
+     * as are those involving a border vertex unless they run along a
+     * border edge - which then collapses on to one of its end points, so
+     * the outline of the mesh only loses vertices.
+     */
+    unsigned int n_faces = triangles.size();
+    unsigned int n_deleted = 0;
+    std::vector<bool> deleted0, deleted1;
+    for(unsigned int iteration = 0; iteration < DECIMATE_MAX_ITERATIONS;
+        iteration++) {
+        if(n_faces - n_deleted <= target_faces)
+            break;
+        if(iteration % 5 == 0) {
+            update_mesh(false);
+            n_faces = triangles.size();
+            n_deleted = 0;
+        }
+        for(unsigned int i = 0; i < triangles.size(); i++)
+            triangles[i].dirty = false;
+        double threshold = (1e-9 * scale2 *
+                            std::pow(iteration + 3.0,
+                                     DECIMATE_AGGRESSIVENESS));
+        for(unsigned int i = 0; i < triangles.size(); i++) {
+            Triangle& t = triangles[i];
+            if(t.err[3] > threshold || t.deleted || t.dirty)
+                continue;
+            for(int j = 0; j < 3; j++) {
+                if(t.err[j] >= threshold)
+                    continue;
+                unsigned int i0 = t.v[j];
+                unsigned int i1 = t.v[(j + 1) % 3];
+                Vertex& v0 = vertices[i0];
+                Vertex& v1 = vertices[i1];
+                if((v0.border || v1.border) && !border_edge(i0, i1))
+                    continue;
+                double p[3];
+                edge_error(i0, i1, p);
+                deleted0.assign(v0.tcount, false);
+                deleted1.assign(v1.tcount, false);
+                if(flipped(p, i1, v0, deleted0) ||
+                   flipped(p, i0, v1, deleted1))
+                    continue;
+                std::copy(p, p + 3, v0.p);
+                for(int k = 0; k < 10; k++)
+                    v0.q[k] += v1.q[k];
+                unsigned int tstart = refs.size();
+                update_triangles(i0, v0, deleted0, n_deleted);
+                update_triangles(i0, v1, deleted1, n_deleted);
+                unsigned int tcount = refs.size() - tstart;
+                if(tcount <= v0.tcount) {
+                    // reuse v0's slots in refs
+                    std::copy(refs.begin() + tstart, refs.end(),
+                              refs.begin() + v0.tstart);
+                    refs.resize(tstart);
+                }
+                else {
+                    v0.tstart = tstart;
+                }
+                v0.tcount = tcount;
+                break;
+            }
+            if(n_faces - n_deleted <= target_faces)
+                break;
+        }
+    }
+    compact();
+}
+
+unsigned int QuadricDecimator::n_points(){
+    return vertices.size();
+}
+
+unsigned int QuadricDecimator::n_faces(){
+    return triangles.size();
+}
+
+void QuadricDecimator::points(double* points){
+    for(unsigned int i = 0; i < vertices.size(); i++)
+        std::copy(vertices[i].p, vertices[i].p + 3, points + 3*i);
+}
+
+void QuadricDecimator::trilist(unsigned int* trilist){
+    for(unsigned int i = 0; i < triangles.size(); i++)
+        std::copy(triangles[i].v, triangles[i].v + 3, trilist + 3*i);
+}
+
+void QuadricDecimator::update_mesh(bool first){
+    // drop deleted triangles and rebuild the triangles of each vertex
+    if(!first) {
+        unsigned int n_kept = 0;
+        for(unsigned int i = 0; i < triangles.size(); i++) {
+            if(!triangles[i].deleted)
+                triangles[n_kept++] = triangles[i];
+        }
+        triangles.resize(n_kept);
+    }
+    for(unsigned int i = 0; i < vertices.size(); i++)
+        vertices[i].tcount = 0;
+    for(unsigned int i = 0; i < triangles.size(); i++) {
+        for(int j = 0; j < 3; j++)
+            vertices[triangles[i].v[j]].tcount++;
+    }
+    unsigned int tstart = 0;
+    for(unsigned int i = 0; i < vertices.size(); i++) {
+        vertices[i].tstart = tstart;
+        tstart += vertices[i].tcount;
+        vertices[i].tcount = 0;
+    }
+    refs.resize(3 * triangles.size());
+    for(unsigned int i = 0; i < triangles.size(); i++) {
+        for(unsigned int j = 0; j < 3; j++) {
+            Vertex& v = vertices[triangles[i].v[j]];
+            Ref ref = {i, j};
+            refs[v.tstart + v.tcount++] = ref;
+        }
+    }
+    if(!first)
+        return;
+    // a vertex is on the border if it shares an edge with just one triangle
+    std::vector<unsigned int> counts, ids;
+    for(unsigned int i = 0; i < vertices.size(); i++) {
+        counts.clear();
+        ids.clear();
+        const Vertex& v = vertices[i];
+        for(unsigned int k = 0; k < v.tcount; k++) {
+            const Triangle& t = triangles[refs[v.tstart + k].tid];
+            for(int j = 0; j < 3; j++) {
+                unsigned int id = t.v[j];
+                unsigned int ofs = std::find(ids.begin(), ids.end(), id) -
+                                   ids.begin();
+                if(ofs == ids.size()) {
+                    ids.push_back(id);
+                    counts.push_back(1);
+                }
+                else {
+                    counts[ofs]++;
+                }
+            }
+        }
+        for(unsigned int j = 0; j < ids.size(); j++) {
+            if(counts[j] == 1)
+                vertices[ids[j]].border = true;
+        }
+    }
+    // the quadric of a vertex sums those of the planes of its triangles
+    for(unsigned int i = 0; i < triangles.size(); i++) {
+        Triangle& t = triangles[i];
+        const double* p0 = vertices[t.v[0]].p;
+        const double* p1 = vertices[t.v[1]].p;
+        const double* p2 = vertices[t.v[2]].p;
+        double e1[3], e2[3];
+        for(int c = 0; c < 3; c++) {
+            e1[c] = p1[c] - p0[c];
+            e2[c] = p2[c] - p0[c];
+        }
+        t.n[0] = e1[1] * e2[2] - e1[2] * e2[1];
+        t.n[1] = e1[2] * e2[0] - e1[0] * e2[2];
+        t.n[2] = e1[0] * e2[1] - e1[1] * e2[0];
+        normalize_vector(t.n);
+        double a = t.n[0], b = t.n[1], c = t.n[2];
+        double d = -(a * p0[0] + b * p0[1] + c * p0[2]);
+        const double plane[10] = {a * a, a * b, a * c, a * d, b * b, b * c,
+                                  b * d, c * c, c * d, d * d};
+        for(int j = 0; j < 3; j++) {
+            for(int k = 0; k < 10; k++)
+                vertices[t.v[j]].q[k] += plane[k];
+        }
+    }
+    for(unsigned int i = 0; i < triangles.size(); i++)
+        set_errors(triangles[i]);
+}
+
+void QuadricDecimator::compact(){
+    // drop deleted triangles and the vertices no triangle uses any more
+    unsigned int n_kept = 0;
+    for(unsigned int i = 0; i < triangles.size(); i++) {
+        if(!triangles[i].deleted)
+            triangles[n_kept++] = triangles[i];
+    }
+    triangles.resize(n_kept);
+    std::vector<int> new_index(vertices.size(), -1);
+    for(unsigned int i = 0; i < triangles.size(); i++) {
+        for(int j = 0; j < 3; j++)
+            new_index[triangles[i].v[j]] = 0;
+    }
+    unsigned int n_used = 0;
+    for(unsigned int i = 0; i < vertices.size(); i++) {
+        if(new_index[i] != -1) {
+            new_index[i] = n_used;
+            vertices[n_used++] = vertices[i];
+        }
+    }
+    vertices.resize(n_used);
+    for(unsigned int i = 0; i < triangles.size(); i++) {
+        for(int j = 0; j < 3; j++)
+            triangles[i].v[j] = new_index[triangles[i].v[j]];
+    }
+}
+
+double QuadricDecimator::vertex_error(const double* q, const double* p){
+    double x = p[0], y = p[1], z = p[2];
+    return (q[0] * x * x + 2 * q[1] * x * y + 2 * q[2] * x * z +
+            2 * q[3] * x + q[4] * y * y + 2 * q[5] * y * z + 2 * q[6] * y +
+            q[7] * z * z + 2 * q[8] * z + q[9]);
+}
+
+double QuadricDecimator::edge_error(unsigned int i0, unsigned int i1,
+                                    double* p){
+    /* The cost of collapsing the edge, and the point (written to p) to
+     * collapse it to: the minimum of the summed quadric if it is well
+     * defined and near the edge, otherwise the best of the end points and
+     * the midpoint. An edge between two border vertices only collapses on
+     * to one of its end points, which stays on the border.
+     */
+    const Vertex& v0 = vertices[i0];
+    const Vertex& v1 = vertices[i1];
+    double q[10];
+    for(int k = 0; k < 10; k++)
+        q[k] = v0.q[k] + v1.q[k];
+    double mid[3], edge2 = 0;
+    for(int c = 0; c < 3; c++) {
+        mid[c] = (v0.p[c] + v1.p[c]) / 2;
+        edge2 += (v1.p[c] - v0.p[c]) * (v1.p[c] - v0.p[c]);
+    }
+    double det = det3(q[0], q[1], q[2], q[1], q[4], q[5], q[2], q[5], q[7]);
+    if(!(v0.border && v1.border) && det != 0) {
+        double x[3];
+        x[0] = -det3(q[3], q[1], q[2], q[6], q[4], q[5], q[8], q[5],
+                     q[7]) / det;
+        x[1] = -det3(q[0], q[3], q[2], q[1], q[6], q[5], q[2], q[8],
+                     q[7]) / det;
+        x[2] = -det3(q[0], q[1], q[3], q[1], q[4], q[6], q[2], q[5],
+                     q[8]) / det;
+        double offset2 = 0;
+        for(int c = 0; c < 3; c++)
+            offset2 += (x[c] - mid[c]) * (x[c] - mid[c]);
+        // a nearly singular quadric can put the minimum anywhere
+        if(offset2 <= edge2) {
+            std::copy(x, x + 3, p);
+            return vertex_error(q, p);
+        }
+    }
+    const double* candidates[3] = {v0.p, v1.p, mid};
+    int n_candidates = v0.border && v1.border ? 2 : 3;
+    double best = 0;
+    for(int i = 0; i < n_candidates; i++) {
+        double error = vertex_error(q, candidates[i]);
+        if(i == 0 || error < best) {
+            best = error;
+            std::copy(candidates[i], candidates[i] + 3, p);
+        }
+    }
+    return best;
+}
+
+bool QuadricDecimator::border_edge(unsigned int i0, unsigned int i1){
+    // an edge is on the border if just one live triangle uses it
+    const Vertex& v0 = vertices[i0];
+    unsigned int count = 0;
+    for(unsigned int k = 0; k < v0.tcount; k++) {
+        const Triangle& t = triangles[refs[v0.tstart + k].tid];
+        if(t.deleted)
+            continue;
+        if(t.v[0] == i1 || t.v[1] == i1 || t.v[2] == i1)
+            count++;
+    }
+    return count == 1;
+}
+
+void QuadricDecimator::set_errors(Triangle& t){
+    double p[3];
+    for(int j = 0; j < 3; j++)
+        t.err[j] = edge_error(t.v[j], t.v[(j + 1) % 3], p);
+    t.err[3] = std::min(t.err[0], std::min(t.err[1], t.err[2]));
+}
+
+bool QuadricDecimator::flipped(const double* p, unsigned int i1,
+                               const Vertex& v0, std::vector<bool>& deleted){
+    /* Whether moving v0 to p would flip (or squash) any of its triangles
+     * not shared with i1. Marks the shared triangles, which the collapse
+     * deletes, in deleted.
+     */
+    for(unsigned int k = 0; k < v0.tcount; k++) {
+        const Ref& ref = refs[v0.tstart + k];
+        const Triangle& t = triangles[ref.tid];
+        if(t.deleted)
+            continue;
+        unsigned int id1 = t.v[(ref.tvertex + 1) % 3];
+        unsigned int id2 = t.v[(ref.tvertex + 2) % 3];
+        if(id1 == i1 || id2 == i1) {
+            deleted[k] = true;
+            continue;
+        }
+        double d1[3], d2[3], n[3];
+        for(int c = 0; c < 3; c++) {
+            d1[c] = vertices[id1].p[c] - p[c];
+            d2[c] = vertices[id2].p[c] - p[c];
+        }
+        if(!normalize_vector(d1) || !normalize_vector(d2))
+            return true;
+        if(std::fabs(d1[0] * d2[0] + d1[1] * d2[1] + d1[2] * d2[2]) > 0.999)
+            return true;
+        n[0] = d1[1] * d2[2] - d1[2] * d2[1];
+        n[1] = d1[2] * d2[0] - d1[0] * d2[2];
+        n[2] = d1[0] * d2[1] - d1[1] * d2[0];
+        normalize_vector(n);
+        deleted[k] = false;
+        if(n[0] * t.n[0] + n[1] * t.n[1] + n[2] * t.n[2] < 0.2)
+            return true;
+    }
+    return false;
+}
+
+void QuadricDecimator::update_triangles(unsigned int i0, const Vertex& v,
+                                        const std::vector<bool>& deleted,
+                                        unsigned int& n_deleted){
+    // point v's triangles at i0, deleting those that collapse
+    for(unsigned int k = 0; k < v.tcount; k++) {
+        Ref ref = refs[v.tstart + k];
+        Triangle& t = triangles[ref.tid];
+        if(t.deleted)
+            continue;
+        if(deleted[k]) {
+            t.deleted = true;
+            n_deleted++;
+            continue;
+        }
+        t.v[ref.tvertex] = i0;
+        t.dirty = true;
+        set_errors(t);
+        refs.push_back(ref);
+    }
+}
+
+
+// *************** HELPER ROUTINES *************** //
+
+double det3(double a, double b, double c, double d, double e, double f,
+            double g, double h, double i){
+    // the determinant of the 3x3 matrix with rows (a, b, c), (d, e, f) and
+    // (g, h, i)
+    return a * (e * i - f * h) - b * (d * i - f * g) + c * (d * h - e * g);
+}
+
+bool normalize_vector(double* v){
+    // false (leaving v alone) for a zero vector
+    double length = std::sqrt(v[0] * v[0] + v[1] * v[1] + v[2] * v[2]);
+    if(length == 0)
+        return false;
+    for(int c = 0; c < 3; c++)
+        v[c] /= length;
+    return true;
+}
@@ -0,0 +1,72 @@
+#pragma once
+
+#include <vector>
+#include "assimpwrapper.h"
+
+// passes made over the triangles by each call of simplify
+const unsigned int DECIMATE_MAX_ITERATIONS = 100;
+// how quickly the error threshold for collapses grows between passes
+const double DECIMATE_AGGRESSIVENESS = 7;
+
+
+// *************** DECIMATOR *************** //
+// Simplifies a triangle mesh by quadric error edge collapse (Garland and
+// Heckbert), collapsing every edge under an error threshold that grows from
+// pass to pass. Works on its own copy of the aiMesh data, so a mesh can be
+// simplified to a series of ever smaller targets one after the other.
+class QuadricDecimator{
+    struct Vertex{
+        double p[3];
+        // the symmetric 4x4 quadric, upper triangle row by row
+        double q[10];
+        unsigned int tstart;
+        unsigned int tcount;
+        bool border;
+    };
+    struct Triangle{
+        unsigned int v[3];
+        // the cost of collapsing each edge, then the least of them
+        double err[4];
+        double n[3];
+        bool deleted;
+        bool dirty;
+    };
+    // a triangle using a vertex, and which of its corners the vertex is
+    struct Ref{
+        unsigned int tid;
+        unsigned int tvertex;
+    };
+    std::vector<Vertex> vertices;
+    std::vector<Triangle> triangles;
+    std::vector<Ref> refs;
+    // the squared diagonal of the mesh's bounding box
+    double scale2;
+
+    public:
+    QuadricDecimator(AssimpMesh* mesh, const double* transform,
+                     bool flip_winding);
+    void simplify(unsigned int target_faces);
+    unsigned int n_points();
+    unsigned int n_faces();
+    void points(double* points);
+    void trilist(unsigned int* trilist);
+
+    private:
+    void update_mesh(bool first);
+    void compact();
+    double vertex_error(const double* q, const double* p);
+    double edge_error(unsigned int i0, unsigned int i1, double* p);
+    bool border_edge(unsigned int i0, unsigned int i1);
+    void set_errors(Triangle& t);
+    bool flipped(const double* p, unsigned int i1, const Vertex& v0,
+                 std::vector<bool>& deleted);
+    void update_triangles(unsigned int i0, const Vertex& v,
+                          const std::vector<bool>& deleted,
+                          unsigned int& n_deleted);
+};
+
+
+// *************** HELPER ROUTINES *************** //
+double det3(double a, double b, double c, double d, double e, double f,
+            double g, double h, double i);
+bool normalize_vector(double* v);
@@ -0,0 +1,1033 @@
+#include <cmath>
+#include <cstdlib>
+#include <cstring>
+#include <fstream>
+#include <iterator>
+#include <thread>
+#include <unordered_map>
+#include <assimp/scene.h>
+#include "assimpwrapper.h"
+#include "fastparse.h"
+#ifndef _WIN32
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+#endif
+
+// the powers of ten that are exactly representable as doubles
+const double EXACT_POWERS_OF_TEN[] = {
+    1e0, 1e1, 1e2, 1e3, 1e4, 1e5, 1e6, 1e7, 1e8, 1e9, 1e10, 1e11, 1e12,
+    1e13, 1e14, 1e15, 1e16, 1e17, 1e18, 1e19, 1e20, 1e21, 1e22
+};
+const int MAX_EXACT_POWER = 22;
+// the largest mantissa a double holds exactly
+const uint64_t MAX_EXACT_MANTISSA = 1ULL << 53;
+
+// the name assimp gives an OBJ mesh with no object or group line
+const char* OBJ_DEFAULT_NAME = "defaultobject";
+
+// the value types of PLY properties
+enum PlyType{
+    PLY_INT8, PLY_UINT8, PLY_INT16, PLY_UINT16, PLY_INT32, PLY_UINT32,
+    PLY_FLOAT32, PLY_FLOAT64, PLY_UNKNOWN
+};
+const char* PLY_TYPE_NAMES[] = {
+    "char", "uchar", "short", "ushort", "int", "uint", "float", "double"
+};
+const char* PLY_SIZED_TYPE_NAMES[] = {
+    "int8", "uint8", "int16", "uint16", "int32", "uint32", "float32",
+    "float64"
+};
+const unsigned int PLY_TYPE_SIZES[] = {1, 1, 2, 2, 4, 4, 4, 8};
+
+// the PLY vertex properties holding texture coordinates, as (u, v) pairs
+const char* PLY_TCOORD_NAMES[][2] = {
+    {"u", "v"}, {"s", "t"}, {"texture_u", "texture_v"},
+    {"texture_s", "texture_t"}
+};
+const unsigned int N_PLY_TCOORD_NAMES = sizeof(PLY_TCOORD_NAMES) /
+                                        sizeof(PLY_TCOORD_NAMES[0]);
+
+inline bool is_space(char c){
+    return c == ' ' || c == '\t' || c == '\r' || c == '\n';
+}
+
+inline bool is_digit(char c){
+    return (unsigned int) (c - '0') < 10;
+}
+
+// true if p is at the end of a line
+inline bool at_newline(const char* p, const char* end){
+    return p == end || *p == '\n';
+}
+
+// true if p is at the end of a line, or an OBJ comment that runs to it
+inline bool at_line_end(const char* p, const char* end){
+    return at_newline(p, end) || *p == '#';
+}
+
+// runs work(i) for i in [0, n), each on its own thread
+template <typename F>
+void run_parallel(unsigned int n, F work){
+    std::vector<std::thread> threads;
+    for(unsigned int i = 1; i < n; i++)
+        threads.push_back(std::thread(work, i));
+    work(0);
+    for(unsigned int i = 0; i < threads.size(); i++)
+        threads[i].join();
+}
+
+// The OBJ lines of one chunk of the file. Corners are 0-based indices,
+// apart from relative (negative) references - these are resolved against
+// the points and tcoords read so far in the chunk, and listed so that the
+// counts of earlier chunks can be added once they are known.
+struct ObjChunk{
+    std::vector<float> points;
+    std::vector<float> tcoords;
+    std::vector<unsigned char> face_sizes;
+    std::vector<int64_t> corners;
+    std::vector<int64_t> tcoord_corners;
+    std::vector<size_t> relative_corners;
+    std::vector<size_t> relative_tcoord_corners;
+    // object and group lines, and whether one came after a face
+    unsigned int n_names;
+    bool name_after_face;
+    std::string name;
+
+    ObjChunk() : n_names(0), name_after_face(false) {}
+};
+
+// the values of a vertex of a PLY file that we keep
+struct PlyVertexLayout{
+    // the property index of x, y, z, u and v (-1 if missing)
+    int properties[5];
+    bool has_tcoords;
+};
+
+struct PlyProperty{
+    std::string name;
+    PlyType type;
+    // the type of the length of a list property, PLY_UNKNOWN otherwise
+    PlyType count_type;
+};
+
+struct PlyElement{
+    std::string name;
+    size_t count;
+    std::vector<PlyProperty> properties;
+};
+
+// a single weld key - the bits of a position and texture coordinate
+struct WeldKey{
+    float values[5];
+
+    bool operator==(const WeldKey& other) const {
+        return std::memcmp(values, other.values, sizeof(values)) == 0;
+    }
+};
+
+struct WeldKeyHash{
+    size_t operator()(const WeldKey& key) const {
+        const unsigned char* bytes = (const unsigned char*) key.values;
+        uint64_t hash = FNV1A_OFFSET_BASIS;
+        for(unsigned int i = 0; i < sizeof(key.values); i++)
+            hash = (hash ^ bytes[i]) * FNV1A_PRIME;
+        return (size_t) hash;
+    }
+};
+
+
+// *************** MAPPED FILE *************** //
+
+MappedFile::MappedFile(std::string path){
+    p_data = NULL;
+    p_length = 0;
+    mapped = false;
+#ifndef _WIN32
+    int fd = open(path.c_str(), O_RDONLY);
+    if(fd >= 0) {
+        struct stat info;
+        if(fstat(fd, &info) == 0 && info.st_size > 0) {
+            void* data = mmap(NULL, info.st_size, PROT_READ, MAP_PRIVATE,
+                              fd, 0);
+            if(data != MAP_FAILED) {
+                madvise(data, info.st_size, MADV_WILLNEED);
+                p_data = (const char*) data;
+                p_length = info.st_size;
+                mapped = true;
+            }
+        }
+        close(fd);
+    }
+#endif
+    if(!mapped) {
+        std::ifstream file(path.c_str(), std::ios::binary);
+        buffer.assign(std::istreambuf_iterator<char>(file),
+                      std::istreambuf_iterator<char>());
+        p_data = buffer.empty() ? NULL : &buffer[0];
+        p_length = buffer.size();
+    }
+}
+
+MappedFile::~MappedFile(){
+#ifndef _WIN32
+    if(mapped)
+        munmap((void*) p_data, p_length);
+#endif
+}
+
+const char* MappedFile::data(){
+    return p_data;
+}
+
+size_t MappedFile::length(){
+    return p_length;
+}
+
+
+// *************** PARSED MESH *************** //
+
+aiScene* ParsedMesh::to_scene(){
+    /* Triangulates the polygons and welds their corners in to vertices the
+     * way assimp's post processing does - corners with identical values
+     * share a vertex, vertices are numbered by first use (or by point, if
+     * points_are_vertices) and triangles with two corners at the same
+     * position are dropped (with any vertex only they used). Returns NULL
+     * if no triangles are left.
+     */
+    bool has_tcoords = !tcoord_corners.empty();
+    unsigned int n_points = points.size() / 3;
+    unsigned int n_corners = corners.size();
+    std::unordered_map<WeldKey, unsigned int, WeldKeyHash> value_vertex;
+    value_vertex.reserve(n_points);
+    // the point and tcoord each vertex takes its values from
+    std::vector<unsigned int> source_points, source_tcoords;
+    // the vertex of a point and tcoord, welded by value
+    auto weld = [&](unsigned int point, unsigned int tcoord){
+        WeldKey key;
+        for(int c = 0; c < 3; c++)
+            // adding zero turns -0 in to 0
+            key.values[c] = points[3 * point + c] + 0.0f;
+        for(int c = 0; c < 2; c++)
+            key.values[3 + c] = has_tcoords ?
+                tcoords[2 * tcoord + c] + 0.0f : 0.0f;
+        std::pair<std::unordered_map<WeldKey, unsigned int,
+                                     WeldKeyHash>::iterator, bool> found =
+            value_vertex.insert(std::make_pair(key, source_points.size()));
+        if(found.second) {
+            source_points.push_back(point);
+            source_tcoords.push_back(tcoord);
+        }
+        return found.first->second;
+    };
+    std::vector<unsigned int> welded(n_corners);
+    if(points_are_vertices) {
+        std::vector<unsigned int> point_vertex(n_points);
+        for(unsigned int i = 0; i < n_points; i++)
+            point_vertex[i] = weld(i, i);
+        for(unsigned int i = 0; i < n_corners; i++)
+            welded[i] = point_vertex[corners[i]];
+    }
+    else {
+        // corners repeating an earlier (point, tcoord) pair skip the weld
+        std::unordered_map<uint64_t, unsigned int> pair_vertex;
+        pair_vertex.reserve(n_points);
+        std::vector<int> point_vertex;
+        if(!has_tcoords)
+            point_vertex.assign(n_points, -1);
+        for(unsigned int i = 0; i < n_corners; i++) {
+            unsigned int point = corners[i];
+            if(!has_tcoords) {
+                if(point_vertex[point] < 0)
+                    point_vertex[point] = weld(point, 0);
+                welded[i] = point_vertex[point];
+                continue;
+            }
+            uint64_t pair = ((uint64_t) point << 32) | tcoord_corners[i];
+            std::unordered_map<uint64_t, unsigned int>::iterator it =
+                pair_vertex.find(pair);
+            if(it == pair_vertex.end())
+                it = pair_vertex.insert(std::make_pair(
+                    pair, weld(point, tcoord_corners[i]))).first;
+            welded[i] = it->second;
+        }
+    }
+    // triangulate, dropping degenerate triangles
+    std::vector<unsigned int> triangles;
+    triangles.reserve(3 * face_sizes.size());
+    unsigned int corner = 0;
+    for(unsigned int f = 0; f < face_sizes.size(); f++) {
+        unsigned int n = face_sizes[f];
+        const unsigned int* polygon = &corners[corner];
+        const unsigned int* vertices = &welded[corner];
+        unsigned int start = n == 4 ? quad_start(&points[0], polygon) : 0;
+        for(unsigned int t = 0; t + 2 < n; t++) {
+            unsigned int indices[3] = {start, (start + t + 1) % n,
+                                       (start + t + 2) % n};
+            bool degenerate = false;
+            for(int a = 0; a < 3; a++) {
+                const float* p = &points[3 * polygon[indices[a]]];
+                const float* q = &points[3 * polygon[indices[(a + 1) % 3]]];
+                if(p[0] == q[0] && p[1] == q[1] && p[2] == q[2])
+                    degenerate = true;
+            }
+            if(degenerate)
+                continue;
+            for(int a = 0; a < 3; a++)
+                triangles.push_back(vertices[indices[a]]);
+        }
+        corner += n;
+    }
+    if(triangles.empty())
+        return NULL;
+    // keep only the vertices of the triangles left, in the same order
+    unsigned int n_welded = source_points.size();
+    std::vector<int> new_index(n_welded, -1);
+    for(unsigned int i = 0; i < triangles.size(); i++)
+        new_index[triangles[i]] = 0;
+    unsigned int n_vertices = 0;
+    for(unsigned int v = 0; v < n_welded; v++) {
+        if(new_index[v] == 0)
+            new_index[v] = n_vertices++;
+    }
+    aiMesh* mesh = new aiMesh();
+    mesh->mName.Set(name);
+    mesh->mPrimitiveTypes = aiPrimitiveType_TRIANGLE;
+    mesh->mMaterialIndex = 0;
+    mesh->mNumVertices = n_vertices;
+    mesh->mVertices = new aiVector3D[n_vertices];
+    if(has_tcoords) {
+        mesh->mTextureCoords[0] = new aiVector3D[n_vertices];
+        mesh->mNumUVComponents[0] = 2;
+    }
+    for(unsigned int v = 0; v < n_welded; v++) {
+        if(new_index[v] < 0)
+            continue;
+        const float* p = &points[3 * source_points[v]];
+        mesh->mVertices[new_index[v]] = aiVector3D(p[0], p[1], p[2]);
+        if(has_tcoords) {
+            const float* uv = &tcoords[2 * source_tcoords[v]];
+            mesh->mTextureCoords[0][new_index[v]] = aiVector3D(uv[0], uv[1],
+                                                               0);
+        }
+    }
+    unsigned int n_tris = triangles.size() / 3;
+    mesh->mNumFaces = n_tris;
+    mesh->mFaces = new aiFace[n_tris];
+    for(unsigned int t = 0; t < n_tris; t++) {
+        aiFace& face = mesh->mFaces[t];
+        face.mNumIndices = 3;
+        face.mIndices = new unsigned int[3];
+        for(int a = 0; a < 3; a++)
+            face.mIndices[a] = new_index[triangles[3*t + a]];
+    }
+    aiScene* scene = new aiScene();
+    scene->mNumMeshes = 1;
+    scene->mMeshes = new aiMesh*[1];
+    scene->mMeshes[0] = mesh;
+    scene->mNumMaterials = 1;
+    scene->mMaterials = new aiMaterial*[1];
+    scene->mMaterials[0] = new aiMaterial();
+    scene->mRootNode = new aiNode();
+    scene->mRootNode->mNumMeshes = 1;
+    scene->mRootNode->mMeshes = new unsigned int[1];
+    scene->mRootNode->mMeshes[0] = 0;
+    return scene;
+}
+
+
+// *************** FAST PARSERS *************** //
+
+void push_corner(std::vector<int64_t>& corners, std::vector<size_t>& relative,
+                 int64_t reference, size_t n_read){
+    // OBJ indices count from 1, or back from the last element read if < 0
+    if(reference > 0) {
+        corners.push_back(reference - 1);
+    }
+    else {
+        relative.push_back(corners.size());
+        corners.push_back((int64_t) n_read + reference);
+    }
+}
+
+bool parse_obj_chunk(const char* begin, const char* end, ObjChunk& chunk){
+    const char* next;
+    for(const char* line = begin; line < end; line = next) {
+        next = next_line(line, end);
+        const char* p = skip_spaces(line, next);
+        if(at_line_end(p, next))
+            continue;
+        const char* word = p;
+        while(p < next && !is_space(*p))
+            p++;
+        std::string keyword(word, p - word);
+        if(keyword == "v" || keyword == "vt") {
+            bool is_point = keyword == "v";
+            unsigned int n_values = is_point ? 3 : 2;
+            std::vector<float>& values = is_point ? chunk.points
+                                                  : chunk.tcoords;
+            for(unsigned int i = 0; i < n_values; i++) {
+                double value;
+                p = skip_spaces(p, next);
+                if(!parse_double(p, next, value))
+                    return false;
+                values.push_back((float) value);
+            }
+            p = skip_spaces(p, next);
+            // a w coordinate of a texture coordinate is ignored, but the w
+            // or colour of a point is more than we support
+            if(!is_point && !at_line_end(p, next)) {
+                double w;
+                if(!parse_double(p, next, w))
+                    return false;
+                p = skip_spaces(p, next);
+            }
+            if(!at_line_end(p, next))
+                return false;
+        }
+        else if(keyword == "f") {
+            unsigned int n_corners = 0;
+            size_t n_points = chunk.points.size() / 3;
+            size_t n_tcoords = chunk.tcoords.size() / 2;
+            while(true) {
+                p = skip_spaces(p, next);
+                if(at_line_end(p, next))
+                    break;
+                int64_t reference;
+                if(!parse_integer(p, next, reference) || reference == 0)
+                    return false;
+                push_corner(chunk.corners, chunk.relative_corners, reference,
+                            n_points);
+                if(p < next && *p == '/') {
+                    p++;
+                    if(p < next && *p != '/') {
+                        if(!parse_integer(p, next, reference) ||
+                           reference == 0)
+                            return false;
+                        push_corner(chunk.tcoord_corners,
+                                    chunk.relative_tcoord_corners,
+                                    reference, n_tcoords);
+                    }
+                    // normals are stripped from every scene
+                    if(p < next && *p == '/') {
+                        p++;
+                        if(!parse_integer(p, next, reference))
+                            return false;
+                    }
+                }
+                if(p < next && !is_space(*p))
+                    return false;
+                n_corners++;
+            }
+            // lines and points, and polygons assimp would ear clip, are
+            // left to assimp
+            if(n_corners < 3 || n_corners > 4)
+                return false;
+            chunk.face_sizes.push_back(n_corners);
+        }
+        else if(keyword == "o" || keyword == "g") {
+            p = skip_spaces(p, next);
+            const char* name_end = next;
+            while(name_end > p && is_space(name_end[-1]))
+                name_end--;
+            if(name_end == p)
+                return false;
+            chunk.name = std::string(p, name_end - p);
+            chunk.n_names++;
+            if(!chunk.face_sizes.empty())
+                chunk.name_after_face = true;
+        }
+        else if(keyword != "vn" && keyword != "s") {
+            // materials, curves, free-form geometry... are left to assimp
+            return false;
+        }
+    }
+    return true;
+}
+
+bool parse_obj(const char* begin, const char* end, unsigned int n_threads,
+               ParsedMesh& mesh){
+    /* Reads an OBJ file of a single object with points, texture
+     * coordinates and triangle or quad faces (normals, which are stripped
+     * anyway, and smoothing groups are skipped). The file is split in to
+     * chunks of whole lines, parsed in parallel and joined in order.
+     */
+    std::vector<const char*> bounds;
+    split_lines(begin, end, n_chunks_for(end - begin, n_threads), bounds);
+    unsigned int n_chunks = bounds.size() - 1;
+    std::vector<ObjChunk> chunks(n_chunks);
+    std::vector<char> parsed(n_chunks);
+    run_parallel(n_chunks, [&](unsigned int i){
+        parsed[i] = parse_obj_chunk(bounds[i], bounds[i + 1], chunks[i]);
+    });
+    // a single name is allowed, before any face - more would make assimp
+    // split the mesh
+    size_t n_points = 0, n_tcoords = 0, n_corners = 0, n_tcoord_corners = 0;
+    unsigned int n_names = 0;
+    bool seen_face = false;
+    mesh.name = OBJ_DEFAULT_NAME;
+    mesh.points_are_vertices = false;
+    for(unsigned int i = 0; i < n_chunks; i++) {
+        ObjChunk& chunk = chunks[i];
+        if(!parsed[i])
+            return false;
+        if(chunk.n_names) {
+            if(seen_face || chunk.name_after_face)
+                return false;
+            mesh.name = chunk.name;
+        }
+        n_names += chunk.n_names;
+        seen_face = seen_face || !chunk.face_sizes.empty();
+        n_points += chunk.points.size() / 3;
+        n_tcoords += chunk.tcoords.size() / 2;
+        n_corners += chunk.corners.size();
+        n_tcoord_corners += chunk.tcoord_corners.size();
+    }
+    // every corner must have a texture coordinate, or none
+    if(n_names > 1 || !seen_face ||
+       (n_tcoord_corners && n_tcoord_corners != n_corners))
+        return false;
+    mesh.points.reserve(3 * n_points);
+    mesh.corners.reserve(n_corners);
+    if(n_tcoord_corners) {
+        mesh.tcoords.reserve(2 * n_tcoords);
+        mesh.tcoord_corners.reserve(n_corners);
+    }
+    int64_t point_offset = 0, tcoord_offset = 0;
+    for(unsigned int i = 0; i < n_chunks; i++) {
+        ObjChunk& chunk = chunks[i];
+        for(size_t j = 0; j < chunk.relative_corners.size(); j++)
+            chunk.corners[chunk.relative_corners[j]] += point_offset;
+        for(size_t j = 0; j < chunk.relative_tcoord_corners.size(); j++)
+            chunk.tcoord_corners[chunk.relative_tcoord_corners[j]] +=
+                tcoord_offset;
+        for(size_t j = 0; j < chunk.corners.size(); j++) {
+            if(chunk.corners[j] < 0 || chunk.corners[j] >= (int64_t) n_points)
+                return false;
+            mesh.corners.push_back(chunk.corners[j]);
+        }
+        if(n_tcoord_corners) {
+            for(size_t j = 0; j < chunk.tcoord_corners.size(); j++) {
+                if(chunk.tcoord_corners[j] < 0 ||
+                   chunk.tcoord_corners[j] >= (int64_t) n_tcoords)
+                    return false;
+                mesh.tcoord_corners.push_back(chunk.tcoord_corners[j]);
+            }
+            mesh.tcoords.insert(mesh.tcoords.end(), chunk.tcoords.begin(),
+                                chunk.tcoords.end());
+        }
+        mesh.points.insert(mesh.points.end(), chunk.points.begin(),
+                           chunk.points.end());
+        mesh.face_sizes.insert(mesh.face_sizes.end(),
+                               chunk.face_sizes.begin(),
+                               chunk.face_sizes.end());
+        point_offset += chunk.points.size() / 3;
+        tcoord_offset += chunk.tcoords.size() / 2;
+        // free each chunk as soon as it is copied
+        chunk = ObjChunk();
+    }
+    return true;
+}
+
+PlyType ply_type(const std::string& name){
+    for(int i = 0; i < PLY_UNKNOWN; i++) {
+        if(name == PLY_TYPE_NAMES[i] || name == PLY_SIZED_TYPE_NAMES[i])
+            return (PlyType) i;
+    }
+    return PLY_UNKNOWN;
+}
+
+double read_ply_value(const char* p, PlyType type, bool swap){
+    // a binary value, byte swapped if the file's endianness isn't ours
+    char bytes[8];
+    unsigned int size = PLY_TYPE_SIZES[type];
+    for(unsigned int i = 0; i < size; i++)
+        bytes[i] = swap ? p[size - 1 - i] : p[i];
+    switch(type) {
+        case PLY_INT8: { int8_t v; std::memcpy(&v, bytes, 1); return v; }
+        case PLY_UINT8: { uint8_t v; std::memcpy(&v, bytes, 1); return v; }
+        case PLY_INT16: { int16_t v; std::memcpy(&v, bytes, 2); return v; }
+        case PLY_UINT16: { uint16_t v; std::memcpy(&v, bytes, 2); return v; }
+        case PLY_INT32: { int32_t v; std::memcpy(&v, bytes, 4); return v; }
+        case PLY_UINT32: { uint32_t v; std::memcpy(&v, bytes, 4); return v; }
+        case PLY_FLOAT32: { float v; std::memcpy(&v, bytes, 4); return v; }
+        case PLY_FLOAT64: { double v; std::memcpy(&v, bytes, 8); return v; }
+        default: return 0;
+    }
+}
+
+bool parse_ply_header(const char*& p, const char* end, std::string& format,
+                      std::vector<PlyElement>& elements){
+    const char* next;
+    bool first = true;
+    for(; p < end; p = next) {
+        next = next_line(p, end);
+        std::vector<std::string> words;
+        const char* q = skip_spaces(p, next);
+        while(q < next && *q != '\n') {
+            const char* word = q;
+            while(q < next && !is_space(*q))
+                q++;
+            words.push_back(std::string(word, q - word));
+            q = skip_spaces(q, next);
+        }
+        if(first) {
+            if(words.size() != 1 || words[0] != "ply")
+                return false;
+            first = false;
+        }
+        else if(words.empty() || words[0] == "comment" ||
+                words[0] == "obj_info") {
+            continue;
+        }
+        else if(words[0] == "format" && words.size() == 3) {
+            format = words[1];
+        }
+        else if(words[0] == "element" && words.size() == 3) {
+            PlyElement element;
+            element.name = words[1];
+            element.count = std::strtoul(words[2].c_str(), NULL, 10);
+            elements.push_back(element);
+        }
+        else if(words[0] == "property" && !elements.empty()) {
+            PlyProperty property;
+            if(words.size() == 5 && words[1] == "list") {
+                property.count_type = ply_type(words[2]);
+                property.type = ply_type(words[3]);
+                property.name = words[4];
+                if(property.count_type == PLY_UNKNOWN)
+                    return false;
+            }
+            else if(words.size() == 3) {
+                property.count_type = PLY_UNKNOWN;
+                property.type = ply_type(words[1]);
+                property.name = words[2];
+            }
+            else {
+                return false;
+            }
+            if(property.type == PLY_UNKNOWN)
+                return false;
+            elements.back().properties.push_back(property);
+        }
+        else if(words[0] == "end_header" && words.size() == 1) {
+            p = next;
+            return true;
+        }
+        else {
+            return false;
+        }
+    }
+    return false;
+}
+
+bool ply_vertex_layout(const PlyElement& vertex, PlyVertexLayout& layout){
+    // only positions, texture coordinates and (skipped) normals are
+    // supported - colours and anything else are left to assimp
+    for(int i = 0; i < 5; i++)
+        layout.properties[i] = -1;
+    const char* xyz[] = {"x", "y", "z"};
+    for(unsigned int i = 0; i < vertex.properties.size(); i++) {
+        const PlyProperty& property = vertex.properties[i];
+        if(property.count_type != PLY_UNKNOWN)
+            return false;
+        bool known = property.name == "nx" || property.name == "ny" ||
+                     property.name == "nz";
+        for(int c = 0; c < 3; c++) {
+            if(property.name == xyz[c]) {
+                layout.properties[c] = i;
+                known = true;
+            }
+        }
+        for(unsigned int n = 0; n < N_PLY_TCOORD_NAMES; n++) {
+            for(int c = 0; c < 2; c++) {
+                if(property.name == PLY_TCOORD_NAMES[n][c]) {
+                    if(layout.properties[3 + c] >= 0)
+                        return false;
+                    layout.properties[3 + c] = i;
+                    known = true;
+                }
+            }
+        }
+        if(!known)
+            return false;
+    }
+    if(layout.properties[0] < 0 || layout.properties[1] < 0 ||
+       layout.properties[2] < 0)
+        return false;
+    if((layout.properties[3] < 0) != (layout.properties[4] < 0))
+        return false;
+    layout.has_tcoords = layout.properties[3] >= 0;
+    return true;
+}
+
+void keep_ply_vertex(const double* values, const PlyVertexLayout& layout,
+                     ParsedMesh& mesh){
+    for(int c = 0; c < 3; c++)
+        mesh.points.push_back((float) values[layout.properties[c]]);
+    if(layout.has_tcoords) {
+        for(int c = 3; c < 5; c++)
+            mesh.tcoords.push_back((float) values[layout.properties[c]]);
+    }
+}
+
+bool parse_binary_ply(const char* p, const char* end, bool swap,
+                      const PlyElement& vertex, const PlyElement& face,
+                      const PlyVertexLayout& layout, ParsedMesh& mesh){
+    size_t n_properties = vertex.properties.size();
+    std::vector<unsigned int> offsets(n_properties);
+    size_t stride = 0;
+    for(size_t i = 0; i < n_properties; i++) {
+        offsets[i] = stride;
+        stride += PLY_TYPE_SIZES[vertex.properties[i].type];
+    }
+    if((size_t) (end - p) / stride < vertex.count)
+        return false;
+    std::vector<double> values(n_properties);
+    for(size_t v = 0; v < vertex.count; v++, p += stride) {
+        for(size_t i = 0; i < n_properties; i++)
+            values[i] = read_ply_value(p + offsets[i],
+                                       vertex.properties[i].type, swap);
+        keep_ply_vertex(&values[0], layout, mesh);
+    }
+    const PlyProperty& indices = face.properties[0];
+    unsigned int count_size = PLY_TYPE_SIZES[indices.count_type];
+    unsigned int index_size = PLY_TYPE_SIZES[indices.type];
+    for(size_t f = 0; f < face.count; f++) {
+        if((size_t) (end - p) < count_size)
+            return false;
+        double n = read_ply_value(p, indices.count_type, swap);
+        p += count_size;
+        if((n != 3 && n != 4) || (size_t) (end - p) < n * index_size)
+            return false;
+        for(unsigned int c = 0; c < n; c++, p += index_size) {
+            double index = read_ply_value(p, indices.type, swap);
+            if(index < 0 || index >= vertex.count)
+                return false;
+            mesh.corners.push_back((unsigned int) index);
+        }
+        mesh.face_sizes.push_back((unsigned char) n);
+    }
+    return true;
+}
+
+bool parse_ascii_ply_vertices(const char* begin, const char* end,
+                              unsigned int n_properties,
+                              const PlyVertexLayout& layout,
+                              ParsedMesh& chunk){
+    std::vector<double> values(n_properties);
+    const char* next;
+    for(const char* line = begin; line < end; line = next) {
+        next = next_line(line, end);
+        const char* p = line;
+        for(unsigned int i = 0; i < n_properties; i++) {
+            p = skip_spaces(p, next);
+            if(!parse_double(p, next, values[i]))
+                return false;
+        }
+        if(!at_newline(skip_spaces(p, next), next))
+            return false;
+        keep_ply_vertex(&values[0], layout, chunk);
+    }
+    return true;
+}
+
+bool parse_ascii_ply_faces(const char* begin, const char* end,
+                           size_t n_points, ParsedMesh& chunk){
+    const char* next;
+    for(const char* line = begin; line < end; line = next) {
+        next = next_line(line, end);
+        const char* p = skip_spaces(line, next);
+        // blank lines may trail the faces
+        if(at_newline(p, next))
+            continue;
+        int64_t n, index;
+        if(!parse_integer(p, next, n) || (n != 3 && n != 4))
+            return false;
+        for(int64_t c = 0; c < n; c++) {
+            p = skip_spaces(p, next);
+            if(!parse_integer(p, next, index) || index < 0 ||
+               index >= (int64_t) n_points)
+                return false;
+            chunk.corners.push_back((unsigned int) index);
+        }
+        if(!at_newline(skip_spaces(p, next), next))
+            return false;
+        chunk.face_sizes.push_back((unsigned char) n);
+    }
+    return true;
+}
+
+bool parse_ascii_ply(const char* p, const char* end, unsigned int n_threads,
+                     const PlyElement& vertex, const PlyElement& face,
+                     const PlyVertexLayout& layout, ParsedMesh& mesh){
+    /* Each section is split in to chunks of whole lines, parsed in
+     * parallel and joined in order.
+     */
+    const char* faces_begin = p;
+    for(size_t v = 0; v < vertex.count; v++) {
+        if(faces_begin == end)
+            return false;
+        faces_begin = next_line(faces_begin, end);
+    }
+    const char* sections[] = {p, faces_begin, end};
+    for(int s = 0; s < 2; s++) {
+        std::vector<const char*> bounds;
+        split_lines(sections[s], sections[s + 1],
+                    n_chunks_for(sections[s + 1] - sections[s], n_threads),
+                    bounds);
+        unsigned int n_chunks = bounds.size() - 1;
+        std::vector<ParsedMesh> chunks(n_chunks);
+        std::vector<char> parsed(n_chunks);
+        run_parallel(n_chunks, [&](unsigned int i){
+            if(s == 0)
+                parsed[i] = parse_ascii_ply_vertices(
+                    bounds[i], bounds[i + 1], vertex.properties.size(),
+                    layout, chunks[i]);
+            else
+                parsed[i] = parse_ascii_ply_faces(bounds[i], bounds[i + 1],
+                                                  vertex.count, chunks[i]);
+        });
+        for(unsigned int i = 0; i < n_chunks; i++) {
+            ParsedMesh& chunk = chunks[i];
+            if(!parsed[i])
+                return false;
+            mesh.points.insert(mesh.points.end(), chunk.points.begin(),
+                               chunk.points.end());
+            mesh.tcoords.insert(mesh.tcoords.end(), chunk.tcoords.begin(),
+                                chunk.tcoords.end());
+            mesh.corners.insert(mesh.corners.end(), chunk.corners.begin(),
+                                chunk.corners.end());
+            mesh.face_sizes.insert(mesh.face_sizes.end(),
+                                   chunk.face_sizes.begin(),
+                                   chunk.face_sizes.end());
+        }
+    }
+    return mesh.face_sizes.size() == face.count;
+}
+
+bool parse_ply(const char* begin, const char* end, unsigned int n_threads,
+               ParsedMesh& mesh){
+    /* Reads an ASCII or binary PLY file of vertices (with positions,
+     * texture coordinates and skipped normals) followed by triangle or quad
+     * faces - anything else is left to assimp.
+     */
+    const char* p = begin;
+    std::string format;
+    std::vector<PlyElement> elements;
+    if(!parse_ply_header(p, end, format, elements))
+        return false;
+    if(elements.size() != 2 || elements[0].name != "vertex" ||
+       elements[1].name != "face" || elements[1].count == 0)
+        return false;
+    const PlyElement& vertex = elements[0];
+    const PlyElement& face = elements[1];
+    PlyVertexLayout layout;
+    if(!ply_vertex_layout(vertex, layout))
+        return false;
+    if(face.properties.size() != 1 ||
+       face.properties[0].count_type == PLY_UNKNOWN ||
+       face.properties[0].type >= PLY_FLOAT32 ||
+       (face.properties[0].name != "vertex_indices" &&
+        face.properties[0].name != "vertex_index"))
+        return false;
+    mesh.name = "";
+    mesh.points_are_vertices = true;
+    mesh.points.reserve(3 * vertex.count);
+    if(layout.has_tcoords)
+        mesh.tcoords.reserve(2 * vertex.count);
+    mesh.face_sizes.reserve(face.count);
+    mesh.corners.reserve(3 * face.count);
+    bool parsed;
+    if(format == "ascii") {
+        parsed = parse_ascii_ply(p, end, n_threads, vertex, face, layout,
+                                 mesh);
+    }
+    else if(format == "binary_little_endian" ||
+            format == "binary_big_endian") {
+        uint16_t one = 1;
+        bool little_endian = *((unsigned char*) &one) == 1;
+        bool swap = (format == "binary_little_endian") != little_endian;
+        parsed = parse_binary_ply(p, end, swap, vertex, face, layout, mesh);
+    }
+    else {
+        return false;
+    }
+    // the texture coordinates are per vertex
+    if(parsed && layout.has_tcoords)
+        mesh.tcoord_corners = mesh.corners;
+    return parsed;
+}
+
+aiScene* fast_parse(const char* data, size_t length, std::string format,
+                    unsigned int n_threads){
+    ParsedMesh mesh;
+    bool parsed = false;
+    if(!data || !length)
+        return NULL;
+    if(format == "obj")
+        parsed = parse_obj(data, data + length, n_threads, mesh);
+    else if(format == "ply")
+        parsed = parse_ply(data, data + length, n_threads, mesh);
+    if(!parsed)
+        return NULL;
+    return mesh.to_scene();
+}
+
+
+// *************** HELPER ROUTINES *************** //
+
+bool parse_double(const char*& p, const char* end, double& value){
+    /* Parses a decimal number, exactly when its mantissa and power of ten
+     * are both exactly representable (nearly always for mesh data), and
+     * with strtod otherwise.
+     */
+    const char* start = p;
+    bool negative = false;
+    if(p < end && (*p == '-' || *p == '+')) {
+        negative = *p == '-';
+        p++;
+    }
+    uint64_t mantissa = 0;
+    int exponent = 0;
+    unsigned int n_significant = 0;
+    bool any_digits = false;
+    for(; p < end && is_digit(*p); p++) {
+        mantissa = mantissa * 10 + (*p - '0');
+        n_significant += mantissa != 0;
+        any_digits = true;
+    }
+    if(p < end && *p == '.') {
+        for(p++; p < end && is_digit(*p); p++) {
+            mantissa = mantissa * 10 + (*p - '0');
+            n_significant += mantissa != 0;
+            exponent--;
+            any_digits = true;
+        }
+    }
+    bool exact = any_digits && n_significant <= 19;
+    if(exact && p < end && (*p == 'e' || *p == 'E')) {
+        p++;
+        bool negative_exponent = false;
+        if(p < end && (*p == '-' || *p == '+')) {
+            negative_exponent = *p == '-';
+            p++;
+        }
+        int power = 0;
+        exact = p < end && is_digit(*p);
+        for(; p < end && is_digit(*p); p++) {
+            if(power < 10000)
+                power = power * 10 + (*p - '0');
+        }
+        exponent += negative_exponent ? -power : power;
+    }
+    exact = exact && mantissa <= MAX_EXACT_MANTISSA &&
+            exponent >= -MAX_EXACT_POWER && exponent <= MAX_EXACT_POWER &&
+            (p == end || is_space(*p));
+    if(exact) {
+        value = exponent < 0 ? mantissa / EXACT_POWERS_OF_TEN[-exponent]
+                             : mantissa * EXACT_POWERS_OF_TEN[exponent];
+        if(negative)
+            value = -value;
+        return true;
+    }
+    // the slow path - strtod needs a terminated copy of the token
+    char token[64];
+    size_t n = 0;
+    while(start + n < end && n < sizeof(token) - 1 && !is_space(start[n])) {
+        token[n] = start[n];
+        n++;
+    }
+    token[n] = '\0';
+    char* stop;
+    value = std::strtod(token, &stop);
+    p = start + (stop - token);
+    return stop != token;
+}
+
+bool parse_integer(const char*& p, const char* end, int64_t& value){
+    bool negative = false;
+    if(p < end && (*p == '-' || *p == '+')) {
+        negative = *p == '-';
+        p++;
+    }
+    unsigned int n_digits = 0;
+    value = 0;
+    for(; p < end && is_digit(*p); p++, n_digits++)
+        value = value * 10 + (*p - '0');
+    if(negative)
+        value = -value;
+    return n_digits > 0 && n_digits < 19;
+}
+
+const char* skip_spaces(const char* p, const char* end){
+    // skips spaces within a line - never the newline that ends it
+    while(p < end && (*p == ' ' || *p == '\t' || *p == '\r'))
+        p++;
+    return p;
+}
+
+const char* next_line(const char* p, const char* end){
+    const void* newline = std::memchr(p, '\n', end - p);
+    return newline ? (const char*) newline + 1 : end;
+}
+
+void split_lines(const char* begin, const char* end, unsigned int n_chunks,
+                 std::vector<const char*>& bounds){
+    // n_chunks + 1 bounds of (up to) n_chunks runs of whole lines
+    bounds.push_back(begin);
+    for(unsigned int i = 1; i < n_chunks; i++) {
+        const char* p = begin + (end - begin) / n_chunks * i;
+        if(p <= bounds.back())
+            continue;
+        // the start of the line that p is in, or the next if p starts one
+        p = next_line(p - 1, end);
+        if(p > bounds.back() && p < end)
+            bounds.push_back(p);
+    }
+    bounds.push_back(end);
+}
+
+unsigned int n_chunks_for(size_t length, unsigned int n_threads){
+    // n_threads = 0 uses every core
+    if(n_threads == 0)
+        n_threads = std::thread::hardware_concurrency();
+    size_t n_chunks = length / FAST_PARSE_MIN_CHUNK;
+    if(n_chunks > n_threads)
+        n_chunks = n_threads;
+    return n_chunks > 1 ? n_chunks : 1;
+}
+
+unsigned int quad_start(const float* points, const unsigned int* quad){
+    /* The corner a quad is fanned from, as assimp's triangulation picks
+     * it - the concave corner if there is one, so that both triangles lie
+     * within the quad.
+     */
+    for(unsigned int i = 0; i < 4; i++) {
+        const float* v = points + 3 * quad[i];
+        float edges[3][3];
+        for(int e = 0; e < 3; e++) {
+            const float* other = points + 3 * quad[(i + 3 - e) % 4];
+            float length = 0;
+            for(int c = 0; c < 3; c++) {
+                edges[e][c] = other[c] - v[c];
+                length += edges[e][c] * edges[e][c];
+            }
+            length = std::sqrt(length);
+            if(length > 0) {
+                for(int c = 0; c < 3; c++)
+                    edges[e][c] /= length;
+            }
+        }
+        // the angles between the diagonal and either side
+        float left = 0, right = 0;
+        for(int c = 0; c < 3; c++) {
+            left += edges[0][c] * edges[1][c];
+            right += edges[2][c] * edges[1][c];
+        }
+        if(std::acos(left) + std::acos(right) > AI_MATH_PI_F)
+            return i;
+    }
+    return 0;
+}
@@ -0,0 +1,76 @@
+#pragma once
+
+#include <string>
+#include <vector>
+#include <stddef.h>
+#include <stdint.h>
+
+// ASCII files are split in to chunks of at least this many bytes, one per
+// thread
+const size_t FAST_PARSE_MIN_CHUNK = 1 << 20;
+
+// forward declarations
+struct aiScene;
+
+
+// *************** MAPPED FILE *************** //
+// The contents of a file, memory mapped where the platform allows.
+class MappedFile{
+    const char* p_data;
+    size_t p_length;
+    bool mapped;
+    // the fallback, if the file can't be mapped
+    std::vector<char> buffer;
+
+    public:
+    MappedFile(std::string path);
+    ~MappedFile();
+    const char* data();
+    size_t length();
+};
+
+
+// *************** PARSED MESH *************** //
+// A single polygon mesh as read by a fast parser, before it is triangulated
+// and its vertices are welded in to an aiScene.
+struct ParsedMesh{
+    std::string name;
+    // (n_points, 3) and (n_tcoords, 2)
+    std::vector<float> points;
+    std::vector<float> tcoords;
+    // the number of corners of each polygon (3 or 4)
+    std::vector<unsigned char> face_sizes;
+    // the point and (if there are tcoords) tcoord index of every corner
+    std::vector<unsigned int> corners;
+    std::vector<unsigned int> tcoord_corners;
+    // if the corners of each point (with its own tcoord) are one vertex,
+    // which assimp keeps in the order of the points - as for PLY
+    bool points_are_vertices;
+
+    ParsedMesh() : points_are_vertices(false) {}
+    aiScene* to_scene();
+};
+
+
+// *************** FAST PARSERS *************** //
+// Each reads a file of the simple kind it supports straight from memory,
+// returning false (without throwing) for anything else so that the caller
+// can fall back to assimp.
+bool parse_obj(const char* begin, const char* end, unsigned int n_threads,
+               ParsedMesh& mesh);
+bool parse_ply(const char* begin, const char* end, unsigned int n_threads,
+               ParsedMesh& mesh);
+// dispatches on format ("obj" or "ply") - NULL if the file isn't supported
+aiScene* fast_parse(const char* data, size_t length, std::string format,
+                    unsigned int n_threads);
+
+
+// *************** HELPER ROUTINES *************** //
+bool parse_double(const char*& p, const char* end, double& value);
+bool parse_integer(const char*& p, const char* end, int64_t& value);
+const char* skip_spaces(const char* p, const char* end);
+const char* next_line(const char* p, const char* end);
+void split_lines(const char* begin, const char* end, unsigned int n_chunks,
+                 std::vector<const char*>& bounds);
+unsigned int n_chunks_for(size_t length, unsigned int n_threads);
+unsigned int quad_start(const float* points, const unsigned int* quad);
@@ -0,0 +1,108 @@
+#include <cmath>
+#include <vector>
+#include <stddef.h>
+#include "normals.h"
+
+template <typename T>
+void normalize_rows(const double* vectors, unsigned int n, T* unit){
+    // unit may be vectors itself - rows of zero length are left as they are
+    for(unsigned int i = 0; i < n; i++) {
+        const double* v = vectors + 3*i;
+        double length = std::sqrt(v[0] * v[0] + v[1] * v[1] + v[2] * v[2]);
+        for(int c = 0; c < 3; c++)
+            unit[3*i + c] = (T) (length > 0 ? v[c] / length : v[c]);
+    }
+}
+
+double corner_angle(const double* p, const double* a, const double* b){
+    // the angle at p of the triangle (p, a, b)
+    double u[3], v[3], dot = 0, uu = 0, vv = 0;
+    for(int c = 0; c < 3; c++) {
+        u[c] = a[c] - p[c];
+        v[c] = b[c] - p[c];
+        dot += u[c] * v[c];
+        uu += u[c] * u[c];
+        vv += v[c] * v[c];
+    }
+    if(uu == 0 || vv == 0)
+        return 0;
+    double cosine = dot / std::sqrt(uu * vv);
+    return std::acos(cosine < -1 ? -1 : (cosine > 1 ? 1 : cosine));
+}
+
+template <typename T>
+void fused_normals(const double* points, unsigned int n_points,
+                   const unsigned int* trilist, unsigned int n_tris,
+                   int weighting, T* face_normals, double* sums,
+                   T* vertex_normals){
+    /* One pass over the triangles writes each (unit) face normal and adds
+     * its weighted contribution to the normals of its vertices in sums,
+     * which are then normalized in to vertex_normals (which may be sums).
+     * Faces and vertices of zero area give zero normals. The normals follow
+     * the winding of trilist.
+     */
+    for(unsigned int i = 0; i < 3 * n_points; i++)
+        sums[i] = 0;
+    for(unsigned int t = 0; t < n_tris; t++) {
+        const unsigned int* tri = trilist + 3*t;
+        const double* p0 = points + 3 * tri[0];
+        const double* p1 = points + 3 * tri[1];
+        const double* p2 = points + 3 * tri[2];
+        double e1[3], e2[3], n[3];
+        for(int c = 0; c < 3; c++) {
+            e1[c] = p1[c] - p0[c];
+            e2[c] = p2[c] - p0[c];
+        }
+        n[0] = e1[1] * e2[2] - e1[2] * e2[1];
+        n[1] = e1[2] * e2[0] - e1[0] * e2[2];
+        n[2] = e1[0] * e2[1] - e1[1] * e2[0];
+        // twice the area
+        double length = std::sqrt(n[0] * n[0] + n[1] * n[1] + n[2] * n[2]);
+        double unit[3] = {0, 0, 0};
+        if(length > 0) {
+            for(int c = 0; c < 3; c++)
+                unit[c] = n[c] / length;
+        }
+        for(int c = 0; c < 3; c++)
+            face_normals[3*t + c] = (T) unit[c];
+        double weights[3] = {1, 1, 1};
+        const double* n_weighted = unit;
+        if(weighting == WEIGHT_AREA) {
+            n_weighted = n;
+        }
+        else if(weighting == WEIGHT_ANGLE) {
+            weights[0] = corner_angle(p0, p1, p2);
+            weights[1] = corner_angle(p1, p2, p0);
+            weights[2] = corner_angle(p2, p0, p1);
+        }
+        for(int j = 0; j < 3; j++) {
+            double* vertex = sums + 3 * tri[j];
+            for(int c = 0; c < 3; c++)
+                vertex[c] += weights[j] * n_weighted[c];
+        }
+    }
+    normalize_rows(sums, n_points, vertex_normals);
+}
+
+
+// *************** NORMALS *************** //
+
+void compute_normals(const double* points, unsigned int n_points,
+                     const unsigned int* trilist, unsigned int n_tris,
+                     int weighting, double* face_normals,
+                     double* vertex_normals){
+    fused_normals(points, n_points, trilist, n_tris, weighting,
+                  face_normals, vertex_normals, vertex_normals);
+}
+
+void compute_normals(const double* points, unsigned int n_points,
+                     const unsigned int* trilist, unsigned int n_tris,
+                     int weighting, float* face_normals,
+                     float* vertex_normals){
+    // the sums are kept in double, so that high valence vertices don't lose
+    // precision, and only rounded to float once normalized
+    std::vector<double> sums(3 * n_points);
+    fused_normals(points, n_points, trilist, n_tris, weighting,
+                  face_normals, sums.empty() ? NULL : &sums[0],
+                  vertex_normals);
+}
@@ -0,0 +1,23 @@
+#pragma once
+
+// how the faces around a vertex are weighted in its normal
+enum NormalWeighting{
+    WEIGHT_AREA = 0,
+    WEIGHT_ANGLE = 1,
+    WEIGHT_UNIFORM = 2
+};
+
+
+// *************** NORMALS *************** //
+void compute_normals(const double* points, unsigned int n_points,
+                     const unsigned int* trilist, unsigned int n_tris,
+                     int weighting, double* face_normals,
+                     double* vertex_normals);
+void compute_normals(const double* points, unsigned int n_points,
+                     const unsigned int* trilist, unsigned int n_tris,
+                     int weighting, float* face_normals,
+                     float* vertex_normals);
+
+
+// *************** HELPER ROUTINES *************** //
+double corner_angle(const double* p, const double* a, const double* b);
@@ -1,27 +1,90 @@
 # see setup.py for libraries and ext_sources
 from libcpp.string cimport string
 from libcpp.vector cimport vector
+from libcpp.map cimport map
 from libcpp cimport bool
+from libc.stdint cimport uint64_t
+from libc.string cimport memcpy
+from cpython.buffer cimport PyBuffer_FillInfo
+from multiprocessing.pool import ThreadPool
+from functools import partial
+import os
+import sys
 import numpy as np
 cimport numpy as np
 
 libraries = ['cyassmp']
 
 # externally declare the C++ classes
-cdef extern from "./cpp/assimpwrapper.h":
+cdef extern from "./cpp/assimpwrapper.h" nogil:
 
     cdef string NO_TEXTURE_PATH
 
     cdef cppclass AssimpImporter:
+        AssimpImporter()
         AssimpImporter(string path) except +IOError
+        AssimpImporter(string path, bool post_process) except +IOError
+        void read_file(string path, bool post_process) except +IOError
+        void read_file(string path, bool post_process,
+                       string format) except +IOError
+        void read_memory(const unsigned char* buffer, size_t length,
+                         string hint, bool post_process) except +IOError
+        bool read_file_fast(string path, string format,
+                            unsigned int n_threads) except +IOError
+        bool read_memory_fast(const unsigned char* buffer, size_t length,
+                              string format,
+                              unsigned int n_threads) except +IOError
+        void cancel()
         AssimpScene* get_scene()
+        void keep_meshes(vector[unsigned int] indices) except +IOError
+        void keep_bone_weights()
+        void keep_animations()
+        bool supports_format(string format)
+        void keep_formats(vector[string] formats)
 
     cdef cppclass AssimpScene:
         vector[AssimpMesh*] meshes
+        vector[AssimpTexture*] embedded_textures
+        vector[AssimpAnimation*] animations
         unsigned int n_meshes()
         string texture_path()
+        void instances(vector[unsigned int]& mesh_indices,
+                       vector[double]& transforms)
+
+    cdef cppclass AssimpAnimation:
+        string name()
+        double duration()
+        double ticks_per_second()
+        unsigned int n_channels()
+        string channel_name(unsigned int channel)
+        unsigned int n_position_keys(unsigned int channel)
+        unsigned int n_rotation_keys(unsigned int channel)
+        unsigned int n_scaling_keys(unsigned int channel)
+        void position_keys(unsigned int channel, double* times,
+                           double* values)
+        void rotation_keys(unsigned int channel, double* times,
+                           double* values)
+        void scaling_keys(unsigned int channel, double* times,
+                          double* values)
+        void sample(unsigned int channel, const double* times,
+                    unsigned int n_times, double* positions,
+                    double* rotations, double* scales)
+
+    cdef cppclass AssimpTexture:
+        bool is_compressed()
+        unsigned int width()
+        unsigned int height()
+        unsigned int n_bytes()
+        const unsigned char* data()
+        string format_hint()
+        void rgba(unsigned char* rgba)
 
     cdef cppclass AssimpMesh:
+        vector[unsigned int] face_order
+        vector[unsigned int] vertex_order
+        string name()
+        unsigned int material_index()
+        map[string, vector[string]] textures()
         unsigned int n_points()
         unsigned int n_faces()
         unsigned int n_tcoord_sets()
@@ -29,9 +92,80 @@ cdef extern from "./cpp/assimpwrapper.h":
         bool is_trimesh()
         bool is_pointcloud()
         void points(double* points)
-        void trilist(unsigned int* trilist)
-        void tcoords(int index, double* tcoords)
+        void points(const double* transform, double* points)
+        void point_stats(const double* transform, double* points,
+                         double* stats)
+        void trilist(unsigned int* trilist, bool flip_winding)
+        void tcoords(int index, double* tcoords, bool flip_v)
         void colour_per_vertex(int index, double* colour_per_vertex)
+        void sample_texture(int index, const unsigned char* image,
+                            unsigned int height, unsigned int width,
+                            unsigned int n_channels,
+                            double* colour_per_vertex)
+        uint64_t topology_hash()
+        unsigned int n_bones()
+        unsigned int n_bone_weights()
+        string bone_name(unsigned int index)
+        void bone_offset_matrix(unsigned int index, double* matrix)
+        void skin_weights(int* indptr, int* indices, double* weights)
+        void optimize_locality()
+        void adjacency(vector[unsigned int]& edges,
+                       vector[int]& vertex_faces_indptr,
+                       vector[int]& vertex_faces,
+                       vector[int]& face_faces_indptr,
+                       vector[int]& face_faces)
+
+cdef extern from "./cpp/bvh.h" nogil:
+
+    cdef cppclass BVHTree:
+        vector[double] bounds
+        vector[int] info
+        vector[unsigned int] order
+
+    cdef cppclass AssimpBVH:
+        vector[double] points
+        vector[unsigned int] trilist
+        BVHTree triangles
+        BVHTree vertices
+        void build(AssimpMesh* mesh, const double* transform)
+        void build(const double* points, unsigned int n_points,
+                   const unsigned int* trilist, unsigned int n_tris)
+        unsigned int n_points()
+        unsigned int n_tris()
+        void closest_points(const double* queries, unsigned int n_queries,
+                            double* closest, double* distances,
+                            int* tri_indices)
+        void intersect_rays(const double* origins, const double* directions,
+                            unsigned int n_rays, double* distances,
+                            int* tri_indices, double* barycentric)
+        void nearest_points(const double* queries, unsigned int n_queries,
+                            unsigned int k, int* indices, double* distances)
+
+cdef extern from "./cpp/decimate.h" nogil:
+
+    cdef cppclass QuadricDecimator:
+        QuadricDecimator(AssimpMesh* mesh, const double* transform,
+                         bool flip_winding)
+        void simplify(unsigned int target_faces)
+        unsigned int n_points()
+        unsigned int n_faces()
+        void points(double* points)
+        void trilist(unsigned int* trilist)
+
+cdef extern from "./cpp/normals.h" nogil:
+
+    void c_compute_normals "compute_normals"(
+        const double* points, unsigned int n_points,
+        const unsigned int* trilist, unsigned int n_tris, int weighting,
+        double* face_normals, double* vertex_normals)
+    void c_compute_normals "compute_normals"(
+        const double* points, unsigned int n_points,
+        const unsigned int* trilist, unsigned int n_tris, int weighting,
+        float* face_normals, float* vertex_normals)
+
+# the ways the faces around a vertex can be weighted in its normal, as passed
+# to compute_normals
+NORMAL_WEIGHTINGS = {'area': 0, 'angle': 1, 'uniform': 2}
 
 cdef class AIImporter:
     r"""
@@ -41,26 +175,320 @@ cdef class AIImporter:
     ----------
     path : string
         Absolute file path of the mesh.
+    trilist_table : :class:`TrilistTable`, optional
+        If provided, the ``trilist`` of each mesh is interned in this table,
+        so meshes with identical topology share one read-only array.
+    mesh_filter : callable, optional
+        Called as ``mesh_filter(index, name, material_index)`` for each mesh
+        in the file, before any post processing. Only meshes for which it
+        returns ``True`` are processed and exposed, so unwanted meshes are
+        never triangulated, joined or copied. ``index`` is the position of
+        the mesh in the file.
+    transform : (4, 4) ndarray, optional
+        An affine transform applied to the points as they are copied out of
+        assimp, e.g. from :func:`axis_conversion` to swap axes or change
+        handedness. Its bottom row must be ``[0, 0, 0, 1]``. If it mirrors
+        the mesh, the winding of the triangle list is flipped so that faces
+        keep pointing outwards.
+    flip_v : bool, optional
+        If ``True``, texture coordinates are copied out as ``(u, 1 - v)``.
+    normalize : bool, optional
+        If ``True``, the points are centred on the middle of the bounding box
+        of all the triangle meshes and uniformly scaled so that its longest
+        side is 1 - before ``transform`` is applied. Costs one pass over the
+        points, but no copy.
+    bone_weights : bool, optional
+        If ``True``, the bones of meshes are kept, for
+        :attr:`AITriMeshImporter.skin_weights`. They are stripped otherwise.
+    animations : bool, optional
+        If ``True``, the animations of the scene are kept and appear in
+        :attr:`animations`. They are stripped otherwise.
+    bvh : bool, optional
+        If ``True``, :attr:`AITriMeshImporter.bvh` is built for every
+        triangle mesh by :meth:`build_scene`, rather than on first use.
+    lods : sequence of int, optional
+        Target face counts of levels of detail to build for every triangle
+        mesh during :meth:`build_scene` - see :attr:`AITriMeshImporter.lods`.
+    optimize_locality : bool, optional
+        If ``True``, the faces of every triangle mesh are reordered for the
+        vertex cache and the vertices by first use, so that gathers like
+        ``points[trilist]`` walk memory in order. Every array copied out
+        follows the new order - see :attr:`AITriMeshImporter.face_order` and
+        :attr:`AITriMeshImporter.vertex_order` to reorder other data.
+    adjacency : bool, optional
+        If ``True``, :attr:`AITriMeshImporter.adjacency` is built for every
+        triangle mesh by :meth:`build_scene`, rather than on first use.
+    fast_path : bool, optional
+        If ``True``, simple OBJ files (one object of points, texture
+        coordinates and triangle or quad faces) and ASCII or binary PLY
+        files (vertices and triangle or quad faces) are parsed by dedicated
+        C++ parsers instead of assimp - memory mapped and, for ASCII, split
+        across every core. The result is what assimp would build, a single
+        triangle mesh, but vertices are only welded when exactly identical
+        and values are correctly rounded (assimp's may differ in the last
+        bit).
+        Any other file, or one using features the parsers don't support
+        (materials, groups, colours...), falls back to assimp - see
+        :attr:`used_fast_path`. Ignored if ``mesh_filter`` is given.
+    format : string, optional
+        The format to read the file as, by extension (e.g. ``'ply'``),
+        whatever its own extension or contents - so files with nonstandard
+        extensions are handed straight to the right loader rather than
+        probed by every one.
+    formats : string or sequence of string, optional
+        The only formats, by extension, the importer may read. Loaders for
+        any other format are never tried, however a file is named.
+    stats : bool, optional
+        If ``True``, copying out :attr:`AITriMeshImporter.points` also
+        computes the mesh's ``bounds``, ``centroid`` and ``extents`` in the
+        same pass. Otherwise the copy does nothing more, and the statistics
+        take a pass of their own when first asked for.
     """
     cdef AssimpImporter* importer
     cdef AssimpScene* scene
     cdef public list meshes
+    cdef public list animations
     cdef bytes filepath
+    cdef object trilist_table
+    cdef object mesh_filter
+    cdef list _embedded_textures
+    # file contents to import from memory instead of filepath
+    cdef object data
+    cdef bytes hint
+    cdef object transform
+    cdef bint flip_v
+    cdef bint normalize
+    cdef bint bone_weights
+    cdef bint keep_animations
+    cdef bint build_bvh
+    cdef tuple lods
+    cdef bint optimize_locality
+    cdef bint build_adjacency
+    cdef bint fast_path
+    cdef bint point_stats
+    cdef bint _used_fast_path
+    cdef bytes format
+    cdef tuple formats
+    # the transform applied while copying points, after normalization
+    cdef np.ndarray _transform
+    cdef bint _flip_winding
 
-    def __cinit__(self, string path):
+    def __cinit__(self, string path, trilist_table=None, mesh_filter=None,
+                  transform=None, flip_v=False, normalize=False,
+                  bone_weights=False, animations=False, bvh=False,
+                  lods=None, optimize_locality=False, adjacency=False,
+                  fast_path=False, format=None, formats=None, stats=False):
         self.meshes = []
+        self.animations = []
         self.filepath = path
+        self.trilist_table = trilist_table
+        self.mesh_filter = mesh_filter
+        if transform is not None:
+            transform = np.array(transform, dtype=np.float64)
+            if transform.shape != (4, 4):
+                raise ValueError('transform must be a (4, 4) array')
+            # only the top three rows are applied to the points
+            if not np.array_equal(transform[3], [0, 0, 0, 1]):
+                raise ValueError('transform must be affine - its bottom row '
+                                 'must be [0, 0, 0, 1]')
+        self.transform = transform
+        self.flip_v = flip_v
+        self.normalize = normalize
+        self.bone_weights = bone_weights
+        self.importer = new AssimpImporter()
+        if bone_weights:
+            self.importer.keep_bone_weights()
+        self.keep_animations = animations
+        if animations:
+            self.importer.keep_animations()
+        self.build_bvh = bvh
+        self.lods = tuple(int(n_faces) for n_faces in (lods or ()))
+        if any(n_faces < 0 for n_faces in self.lods):
+            raise ValueError('LOD face counts must not be negative')
+        self.optimize_locality = optimize_locality
+        self.build_adjacency = adjacency
+        self.fast_path = fast_path
+        self.point_stats = stats
+        if formats is not None:
+            if isinstance(formats, (str, bytes)):
+                formats = (formats,)
+            self.formats = tuple(_format_name(f) for f in formats)
+            for name in self.formats:
+                if not self.importer.supports_format(name):
+                    raise ValueError('Unknown format {!r}'.format(
+                        name.decode('utf-8')))
+            self.importer.keep_formats(list(self.formats))
+        if format is not None:
+            self.format = _format_name(format)
+            if not self._allows_format(self.format):
+                raise ValueError('Format {!r} is not one of formats'.format(
+                    self.format.decode('utf-8')))
+            if not self.importer.supports_format(self.format):
+                raise ValueError('Unknown format {!r}'.format(
+                    self.format.decode('utf-8')))
+
+    @staticmethod
+    def from_memory(data, hint='', **kwargs):
+        r"""
+        An importer that reads the contents of a file from memory rather
+        than from disk.
+
+        Parameters
+        ----------
+        data : bytes-like
+            The contents of the file.
+        hint : string, optional
+            The extension of the file (e.g. ``'obj'``), used to pick the
+            loader. Needed for formats that can't be detected from their
+            contents. A ``format`` given in ``kwargs`` takes its place.
+        kwargs : dict, optional
+            Any other arguments of :class:`AIImporter`.
+
+        Returns
+        -------
+        importer : :class:`AIImporter`
+            The importer - call :meth:`build_scene` to import.
+        """
+        importer = AIImporter(b'', **kwargs)
+        importer.data = data
+        importer.hint = _encode_path(hint)
+        return importer
 
     def build_scene(self):
         r"""
         Builds the scene in assimp and creates a TriMesh importer for each
-        mesh.
+        mesh. The GIL is released while assimp parses the file. A scene can
+        only be built once per importer - create a new importer to read the
+        file again.
+
+        Raises
+        ------
+        RuntimeError
+            If the scene has already been built.
         """
-        self.importer = new AssimpImporter(self.filepath)
+        cdef string path = self.filepath
+        cdef string hint
+        cdef const unsigned char[::1] buffer
+        cdef bool post_process = self.mesh_filter is None
+        cdef AssimpImporter* importer = self.importer
+        cdef bool fast = self.fast_path and post_process
+        cdef bool read = False
+        cdef string format
+        cdef string forced = self.format or b''
+        if self.scene != NULL:
+            # a new scene would free the meshes the existing wrappers use
+            raise RuntimeError('The scene has already been built')
+        if self.data is not None:
+            buffer = np.frombuffer(self.data, dtype=np.uint8)
+            if buffer.shape[0] == 0:
+                raise IOError('Cannot import from an empty buffer')
+            hint = self.format or self.hint
+            format = _format_name(hint)
+            fast = fast and self._allows_format(format)
+            with nogil:
+                if fast:
+                    read = importer.read_memory_fast(&buffer[0],
+                                                     buffer.shape[0], format,
+                                                     0)
+                if not read:
+                    importer.read_memory(&buffer[0], buffer.shape[0], hint,
+                                         post_process)
+        else:
+            format = (self.format or
+                      _format_name(os.path.splitext(self.filepath)[1]))
+            fast = fast and self._allows_format(format)
+            with nogil:
+                if fast:
+                    read = importer.read_file_fast(path, format, 0)
+                if not read:
+                    importer.read_file(path, post_process, forced)
+        self._used_fast_path = read
         self.scene = self.importer.get_scene()
+        if not post_process:
+            self._filter_meshes()
+        cdef AssimpMesh* scene_mesh
+        cdef AITriMeshImporter mesh
         for i in range(self.n_meshes):
-            if self.scene.meshes[i].is_trimesh():
+            scene_mesh = self.scene.meshes[i]
+            if scene_mesh.is_trimesh():
+                if self.optimize_locality:
+                    with nogil:
+                        scene_mesh.optimize_locality()
                 self.meshes.append(AITriMeshImporter(self, i))
+        for i in range(self.scene.animations.size()):
+            self.animations.append(AIAnimationImporter(self, i))
+        self._prepare_transform()
+        if self.build_bvh:
+            for mesh in self.meshes:
+                mesh._ensure_bvh()
+        if self.lods:
+            for mesh in self.meshes:
+                mesh._ensure_lods()
+        if self.build_adjacency:
+            for mesh in self.meshes:
+                mesh._ensure_adjacency()
+
+    def _allows_format(self, format):
+        return self.formats is None or format in self.formats
+
+    cdef _prepare_transform(self):
+        # fold the normalization in to the user's transform, so that points
+        # are still only copied once
+        cdef np.ndarray[double, ndim=2, mode='c'] stats = np.empty([3, 3])
+        cdef AITriMeshImporter mesh
+        transform = self.transform
+        if self.normalize:
+            mins, maxs = [], []
+            for mesh in self.meshes:
+                if mesh.n_points:
+                    with nogil:
+                        mesh.thisptr.point_stats(NULL, NULL, &stats[0, 0])
+                    mins.append(stats[0].copy())
+                    maxs.append(stats[1].copy())
+            if mins:
+                lower, upper = np.min(mins, axis=0), np.max(maxs, axis=0)
+                extent = (upper - lower).max()
+                scale = 1.0 / extent if extent > 0 else 1.0
+                normalization = np.eye(4) * scale
+                normalization[3, 3] = 1
+                normalization[:3, 3] = -scale * (lower + upper) / 2
+                transform = (normalization if transform is None
+                             else transform.dot(normalization))
+        if transform is not None:
+            self._transform = np.ascontiguousarray(transform)
+            self._flip_winding = np.linalg.det(transform[:3, :3]) < 0
+
+    cdef _filter_meshes(self):
+        # decide on the raw scene which meshes survive, then post process
+        cdef vector[unsigned int] keep
+        cdef AssimpMesh* mesh
+        cdef AssimpImporter* importer = self.importer
+        for i in range(self.scene.n_meshes()):
+            mesh = self.scene.meshes[i]
+            if self.mesh_filter(i, mesh.name().decode('utf-8'),
+                                mesh.material_index()):
+                keep.push_back(i)
+        with nogil:
+            importer.keep_meshes(keep)
+        self.scene = importer.get_scene()
+
+    @property
+    def used_fast_path(self):
+        r"""
+        Whether :meth:`build_scene` read the file with a fast parser rather
+        than assimp - see ``fast_path``.
+
+        :type: bool
+        """
+        return self._used_fast_path
+
+    def cancel(self):
+        r"""
+        Abort :meth:`build_scene`, which may be running on another thread.
+        It raises ``IOError`` at assimp's next progress update. Once
+        cancelled, the importer can't be used again.
+        """
+        self.importer.cancel()
 
     def __dealloc__(self):
         del self.importer
@@ -86,6 +514,238 @@ cdef class AIImporter:
         else:
             return self.scene.texture_path()
 
+    def _point_stats(self):
+        # combine the statistics of the (non-empty) triangle meshes
+        meshes = [m for m in self.meshes if m.n_points]
+        if not meshes:
+            return np.full([3, 3], np.nan)
+        stats = np.array([m._point_stats() for m in meshes])
+        weights = np.array([m.n_points for m in meshes], dtype=np.float64)
+        return np.array([stats[:, 0].min(axis=0), stats[:, 1].max(axis=0),
+                         weights.dot(stats[:, 2]) / weights.sum()])
+
+    @property
+    def bounds(self):
+        r"""
+        The axis aligned bounding box of the points of every triangle mesh,
+        as its minimum and maximum corners (NaN if there are no points).
+
+        :type: (2, 3) double ndarray
+        """
+        return self._point_stats()[:2]
+
+    @property
+    def centroid(self):
+        r"""
+        The mean of the points of every triangle mesh (NaN if there are no
+        points).
+
+        :type: (3,) double ndarray
+        """
+        return self._point_stats()[2]
+
+    @property
+    def extents(self):
+        r"""
+        The size of the scene's bounding box along each axis.
+
+        :type: (3,) double ndarray
+        """
+        stats = self._point_stats()
+        return stats[1] - stats[0]
+
+    def _instances(self):
+        # the instances of triangle meshes, with world transforms that map
+        # the raw points of assimp (before self._transform)
+        cdef vector[unsigned int] scene_indices
+        cdef vector[double] scene_transforms
+        self.scene.instances(scene_indices, scene_transforms)
+        cdef Py_ssize_t n = scene_indices.size()
+        cdef np.ndarray[unsigned int, ndim=1, mode='c'] indices = \
+            np.empty(n, dtype=np.uint32)
+        cdef np.ndarray[double, ndim=3, mode='c'] transforms = \
+            np.empty([n, 4, 4])
+        if n:
+            memcpy(&indices[0], &scene_indices[0], n * sizeof(unsigned int))
+            memcpy(&transforms[0, 0, 0], &scene_transforms[0],
+                   n * 16 * sizeof(double))
+        # position of each scene mesh in self.meshes, -1 if not a trimesh
+        positions = np.full(self.n_meshes, -1, dtype=np.int64)
+        position = 0
+        for i in range(self.n_meshes):
+            if self.scene.meshes[i].is_trimesh():
+                positions[i] = position
+                position += 1
+        mesh_indices = positions[indices]
+        keep = mesh_indices >= 0
+        return mesh_indices[keep].astype(np.uint32), transforms[keep]
+
+    def instances(self):
+        r"""
+        Where the triangle meshes are placed by the scene graph.
+
+        Each mesh is imported (and in :attr:`meshes`) once, however many
+        nodes of the scene refer to it - rather than its geometry being
+        copied for every placement.
+
+        Returns
+        -------
+        mesh_indices : (``n_instances``,) uint32 ndarray
+            The index in to :attr:`meshes` of each instance.
+        transforms : (``n_instances``, 4, 4) double ndarray
+            The world transform of each instance, to be applied to the
+            ``points`` of its mesh. These already have the importer's
+            ``transform`` applied, so the world transforms are expressed in
+            the same frame.
+        """
+        mesh_indices, transforms = self._instances()
+        if self._transform is not None:
+            transforms = np.matmul(
+                np.matmul(self._transform, transforms),
+                np.linalg.inv(self._transform))
+        return mesh_indices, transforms
+
+    def flatten(self):
+        r"""
+        Bake the scene graph in to a single mesh, with a copy of the
+        geometry of every instance (see :meth:`instances`) placed by its
+        world transform.
+
+        The transforms are applied in C++ as the points are copied, with
+        the GIL released. Instances whose transform mirrors the mesh have
+        their winding flipped.
+
+        Returns
+        -------
+        points : (``n_points``, 3) c-contiguous double ndarray
+            The points of every instance, one after another.
+        trilist : (``n_tris``, 3) c-contiguous unsigned int ndarray
+            The triangles of every instance, indexing in to ``points``.
+        """
+        mesh_indices, transforms = self._instances()
+        if self._transform is not None:
+            transforms = np.matmul(self._transform, transforms)
+        transforms = np.ascontiguousarray(transforms)
+        cdef Py_ssize_t n = len(mesh_indices)
+        cdef vector[AssimpMesh*] meshes
+        cdef AITriMeshImporter mesh
+        for index in mesh_indices:
+            mesh = self.meshes[index]
+            meshes.push_back(mesh.thisptr)
+        n_points = np.array([m.n_points for m in self.meshes],
+                            dtype=np.int64)[mesh_indices]
+        n_tris = np.array([m.n_tris for m in self.meshes],
+                          dtype=np.int64)[mesh_indices]
+        if n_points.sum() > np.iinfo(np.uint32).max:
+            raise ValueError('The flattened scene has too many points to be '
+                             'indexed by an unsigned int trilist')
+        cdef np.ndarray[double, ndim=2, mode='c'] points = \
+            np.empty([n_points.sum(), 3])
+        cdef np.ndarray[unsigned int, ndim=2, mode='c'] trilist = \
+            np.empty([n_tris.sum(), 3], dtype=np.uint32)
+        cdef double[:, :, ::1] world = transforms
+        cdef unsigned char[::1] flip = np.ascontiguousarray(
+            np.linalg.det(transforms[:, :3, :3]) < 0, dtype=np.uint8)
+        cdef long long[::1] point_offsets = np.cumsum(n_points) - n_points
+        cdef long long[::1] tri_offsets = np.cumsum(n_tris) - n_tris
+        cdef Py_ssize_t i, j
+        cdef unsigned int* tris
+        with nogil:
+            for i in range(n):
+                if meshes[i].n_points():
+                    meshes[i].points(&world[i, 0, 0],
+                                     &points[point_offsets[i], 0])
+                if meshes[i].n_faces():
+                    tris = &trilist[tri_offsets[i], 0]
+                    meshes[i].trilist(tris, flip[i])
+                    for j in range(3 * meshes[i].n_faces()):
+                        tris[j] += point_offsets[i]
+        return points, trilist
+
+    @property
+    def embedded_textures(self):
+        r"""
+        The textures embedded in the file (e.g. FBX or GLB), in order, so
+        that the texture path ``'*N'`` refers to entry ``N``. Compressed
+        textures (PNG, JPEG, ...) are read-only memoryviews over the raw
+        bytes held by assimp - no copy is made. Uncompressed textures are
+        copied out as RGBA arrays.
+
+        :type: list of memoryview or (h, w, 4) c-contiguous uint8 ndarray
+        """
+        cdef AssimpTexture* texture
+        cdef np.ndarray[unsigned char, ndim=3, mode='c'] rgba
+        if self._embedded_textures is None:
+            textures = []
+            for i in range(self.scene.embedded_textures.size()):
+                texture = self.scene.embedded_textures[i]
+                if texture.is_compressed():
+                    textures.append(memoryview(
+                        _EmbeddedBuffer.wrap(self, texture)))
+                else:
+                    rgba = np.empty([texture.height(), texture.width(), 4],
+                                    dtype=np.uint8)
+                    if rgba.size > 0:
+                        texture.rgba(&rgba[0, 0, 0])
+                    textures.append(rgba)
+            self._embedded_textures = textures
+        return self._embedded_textures
+
+    @property
+    def embedded_texture_formats(self):
+        r"""
+        The format hint of each embedded texture - the file extension for
+        compressed textures (e.g. ``'png'``), empty for uncompressed ones.
+
+        :type: list of string
+        """
+        return [self.scene.embedded_textures[i].format_hint().decode('utf-8')
+                for i in range(self.scene.embedded_textures.size())]
+
+    def embedded_texture(self, path):
+        r"""
+        Resolve a texture path of the form ``'*N'`` to the embedded texture
+        it refers to.
+
+        Parameters
+        ----------
+        path : string
+            A texture path, e.g. from :attr:`AITriMeshImporter.textures`.
+
+        Returns
+        -------
+        texture : memoryview, (h, w, 4) uint8 ndarray or ``None``
+            The embedded texture, or ``None`` if ``path`` does not refer to
+            one.
+        """
+        if isinstance(path, bytes):
+            path = path.decode('utf-8')
+        if not path.startswith('*') or not path[1:].isdigit():
+            return None
+        index = int(path[1:])
+        textures = self.embedded_textures
+        return textures[index] if index < len(textures) else None
+
+
+cdef class _EmbeddedBuffer:
+    # exposes the raw bytes of a compressed embedded texture through the
+    # buffer protocol, keeping the importer that owns them alive
+    cdef AIImporter wrapper
+    cdef const unsigned char* data
+    cdef Py_ssize_t n_bytes
+
+    @staticmethod
+    cdef _EmbeddedBuffer wrap(AIImporter wrapper, AssimpTexture* texture):
+        cdef _EmbeddedBuffer buf = _EmbeddedBuffer.__new__(_EmbeddedBuffer)
+        buf.wrapper = wrapper
+        buf.data = texture.data()
+        buf.n_bytes = texture.n_bytes()
+        return buf
+
+    def __getbuffer__(self, Py_buffer* buffer, int flags):
+        PyBuffer_FillInfo(buffer, self, <void*>self.data, self.n_bytes, 1,
+                          flags)
+
 
 cdef class AITriMeshImporter:
     r"""
@@ -100,10 +760,60 @@ cdef class AITriMeshImporter:
         The index in to the main importer for this particular mesh.
     """
     cdef AssimpMesh* thisptr
+    # keep the importer alive - it owns the scene thisptr points into
+    cdef AIImporter wrapper
+    cdef uint64_t _topology_hash
+    cdef bint _has_topology_hash
+    cdef dict _textures
+    # (min, max, centroid) of the points, filled in by points
+    cdef np.ndarray _stats
+    cdef AIBVH _bvh
+    cdef list _lods
+    cdef dict _adjacency
+    cdef dict _normals
 
     def __cinit__(self, AIImporter wrapper, unsigned int mesh_index):
+        self.wrapper = wrapper
         self.thisptr = wrapper.scene.meshes[mesh_index]
 
+    @property
+    def name(self):
+        r"""
+        The name of the mesh in the file (may be empty).
+
+        :type: string
+        """
+        return self.thisptr.name().decode('utf-8')
+
+    @property
+    def material_index(self):
+        r"""
+        The index of the material used by this mesh.
+
+        :type: int
+        """
+        return self.thisptr.material_index()
+
+    @property
+    def textures(self):
+        r"""
+        The texture paths on this mesh's material, keyed by texture type
+        (``'diffuse'``, ``'normals'``, ``'specular'``, ... and, with assimp
+        5.1 or newer, the PBR types such as ``'base_color'``,
+        ``'metalness'`` and ``'diffuse_roughness'``). Only types that are
+        present appear. Paths are as stored in the file - either
+        relative to it or, for embedded textures, of the form ``'*N'``.
+
+        :type: dict of string to list of string
+        """
+        cdef dict textures
+        if self._textures is None:
+            textures = self.thisptr.textures()
+            self._textures = {
+                name.decode('utf-8'): [p.decode('utf-8') for p in paths]
+                for name, paths in textures.items()}
+        return self._textures
+
     @property
     def n_points(self):
         r"""
@@ -140,6 +850,297 @@ cdef class AITriMeshImporter:
         """
         return self.thisptr.n_colour_sets()
 
+    @property
+    def topology_hash(self):
+        r"""
+        A 64-bit hash of the number of points and the triangle list. Meshes
+        with equal hashes share their topology. Computed once, in C++.
+
+        :type: int
+        """
+        if not self._has_topology_hash:
+            with nogil:
+                self._topology_hash = self.thisptr.topology_hash()
+            self._has_topology_hash = True
+        return self._topology_hash
+
+    @property
+    def bvh(self):
+        r"""
+        A spatial index over the points and triangles, for closest point,
+        ray and nearest neighbour queries. Built once, in C++ straight from
+        assimp's data with the GIL released.
+
+        :type: :class:`AIBVH`
+        """
+        self._ensure_bvh()
+        return self._bvh
+
+    cdef _ensure_bvh(self):
+        cdef AIBVH bvh
+        cdef const double* transform = self._transform_ptr()
+        if self._bvh is None:
+            bvh = AIBVH()
+            with nogil:
+                bvh.thisptr.build(self.thisptr, transform)
+            self._bvh = bvh
+
+    @property
+    def face_order(self):
+        r"""
+        For an importer created with ``optimize_locality``, the original
+        index of each triangle of :attr:`trilist` - ``None`` otherwise.
+
+        :type: (``n_tris``,) uint32 ndarray
+        """
+        if not self.wrapper.optimize_locality:
+            return None
+        return _vector_to_array(self.thisptr.face_order.data(),
+                                self.thisptr.face_order.size(), np.uint32)
+
+    @property
+    def vertex_order(self):
+        r"""
+        For an importer created with ``optimize_locality``, the original
+        index of each point - ``None`` otherwise. Other per-vertex data can
+        be brought in to line with ``data[mesh.vertex_order]``.
+
+        :type: (``n_points``,) uint32 ndarray
+        """
+        if not self.wrapper.optimize_locality:
+            return None
+        return _vector_to_array(self.thisptr.vertex_order.data(),
+                                self.thisptr.vertex_order.size(), np.uint32)
+
+    @property
+    def adjacency(self):
+        r"""
+        The connectivity of the mesh, built once in C++ with the GIL
+        released:
+
+        - ``edges`` - the unique edges, as (``n_edges``, 2) uint32 point
+          index pairs with the lower index first, in ascending order.
+        - ``vertex_faces`` - the triangles using each point.
+        - ``face_faces`` - the triangles sharing an edge with each triangle.
+
+        The latter two are ``(indices, indptr)`` intc arrays in compressed
+        sparse row form, with ascending rows - row ``i`` is
+        ``indices[indptr[i]:indptr[i + 1]]``.
+
+        :type: dict
+        """
+        self._ensure_adjacency()
+        return self._adjacency
+
+    cdef _ensure_adjacency(self):
+        cdef vector[unsigned int] edges
+        cdef vector[int] vertex_faces_indptr, vertex_faces
+        cdef vector[int] face_faces_indptr, face_faces
+        if self._adjacency is None:
+            with nogil:
+                self.thisptr.adjacency(edges, vertex_faces_indptr,
+                                       vertex_faces, face_faces_indptr,
+                                       face_faces)
+            self._adjacency = {
+                'edges': _vector_to_array(edges.data(),
+                                          [edges.size() // 2, 2], np.uint32),
+                'vertex_faces': (
+                    _vector_to_array(vertex_faces.data(), vertex_faces.size(),
+                                     np.intc),
+                    _vector_to_array(vertex_faces_indptr.data(),
+                                     vertex_faces_indptr.size(), np.intc)),
+                'face_faces': (
+                    _vector_to_array(face_faces.data(), face_faces.size(),
+                                     np.intc),
+                    _vector_to_array(face_faces_indptr.data(),
+                                     face_faces_indptr.size(), np.intc))}
+
+    def face_normals(self, dtype=np.float64):
+        r"""
+        The unit normal of each triangle, following the winding of
+        :attr:`trilist` (zero for degenerate triangles). Computed in C++
+        with the GIL released, in the same pass as :meth:`vertex_normals`,
+        and cached - the array returned is read-only.
+
+        Parameters
+        ----------
+        dtype : float32 or float64, optional
+            The type of the normals.
+
+        Returns
+        -------
+        normals : (``n_tris``, 3) c-contiguous ndarray
+            The face normals.
+        """
+        if self._normals is None:
+            self._normals = {}
+        return _cached_normals(self._normals, lambda: self.points,
+                               lambda: self.trilist, None, dtype)
+
+    def vertex_normals(self, weighting='area', dtype=np.float64):
+        r"""
+        The unit normal of each point, as the weighted sum of the normals of
+        the triangles using it (zero for unused points). Computed from the
+        points rather than read from the file, in C++ with the GIL released,
+        and cached - the array returned is read-only.
+
+        Parameters
+        ----------
+        weighting : {'area', 'angle', 'uniform'}, optional
+            How the triangles around a point are weighted - by their area, by
+            their angle at the point, or equally.
+        dtype : float32 or float64, optional
+            The type of the normals.
+
+        Returns
+        -------
+        normals : (``n_points``, 3) c-contiguous ndarray
+            The vertex normals.
+        """
+        if self._normals is None:
+            self._normals = {}
+        return _cached_normals(self._normals, lambda: self.points,
+                               lambda: self.trilist, weighting, dtype)
+
+    def decimate(self, n_faces):
+        r"""
+        A simplified copy of the mesh, by quadric error edge collapse.
+
+        The decimation runs in C++ on assimp's data, with the GIL released,
+        so the full resolution ``points`` and ``trilist`` are never copied
+        out. Only the points and triangles are kept. Border vertices only
+        collapse along border edges, on to one of the edge's end points, so
+        they stay on the border - which can leave more than ``n_faces``
+        triangles.
+
+        Parameters
+        ----------
+        n_faces : int
+            The number of triangles to simplify down to.
+
+        Returns
+        -------
+        points : (``n_points``, 3) c-contiguous double ndarray
+        trilist : (``n_tris``, 3) c-contiguous unsigned int ndarray
+        """
+        if n_faces < 0:
+            raise ValueError('n_faces must not be negative')
+        return self._decimate([n_faces])[0]
+
+    def _decimate(self, targets):
+        # simplify to each target in turn, largest first, so that each level
+        # carries on from the last
+        cdef const double* transform = self._transform_ptr()
+        cdef bool flip_winding = self.wrapper._flip_winding
+        cdef QuadricDecimator* decimator
+        cdef unsigned int target
+        cdef np.ndarray points, trilist
+        results = [None] * len(targets)
+        with nogil:
+            decimator = new QuadricDecimator(self.thisptr, transform,
+                                             flip_winding)
+        try:
+            for i in sorted(range(len(targets)), key=targets.__getitem__,
+                            reverse=True):
+                target = targets[i]
+                with nogil:
+                    decimator.simplify(target)
+                points = np.empty([decimator.n_points(), 3])
+                trilist = np.empty([decimator.n_faces(), 3], dtype=np.uint32)
+                decimator.points(<double*> points.data)
+                decimator.trilist(<unsigned int*> trilist.data)
+                results[i] = (points, trilist)
+        finally:
+            del decimator
+        return results
+
+    @property
+    def lods(self):
+        r"""
+        The levels of detail asked for by the importer's ``lods``, in the
+        same order, as ``(points, trilist)`` pairs - see :meth:`decimate`.
+        The levels are built one from the next, finest first.
+
+        :type: list of tuple
+        """
+        self._ensure_lods()
+        return self._lods
+
+    cdef _ensure_lods(self):
+        if self._lods is None:
+            self._lods = self._decimate(self.wrapper.lods)
+
+    def _check_bone_weights(self):
+        if not self.wrapper.bone_weights:
+            raise ValueError('Bones are only imported by an AIImporter '
+                             'created with bone_weights=True')
+
+    @property
+    def n_bones(self):
+        r"""
+        The number of bones that deform this mesh.
+
+        :type: int
+        """
+        self._check_bone_weights()
+        return self.thisptr.n_bones()
+
+    @property
+    def bone_names(self):
+        r"""
+        The name of each bone, naming the columns of :attr:`skin_weights`.
+
+        :type: list of string
+        """
+        self._check_bone_weights()
+        return [self.thisptr.bone_name(i).decode('utf-8')
+                for i in range(self.thisptr.n_bones())]
+
+    @property
+    def bone_offsets(self):
+        r"""
+        The offset matrix of each bone, which takes the mesh's ``points`` to
+        the bone's space in the bind pose.
+
+        :type: (``n_bones``, 4, 4) c-contiguous double ndarray
+        """
+        self._check_bone_weights()
+        cdef unsigned int n_bones = self.thisptr.n_bones()
+        cdef np.ndarray[double, ndim=3, mode='c'] offsets = \
+            np.empty([n_bones, 4, 4])
+        for i in range(n_bones):
+            self.thisptr.bone_offset_matrix(i, &offsets[i, 0, 0])
+        if self.wrapper._transform is not None:
+            # the points have been transformed away from the mesh space
+            offsets = np.ascontiguousarray(np.matmul(
+                offsets, np.linalg.inv(self.wrapper._transform)))
+        return offsets
+
+    @property
+    def skin_weights(self):
+        r"""
+        The weight of each bone on each point, as the ``(data, indices,
+        indptr)`` arrays of a compressed sparse row matrix of shape
+        (``n_points``, ``n_bones``) - e.g. ``scipy.sparse.csr_matrix(
+        mesh.skin_weights, shape=(mesh.n_points, mesh.n_bones))``. Built in
+        C++, with the GIL released.
+
+        :type: tuple of (double ndarray, intc ndarray, intc ndarray)
+        """
+        self._check_bone_weights()
+        cdef np.ndarray[double, ndim=1, mode='c'] weights = \
+            np.empty(self.thisptr.n_bone_weights())
+        cdef np.ndarray[int, ndim=1, mode='c'] indices = \
+            np.empty(weights.shape[0], dtype=np.intc)
+        cdef np.ndarray[int, ndim=1, mode='c'] indptr = \
+            np.empty(self.n_points + 1, dtype=np.intc)
+        # both may be empty
+        cdef int* indices_ptr = <int*> indices.data
+        cdef double* weights_ptr = <double*> weights.data
+        with nogil:
+            self.thisptr.skin_weights(&indptr[0], indices_ptr, weights_ptr)
+        return weights, indices, indptr
+
     @property
     def points(self):
         r"""
@@ -147,38 +1148,138 @@ cdef class AITriMeshImporter:
 
         :type: (``n_points``, 3) c-contiguous double ndarray
         """
-        cdef np.ndarray[double, ndim=2, mode='c'] points = \
-            np.empty([self.n_points, 3])
-        self.thisptr.points(&points[0, 0])
+        points = np.empty([self.n_points, 3])
+        self._copy_points(points)
         return points
 
+    # The _copy_* methods write a field straight in to out, a c-contiguous
+    # array of the field's shape and type - e.g. a view on to shared memory.
+
+    def _copy_points(self, np.ndarray[double, ndim=2, mode='c'] out):
+        cdef np.ndarray[double, ndim=2, mode='c'] stats
+        cdef double* points_ptr = NULL
+        cdef const double* transform = self._transform_ptr()
+        if out.shape[0] != self.n_points or out.shape[1] != 3:
+            raise ValueError('out must be of shape ({}, 3)'.format(
+                self.n_points))
+        if self.n_points:
+            points_ptr = &out[0, 0]
+        if not self.wrapper.point_stats:
+            if self.n_points:
+                with nogil:
+                    self.thisptr.points(transform, points_ptr)
+            return
+        stats = np.empty([3, 3])
+        with nogil:
+            self.thisptr.point_stats(transform, points_ptr, &stats[0, 0])
+        self._stats = stats
+
+    cdef const double* _transform_ptr(self):
+        cdef np.ndarray[double, ndim=2, mode='c'] transform = \
+            self.wrapper._transform
+        if transform is None:
+            return NULL
+        return &transform[0, 0]
+
+    def _point_stats(self):
+        # with the importer's stats, the statistics are a by-product of
+        # points - otherwise, or before it is called, we pass over the
+        # vertices just for them
+        cdef np.ndarray[double, ndim=2, mode='c'] stats
+        cdef const double* transform = self._transform_ptr()
+        if self._stats is None:
+            stats = np.empty([3, 3])
+            with nogil:
+                self.thisptr.point_stats(transform, NULL, &stats[0, 0])
+            self._stats = stats
+        return self._stats
+
+    @property
+    def bounds(self):
+        r"""
+        The axis aligned bounding box of the points, as its minimum and
+        maximum corners (NaN if there are no points). Computed once, in the
+        same pass that copies out :attr:`points` if the importer was created
+        with ``stats``.
+
+        :type: (2, 3) double ndarray
+        """
+        return self._point_stats()[:2].copy()
+
+    @property
+    def centroid(self):
+        r"""
+        The mean of the points (NaN if there are no points). Computed once,
+        in the same pass that copies out :attr:`points` if the importer was
+        created with ``stats``.
+
+        :type: (3,) double ndarray
+        """
+        return self._point_stats()[2].copy()
+
+    @property
+    def extents(self):
+        r"""
+        The size of the bounding box along each axis.
+
+        :type: (3,) double ndarray
+        """
+        stats = self._point_stats()
+        return stats[1] - stats[0]
+
     @property
     def trilist(self):
         r"""
-        The triangle list.
+        The triangle list. If the importer was given a
+        :class:`TrilistTable`, this is the shared read-only array for this
+        mesh's topology.
 
         :type: (``n_tris``, 3) c-contiguous unsigned int ndarray
         """
-        cdef np.ndarray[unsigned int, ndim=2, mode='c'] trilist = \
-            np.empty([self.n_tris, 3], dtype=np.uint32)
-        self.thisptr.trilist(&trilist[0, 0])
+        if self.wrapper.trilist_table is not None:
+            return self.wrapper.trilist_table.intern(self)
+        return self._build_trilist()
+
+    def _build_trilist(self):
+        trilist = np.empty([self.n_tris, 3], dtype=np.uint32)
+        self._copy_trilist(trilist)
         return trilist
 
+    def _copy_trilist(self, np.ndarray[unsigned int, ndim=2, mode='c'] out):
+        if out.shape[0] != self.n_tris or out.shape[1] != 3:
+            raise ValueError('out must be of shape ({}, 3)'.format(
+                self.n_tris))
+        if self.n_tris:
+            self.thisptr.trilist(&out[0, 0], self.wrapper._flip_winding)
+
+    @property
+    def _flips_winding(self):
+        return self.wrapper._flip_winding
+
     @property
     def tcoords(self):
         r"""
-        The texture coordinates.
+        The texture coordinates, with v flipped if the importer was created
+        with ``flip_v``.
 
         :type: (``n_points``, 2) c-contiguous double ndarray
         """
-        cdef np.ndarray[double, ndim=2, mode='c'] tcoords
         if self.n_tcoord_sets:
             tcoords = np.empty([self.n_points, 2])
-            self.thisptr.tcoords(0, &tcoords[0, 0])
+            self._copy_tcoords(tcoords)
             return tcoords
         else:
             return None
 
+    def _copy_tcoords(self, np.ndarray[double, ndim=2, mode='c'] out):
+        if not self.n_tcoord_sets:
+            raise ValueError('The mesh has no texture coordinates')
+        if out.shape[0] != self.n_points or out.shape[1] != 2:
+            raise ValueError('out must be of shape ({}, 2)'.format(
+                self.n_points))
+        if self.n_points:
+            self.thisptr.tcoords(0, &out[0, 0], self.wrapper.flip_v)
+
     @property
     def colour_per_vertex(self):
         r"""
@@ -186,17 +1287,819 @@ cdef class AITriMeshImporter:
 
         :type: (``n_points``, 3) c-contiguous double ndarray
         """
-        cdef np.ndarray[double, ndim=2, mode='c'] colour_sets
         if self.n_colour_sets:
             colour_sets = np.empty([self.n_points, 3])
-            self.thisptr.colour_per_vertex(0, &colour_sets[0, 0])
+            self._copy_colour_per_vertex(colour_sets)
             return colour_sets
         else:
             return None
 
+    def _copy_colour_per_vertex(self,
+                                np.ndarray[double, ndim=2, mode='c'] out):
+        if not self.n_colour_sets:
+            raise ValueError('The mesh has no colours per vertex')
+        if out.shape[0] != self.n_points or out.shape[1] != 3:
+            raise ValueError('out must be of shape ({}, 3)'.format(
+                self.n_points))
+        if self.n_points:
+            self.thisptr.colour_per_vertex(0, &out[0, 0])
+
+    def sample_texture(self, image):
+        r"""
+        Bilinearly sample a texture image at the texture coordinates of every
+        vertex. The sampling is fused with reading the tcoords from assimp
+        (no tcoords array is built) and runs with the GIL released.
+
+        Texture coordinates are clamped to [0, 1], with (0, 0) at the bottom
+        left of the image.
+
+        Parameters
+        ----------
+        image : (h, w) or (h, w, n_channels) uint8 ndarray
+            The texture, e.g. as decoded by :func:`load_textured`. Single
+            channel images are read as grey, channels past the third (alpha)
+            are ignored.
+
+        Returns
+        -------
+        colour_per_vertex : (``n_points``, 3) c-contiguous double ndarray
+            The sampled colours, in [0, 1].
+
+        Raises
+        ------
+        ValueError
+            If the mesh has no texture coordinates or the image is empty.
+        """
+        if not self.n_tcoord_sets:
+            raise ValueError('The mesh has no texture coordinates to sample')
+        image = np.asarray(image)
+        if image.ndim == 2:
+            image = image[..., None]
+        if image.ndim != 3 or image.size == 0:
+            raise ValueError('image must be a non-empty (h, w) or '
+                             '(h, w, n_channels) array')
+        cdef const unsigned char[:, :, ::1] image_view = \
+            np.ascontiguousarray(image, dtype=np.uint8)
+        cdef np.ndarray[double, ndim=2, mode='c'] colours = \
+            np.empty([self.n_points, 3])
+        if self.n_points == 0:
+            return colours
+        cdef double* colours_ptr = &colours[0, 0]
+        with nogil:
+            self.thisptr.sample_texture(
+                0, &image_view[0, 0, 0], image_view.shape[0],
+                image_view.shape[1], image_view.shape[2], colours_ptr)
+        return colours
+
     def __str__(self):
         msg = 'n_points: %d\n' % self.n_points
         msg += 'n_tris:   %d\n' % self.n_tris
         msg += 'n_tcoord_sets %d' % self.n_tcoord_sets
         msg += 'n_color_sets %d' % self.n_color_sets
         return msg
+
+
+cdef class AIAnimationImporter:
+    r"""
+    Exposes the keyframes of an animation found by assimp. Available through
+    :attr:`AIImporter.animations` if the importer was created with
+    ``animations=True``.
+
+    An animation has a channel per node that it moves, each with its own
+    position, rotation and scale keys. Times are in seconds and rotations
+    are unit quaternions ``(w, x, y, z)``. Keys are as stored in the file -
+    the importer's ``transform`` is not applied to them.
+
+    Parameters
+    ----------
+    wrapper : :class:`AIImporter`
+        The main importer that contains the animations
+    animation_index : unsigned int
+        The index in to the main importer for this particular animation.
+    """
+    cdef AssimpAnimation* thisptr
+    # keep the importer alive - it owns the scene thisptr points into
+    cdef AIImporter wrapper
+
+    def __cinit__(self, AIImporter wrapper, unsigned int animation_index):
+        self.wrapper = wrapper
+        self.thisptr = wrapper.scene.animations[animation_index]
+
+    @property
+    def name(self):
+        r"""
+        The name of the animation in the file (may be empty).
+
+        :type: string
+        """
+        return self.thisptr.name().decode('utf-8')
+
+    @property
+    def ticks_per_second(self):
+        r"""
+        The rate of the animation's time unit - 25 if the file doesn't say.
+
+        :type: float
+        """
+        return self.thisptr.ticks_per_second() or 25.0
+
+    @property
+    def duration(self):
+        r"""
+        The length of the animation, in seconds.
+
+        :type: float
+        """
+        return self.thisptr.duration() / self.ticks_per_second
+
+    @property
+    def n_channels(self):
+        r"""
+        The number of nodes moved by this animation.
+
+        :type: int
+        """
+        return self.thisptr.n_channels()
+
+    @property
+    def channel_names(self):
+        r"""
+        The name of the node moved by each channel.
+
+        :type: list of string
+        """
+        return [self.thisptr.channel_name(i).decode('utf-8')
+                for i in range(self.n_channels)]
+
+    def channel(self, unsigned int index):
+        r"""
+        The keys of a channel, copied in to contiguous arrays.
+
+        Parameters
+        ----------
+        index : int
+            The index of the channel, see :attr:`channel_names`.
+
+        Returns
+        -------
+        keys : dict of string to c-contiguous double ndarray
+            ``position_times`` and ``positions`` - (``n_keys``,) and
+            (``n_keys``, 3), ``rotation_times`` and ``rotations`` -
+            (``n_keys``,) and (``n_keys``, 4), ``scale_times`` and
+            ``scales`` - (``n_keys``,) and (``n_keys``, 3).
+        """
+        if index >= self.n_channels:
+            raise IndexError('No channel {}'.format(index))
+        cdef unsigned int n_positions = self.thisptr.n_position_keys(index)
+        cdef unsigned int n_rotations = self.thisptr.n_rotation_keys(index)
+        cdef unsigned int n_scales = self.thisptr.n_scaling_keys(index)
+        cdef np.ndarray[double, ndim=1, mode='c'] position_times = \
+            np.empty(n_positions)
+        cdef np.ndarray[double, ndim=2, mode='c'] positions = \
+            np.empty([n_positions, 3])
+        cdef np.ndarray[double, ndim=1, mode='c'] rotation_times = \
+            np.empty(n_rotations)
+        cdef np.ndarray[double, ndim=2, mode='c'] rotations = \
+            np.empty([n_rotations, 4])
+        cdef np.ndarray[double, ndim=1, mode='c'] scale_times = \
+            np.empty(n_scales)
+        cdef np.ndarray[double, ndim=2, mode='c'] scales = \
+            np.empty([n_scales, 3])
+        self.thisptr.position_keys(index, <double*> position_times.data,
+                                   <double*> positions.data)
+        self.thisptr.rotation_keys(index, <double*> rotation_times.data,
+                                   <double*> rotations.data)
+        self.thisptr.scaling_keys(index, <double*> scale_times.data,
+                                  <double*> scales.data)
+        ticks_per_second = self.ticks_per_second
+        return {'position_times': position_times / ticks_per_second,
+                'positions': positions,
+                'rotation_times': rotation_times / ticks_per_second,
+                'rotations': rotations,
+                'scale_times': scale_times / ticks_per_second,
+                'scales': scales}
+
+    def resample(self, frame_rate):
+        r"""
+        Evaluate every channel at a uniform frame rate, for batched use.
+
+        Positions and scales are interpolated linearly and rotations
+        spherically, holding the first and last keys of a channel beyond
+        them. Evaluated in C++ with the GIL released, in a single pass over
+        the keys of each channel.
+
+        Parameters
+        ----------
+        frame_rate : float
+            Frames per second.
+
+        Returns
+        -------
+        times : (``n_frames``,) double ndarray
+            The time of each frame, in seconds, from 0 to :attr:`duration`.
+        positions : (``n_channels``, ``n_frames``, 3) double ndarray
+        rotations : (``n_channels``, ``n_frames``, 4) double ndarray
+        scales : (``n_channels``, ``n_frames``, 3) double ndarray
+        """
+        if frame_rate <= 0:
+            raise ValueError('frame_rate must be positive')
+        n_frames = int(np.floor(self.duration * frame_rate + 1e-9)) + 1
+        times = np.arange(n_frames) / float(frame_rate)
+        cdef double[::1] ticks = times * self.ticks_per_second
+        cdef unsigned int n_channels = self.n_channels
+        cdef np.ndarray[double, ndim=3, mode='c'] positions = \
+            np.empty([n_channels, n_frames, 3])
+        cdef np.ndarray[double, ndim=3, mode='c'] rotations = \
+            np.empty([n_channels, n_frames, 4])
+        cdef np.ndarray[double, ndim=3, mode='c'] scales = \
+            np.empty([n_channels, n_frames, 3])
+        cdef unsigned int i
+        with nogil:
+            for i in range(n_channels):
+                self.thisptr.sample(i, &ticks[0], ticks.shape[0],
+                                    &positions[i, 0, 0],
+                                    &rotations[i, 0, 0], &scales[i, 0, 0])
+        return times, positions, rotations, scales
+
+    def __str__(self):
+        return '{}: {} channels, {:.3f}s'.format(self.name, self.n_channels,
+                                                 self.duration)
+
+
+def _as_points(points, name):
+    points = np.ascontiguousarray(points, dtype=np.float64)
+    if points.ndim != 2 or points.shape[1] != 3:
+        raise ValueError('{} must be an (n, 3) array'.format(name))
+    return points
+
+
+cdef np.ndarray _vector_to_array(const void* data, shape, dtype):
+    cdef np.ndarray array = np.empty(shape, dtype=dtype)
+    if array.size:
+        memcpy(array.data, data, array.nbytes)
+    return array
+
+
+def compute_normals(points, trilist, weighting='area', dtype=np.float64):
+    r"""
+    The face and vertex normals of a triangle mesh, computed in one fused
+    pass in C++ with the GIL released. Each triangle's normal is its cross
+    product, so follows the winding of ``trilist``, and each vertex normal
+    is the weighted sum of the normals of the triangles using it. Normals of
+    degenerate triangles and unused points are zero.
+
+    Parameters
+    ----------
+    points : (``n_points``, 3) double ndarray
+        The points of the mesh.
+    trilist : (``n_tris``, 3) unsigned int ndarray
+        The triangles of the mesh.
+    weighting : {'area', 'angle', 'uniform'}, optional
+        How the triangles around a point are weighted - by their area, by
+        their angle at the point, or equally.
+    dtype : float32 or float64, optional
+        The type of the normals.
+
+    Returns
+    -------
+    face_normals : (``n_tris``, 3) c-contiguous ndarray
+        The unit normal of each triangle.
+    vertex_normals : (``n_points``, 3) c-contiguous ndarray
+        The unit normal of each point. Summed in double precision, whatever
+        ``dtype``.
+
+    Raises
+    ------
+    ValueError
+        If ``trilist`` is not an (``n_tris``, 3) array of indices in to
+        ``points``, or ``weighting`` or ``dtype`` is unknown.
+    """
+    cdef np.ndarray[double, ndim=2, mode='c'] points_array = \
+        _as_points(points, 'points')
+    trilist = np.ascontiguousarray(trilist, dtype=np.uint32)
+    # checked before the typed assignment, which would fail less clearly
+    if trilist.ndim != 2 or trilist.shape[1] != 3:
+        raise ValueError('trilist must be an (n, 3) array')
+    cdef np.ndarray[unsigned int, ndim=2, mode='c'] trilist_array = trilist
+    cdef np.ndarray face_normals, vertex_normals
+    cdef unsigned int n_points = points_array.shape[0]
+    cdef unsigned int n_tris
+    cdef int weighting_code
+    n_tris = trilist_array.shape[0]
+    if n_tris and trilist_array.max() >= n_points:
+        raise ValueError('trilist indexes past the end of points')
+    if weighting not in NORMAL_WEIGHTINGS:
+        raise ValueError('weighting must be one of {}'.format(
+            ', '.join(sorted(NORMAL_WEIGHTINGS))))
+    weighting_code = NORMAL_WEIGHTINGS[weighting]
+    dtype = np.dtype(dtype)
+    if dtype not in (np.float32, np.float64):
+        raise ValueError('dtype must be float32 or float64')
+    face_normals = np.empty([n_tris, 3], dtype=dtype)
+    vertex_normals = np.empty([n_points, 3], dtype=dtype)
+    cdef const double* points_ptr = <const double*> points_array.data
+    cdef const unsigned int* trilist_ptr = \
+        <const unsigned int*> trilist_array.data
+    if dtype == np.float64:
+        with nogil:
+            c_compute_normals(points_ptr, n_points, trilist_ptr, n_tris,
+                              weighting_code, <double*> face_normals.data,
+                              <double*> vertex_normals.data)
+    else:
+        with nogil:
+            c_compute_normals(points_ptr, n_points, trilist_ptr, n_tris,
+                              weighting_code, <float*> face_normals.data,
+                              <float*> vertex_normals.data)
+    return face_normals, vertex_normals
+
+
+def _cached_normals(cache, points, trilist, weighting, dtype):
+    # face normals (weighting None) are cached under dtype, vertex normals
+    # under (weighting, dtype) - a miss computes and caches both. points and
+    # trilist are callables, so that they are only extracted on a miss.
+    dtype = np.dtype(dtype)
+    key = dtype if weighting is None else (weighting, dtype)
+    if key not in cache:
+        face_normals, vertex_normals = compute_normals(
+            points(), trilist(), weighting or 'area', dtype)
+        face_normals.flags.writeable = False
+        vertex_normals.flags.writeable = False
+        cache.setdefault(dtype, face_normals)
+        cache[(weighting or 'area', dtype)] = vertex_normals
+    return cache[key]
+
+
+cdef dict _tree_arrays(BVHTree* tree, prefix):
+    n_nodes = tree.info.size() // 2
+    return {
+        prefix + '_bounds': _vector_to_array(tree.bounds.data(),
+                                             [n_nodes, 2, 3], np.float64),
+        prefix + '_info': _vector_to_array(tree.info.data(), [n_nodes, 2],
+                                           np.intc),
+        prefix + '_order': _vector_to_array(tree.order.data(),
+                                            tree.order.size(), np.uint32)}
+
+
+def _check_tree(bounds, info, order, n_primitives, prefix):
+    # a restored tree must only reference nodes, leaves and primitives that
+    # exist, with children after their parent, so that queries terminate
+    n_nodes = info.shape[0] if info.ndim == 2 else -1
+    if bounds.shape != (n_nodes, 2, 3) or info.shape != (n_nodes, 2):
+        raise ValueError('{0}_bounds and {0}_info must be (n, 2, 3) and '
+                         '(n, 2) arrays'.format(prefix))
+    if order.shape != (n_primitives,):
+        raise ValueError('{}_order must have {} entries'.format(
+            prefix, n_primitives))
+    if (n_nodes == 0) != (n_primitives == 0):
+        raise ValueError('{} tree is empty'.format(prefix)
+                         if n_nodes == 0 else
+                         '{} tree has nodes but nothing to index'.format(
+                             prefix))
+    if n_primitives and order.max() >= n_primitives:
+        raise ValueError('{}_order indexes past the end'.format(prefix))
+    first, count = info[:, 0].astype(np.int64), info[:, 1].astype(np.int64)
+    nodes = np.arange(n_nodes)
+    leaf = count > 0
+    bad_leaf = leaf & ((first < 0) | (first + count > n_primitives))
+    inner = count == 0
+    bad_inner = inner & ((nodes + 1 >= n_nodes) | (first <= nodes + 1) |
+                         (first >= n_nodes))
+    if (count < 0).any() or bad_leaf.any() or bad_inner.any():
+        raise ValueError('{}_info references nodes or primitives out of '
+                         'range'.format(prefix))
+
+
+cdef _restore_tree(BVHTree* tree, arrays, prefix, n_primitives):
+    cdef np.ndarray bounds = np.ascontiguousarray(arrays[prefix + '_bounds'],
+                                                  dtype=np.float64)
+    cdef np.ndarray info = np.ascontiguousarray(arrays[prefix + '_info'],
+                                                dtype=np.intc)
+    cdef np.ndarray order = np.ascontiguousarray(arrays[prefix + '_order'],
+                                                 dtype=np.uint32)
+    _check_tree(bounds, info, order, n_primitives, prefix)
+    tree.bounds.resize(bounds.size)
+    tree.info.resize(info.size)
+    tree.order.resize(order.size)
+    if bounds.size:
+        memcpy(tree.bounds.data(), bounds.data, bounds.nbytes)
+    if info.size:
+        memcpy(tree.info.data(), info.data, info.nbytes)
+    if order.size:
+        memcpy(tree.order.data(), order.data, order.nbytes)
+
+
+def _rebuild_bvh(arrays):
+    return AIBVH.from_arrays(arrays)
+
+
+cdef class AIBVH:
+    r"""
+    A spatial index over the points and triangles of a mesh - a bounding
+    volume hierarchy over each. Get one from :attr:`AITriMeshImporter.bvh`,
+    or build one from arrays with :meth:`build`.
+
+    Every query takes a batch and is answered in C++ with the GIL released.
+    An ``AIBVH`` can be pickled, or saved with the rest of a mesh through
+    :meth:`arrays` and restored, without rebuilding, by :meth:`from_arrays`.
+    """
+    cdef AssimpBVH* thisptr
+
+    def __cinit__(self):
+        self.thisptr = new AssimpBVH()
+
+    def __dealloc__(self):
+        del self.thisptr
+
+    @staticmethod
+    def build(points, trilist):
+        r"""
+        Build the index of a mesh given as arrays, e.g. a
+        :class:`MeshResult`.
+
+        Parameters
+        ----------
+        points : (``n_points``, 3) double ndarray
+        trilist : (``n_tris``, 3) unsigned int ndarray
+
+        Returns
+        -------
+        bvh : :class:`AIBVH`
+            The index.
+        """
+        cdef np.ndarray points_array = _as_points(points, 'points')
+        cdef np.ndarray trilist_array = np.ascontiguousarray(trilist,
+                                                             dtype=np.uint32)
+        if trilist_array.ndim != 2 or trilist_array.shape[1] != 3:
+            raise ValueError('trilist must be an (n, 3) array')
+        if trilist_array.size and (trilist_array.max() >=
+                                   points_array.shape[0]):
+            raise ValueError('trilist refers to points that do not exist')
+        cdef const double* points_ptr = <double*> points_array.data
+        cdef const unsigned int* trilist_ptr = \
+            <unsigned int*> trilist_array.data
+        cdef unsigned int n_points = points_array.shape[0]
+        cdef unsigned int n_tris = trilist_array.shape[0]
+        cdef AIBVH bvh = AIBVH()
+        with nogil:
+            bvh.thisptr.build(points_ptr, n_points, trilist_ptr, n_tris)
+        return bvh
+
+    @property
+    def n_points(self):
+        r"""
+        The number of points indexed.
+
+        :type: int
+        """
+        return self.thisptr.n_points()
+
+    @property
+    def n_tris(self):
+        r"""
+        The number of triangles indexed.
+
+        :type: int
+        """
+        return self.thisptr.n_tris()
+
+    def closest_points(self, points):
+        r"""
+        Find the closest point on the surface to each of a batch of points.
+
+        Parameters
+        ----------
+        points : (``n``, 3) double ndarray
+            The query points.
+
+        Returns
+        -------
+        closest : (``n``, 3) double ndarray
+            The closest point on the surface (NaN without triangles).
+        distances : (``n``,) double ndarray
+            The distance to it (infinite without triangles).
+        tri_indices : (``n``,) intc ndarray
+            The triangle it lies on (-1 without triangles).
+        """
+        cdef np.ndarray queries = _as_points(points, 'points')
+        cdef unsigned int n = queries.shape[0]
+        cdef np.ndarray closest = np.empty([n, 3])
+        cdef np.ndarray distances = np.empty(n)
+        cdef np.ndarray tri_indices = np.empty(n, dtype=np.intc)
+        with nogil:
+            self.thisptr.closest_points(
+                <double*> queries.data, n, <double*> closest.data,
+                <double*> distances.data, <int*> tri_indices.data)
+        return closest, distances, tri_indices
+
+    def intersect_rays(self, origins, directions):
+        r"""
+        Find where each of a batch of rays first hits the surface. Both
+        sides of a triangle count.
+
+        Parameters
+        ----------
+        origins : (``n``, 3) double ndarray
+        directions : (``n``, 3) double ndarray
+            Need not be normalized.
+
+        Returns
+        -------
+        distances : (``n``,) double ndarray
+            The ``t`` of each hit, at ``origin + t * direction`` (infinite
+            for a miss).
+        tri_indices : (``n``,) intc ndarray
+            The triangle hit (-1 for a miss).
+        barycentric : (``n``, 3) double ndarray
+            The barycentric coordinates of the hit on its triangle (NaN for
+            a miss).
+        """
+        cdef np.ndarray origins_array = _as_points(origins, 'origins')
+        cdef np.ndarray directions_array = _as_points(directions,
+                                                      'directions')
+        if origins_array.shape[0] != directions_array.shape[0]:
+            raise ValueError('There must be a direction for each origin')
+        cdef unsigned int n = origins_array.shape[0]
+        cdef np.ndarray distances = np.empty(n)
+        cdef np.ndarray tri_indices = np.empty(n, dtype=np.intc)
+        cdef np.ndarray barycentric = np.empty([n, 3])
+        with nogil:
+            self.thisptr.intersect_rays(
+                <double*> origins_array.data, <double*> directions_array.data,
+                n, <double*> distances.data, <int*> tri_indices.data,
+                <double*> barycentric.data)
+        return distances, tri_indices, barycentric
+
+    def nearest_points(self, points, k=1):
+        r"""
+        Find the ``k`` points of the mesh nearest to each of a batch of
+        points.
+
+        Parameters
+        ----------
+        points : (``n``, 3) double ndarray
+            The query points.
+        k : int, optional
+            How many neighbours to find.
+
+        Returns
+        -------
+        indices : (``n``, ``k``) intc ndarray
+            The indices of the neighbours, nearest first (-1 past the number
+            of points).
+        distances : (``n``, ``k``) double ndarray
+            The distances to them (infinite past the number of points).
+        """
+        if k < 1:
+            raise ValueError('k must be at least 1')
+        cdef np.ndarray queries = _as_points(points, 'points')
+        cdef unsigned int n = queries.shape[0]
+        cdef unsigned int n_neighbours = k
+        cdef np.ndarray indices = np.empty([n, k], dtype=np.intc)
+        cdef np.ndarray distances = np.empty([n, k])
+        with nogil:
+            self.thisptr.nearest_points(
+                <double*> queries.data, n, n_neighbours,
+                <int*> indices.data, <double*> distances.data)
+        return indices, distances
+
+    def arrays(self):
+        r"""
+        The index as plain arrays, e.g. to save with :func:`numpy.savez`.
+
+        Returns
+        -------
+        arrays : dict of string to ndarray
+            The ``points`` and ``trilist`` and, for the ``triangle`` and
+            ``vertex`` trees, their ``_bounds``, ``_info`` and ``_order``.
+        """
+        arrays = {
+            'points': _vector_to_array(self.thisptr.points.data(),
+                                       [self.n_points, 3], np.float64),
+            'trilist': _vector_to_array(self.thisptr.trilist.data(),
+                                        [self.n_tris, 3], np.uint32)}
+        arrays.update(_tree_arrays(&self.thisptr.triangles, 'triangle'))
+        arrays.update(_tree_arrays(&self.thisptr.vertices, 'vertex'))
+        return arrays
+
+    @staticmethod
+    def from_arrays(arrays):
+        r"""
+        Restore an index saved with :meth:`arrays`, without rebuilding it.
+        The arrays are checked to be consistent first, so a corrupt file
+        can't crash the queries.
+
+        Parameters
+        ----------
+        arrays : mapping of string to ndarray
+            As returned by :meth:`arrays` (e.g. a loaded ``.npz`` file).
+
+        Returns
+        -------
+        bvh : :class:`AIBVH`
+            The index.
+
+        Raises
+        ------
+        ValueError
+            If the arrays don't describe a valid index.
+        """
+        cdef np.ndarray points = _as_points(arrays['points'], 'points')
+        cdef np.ndarray trilist = np.ascontiguousarray(arrays['trilist'],
+                                                       dtype=np.uint32)
+        cdef AIBVH bvh = AIBVH()
+        if trilist.ndim != 2 or trilist.shape[1] != 3:
+            raise ValueError('trilist must be an (n, 3) array')
+        if trilist.size and trilist.max() >= points.shape[0]:
+            raise ValueError('trilist indexes past the end of points')
+        bvh.thisptr.points.resize(points.size)
+        bvh.thisptr.trilist.resize(trilist.size)
+        if points.size:
+            memcpy(bvh.thisptr.points.data(), points.data, points.nbytes)
+        if trilist.size:
+            memcpy(bvh.thisptr.trilist.data(), trilist.data, trilist.nbytes)
+        _restore_tree(&bvh.thisptr.triangles, arrays, 'triangle',
+                      trilist.shape[0])
+        _restore_tree(&bvh.thisptr.vertices, arrays, 'vertex',
+                      points.shape[0])
+        return bvh
+
+    def __reduce__(self):
+        return _rebuild_bvh, (self.arrays(),)
+
+
+def axis_conversion(axes):
+    r"""
+    Build the transform that maps points to a new set of axes, to be passed
+    as the ``transform`` of :class:`AIImporter`. For instance
+    ``axis_conversion(['x', '-z', 'y'])`` converts from y-up to z-up, and
+    ``axis_conversion(['x', 'y', '-z'])`` changes handedness.
+
+    Parameters
+    ----------
+    axes : sequence of string
+        For each of the new x, y and z axes, the old axis it is taken from -
+        ``'x'``, ``'y'`` or ``'z'``, optionally prefixed with ``'-'``.
+
+    Returns
+    -------
+    transform : (4, 4) double ndarray
+        The axis conversion.
+    """
+    transform = np.zeros([4, 4])
+    transform[3, 3] = 1
+    if len(axes) != 3:
+        raise ValueError('Three axes must be given')
+    for row, axis in enumerate(axes):
+        sign = -1 if axis.startswith('-') else 1
+        name = axis.lstrip('+-')
+        if name not in ('x', 'y', 'z'):
+            raise ValueError('Unknown axis {!r}'.format(axis))
+        transform[row, 'xyz'.index(name)] = sign
+    if abs(np.linalg.det(transform)) != 1:
+        raise ValueError('Each axis must be used exactly once')
+    return transform
+
+
+class TrilistTable(object):
+    r"""
+    An interning table for triangle lists. Meshes with the same
+    :attr:`AITriMeshImporter.topology_hash` get back the same read-only
+    trilist array, so bulk loads keep a single copy per topology.
+
+    Pass an instance to :class:`AIImporter` as ``trilist_table``, or call
+    :meth:`intern` directly. One table can be shared between importers and
+    threads.
+    """
+
+    def __init__(self):
+        self._trilists = {}
+
+    def __len__(self):
+        return len(self._trilists)
+
+    def __contains__(self, topology_hash):
+        return ((topology_hash, False) in self._trilists or
+                (topology_hash, True) in self._trilists)
+
+    def intern(self, AITriMeshImporter mesh):
+        r"""
+        Return the shared trilist for the topology of ``mesh``, extracting
+        it only if this topology has not been seen before.
+
+        Parameters
+        ----------
+        mesh : :class:`AITriMeshImporter`
+            The mesh whose trilist is wanted.
+
+        Returns
+        -------
+        trilist : (``n_tris``, 3) c-contiguous unsigned int ndarray
+            A read-only triangle list.
+        """
+        # a mirroring transform flips the winding of the same topology
+        key = (mesh.topology_hash, mesh._flips_winding)
+        trilist = self._trilists.get(key)
+        if trilist is None:
+            trilist = mesh._build_trilist()
+            trilist.flags.writeable = False
+            trilist = self._trilists.setdefault(key, trilist)
+        return trilist
+
+    def clear(self):
+        r"""
+        Forget all interned trilists.
+        """
+        self._trilists.clear()
+
+
+def _encode_path(path):
+    # AIImporter takes a C++ string, so unicode paths need encoding first
+    if isinstance(path, bytes):
+        return path
+    return path.encode(sys.getfilesystemencoding())
+
+
+def _format_name(format):
+    # a format is named by its extension - lower case, without the dot
+    return _encode_path(format).lower().lstrip(b'.')
+
+
+cdef AITriMeshImporter _import_single_trimesh(path):
+    importer = AIImporter(_encode_path(path))
+    importer.build_scene()
+    if len(importer.meshes) != 1:
+        raise ValueError('{} contains {} triangle meshes - expected '
+                         'exactly one'.format(path, len(importer.meshes)))
+    return importer.meshes[0]
+
+
+def _stack_points(out, uint64_t topology, reference_path, item):
+    cdef Py_ssize_t i = item[0]
+    cdef AITriMeshImporter mesh = _import_single_trimesh(item[1])
+    cdef double[:, :, ::1] out_view = out
+    if mesh.thisptr.topology_hash() != topology:
+        raise ValueError('{} does not share the topology of '
+                         '{}'.format(item[1], reference_path))
+    if out_view.shape[1] > 0:
+        with nogil:
+            mesh.thisptr.points(&out_view[i, 0, 0])
+
+
+def load_stacked(paths, out=None, n_threads=None):
+    r"""
+    Load many meshes that share a single triangle list into one stacked
+    array of points. Each file must contain exactly one triangle mesh.
+
+    The topology of every file is checked against the first one by
+    comparing hashes computed in C++, so no trilist is copied out apart from
+    the shared one. Files are parsed in parallel with the GIL released and
+    points are written directly into ``out``.
+
+    Parameters
+    ----------
+    paths : list of string
+        File paths of the meshes to load.
+    out : (``n_files``, ``n_points``, 3) c-contiguous double ndarray, optional
+        Preallocated array (e.g. a ``numpy.memmap``) to write the points in
+        to. If ``None``, a new array is allocated.
+    n_threads : int, optional
+        Number of files to parse concurrently. Defaults to the number of
+        CPUs.
+
+    Returns
+    -------
+    points : (``n_files``, ``n_points``, 3) c-contiguous double ndarray
+        The stacked points - ``out`` if it was provided.
+    trilist : (``n_tris``, 3) c-contiguous unsigned int ndarray
+        The triangle list shared by every mesh.
+
+    Raises
+    ------
+    ValueError
+        If a file does not contain exactly one triangle mesh, if the
+        topologies differ or if ``out`` has the wrong shape.
+    """
+    paths = list(paths)
+    if len(paths) == 0:
+        raise ValueError('At least one path must be provided')
+    cdef AITriMeshImporter first = _import_single_trimesh(paths[0])
+    shape = (len(paths), first.n_points, 3)
+    if out is None:
+        out = np.empty(shape)
+    elif out.shape != shape or out.dtype != np.float64:
+        raise ValueError('out must be a float64 array of shape '
+                         '{}'.format(shape))
+    cdef double[:, :, ::1] out_view = out
+    if first.n_points > 0:
+        with nogil:
+            first.thisptr.points(&out_view[0, 0, 0])
+    stack = partial(_stack_points, out, first.thisptr.topology_hash(),
+                    paths[0])
+    pool = ThreadPool(n_threads)
+    try:
+        pool.map(stack, list(enumerate(paths))[1:])
+    finally:
+        # on an error the workers may still be writing in to out
+        pool.terminate()
+        pool.join()
+    return out, first.trilist
@@ -0,0 +1,184 @@
+import os
+import os.path as op
+import sqlite3
+from multiprocessing.pool import ThreadPool
+
+import numpy as np
+
+from .cyassimpwrapper import AIImporter, _encode_path
+
+# the file extensions index_directory looks at by default
+MESH_EXTENSIONS = frozenset(['obj', 'ply', 'stl', 'off', 'fbx', 'glb', 'gltf',
+                             'dae', '3ds', 'wrl', 'x3d'])
+# the default index file name, stored in the indexed directory
+INDEX_FILENAME = '.cyassimp-index.sqlite'
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS meshes (
+    path TEXT NOT NULL REFERENCES files(path) ON DELETE CASCADE,
+    mesh_index INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    n_points INTEGER NOT NULL,
+    n_tris INTEGER NOT NULL,
+    min_x REAL, min_y REAL, min_z REAL,
+    max_x REAL, max_y REAL, max_z REAL,
+    n_tcoord_sets INTEGER NOT NULL,
+    n_colour_sets INTEGER NOT NULL,
+    has_texture INTEGER NOT NULL,
+    PRIMARY KEY (path, mesh_index)
+);
+'''
+_MESH_COLUMNS = ('path', 'mesh_index', 'name', 'n_points', 'n_tris',
+                 'min_x', 'min_y', 'min_z', 'max_x', 'max_y', 'max_z',
+                 'n_tcoord_sets', 'n_colour_sets', 'has_texture')
+_MESH_DTYPES = {'mesh_index': np.uint32, 'n_points': np.uint32,
+                'n_tris': np.uint32, 'n_tcoord_sets': np.uint8,
+                'n_colour_sets': np.uint8, 'has_texture': np.bool_}
+
+
+def _mesh_stats(path):
+    importer = AIImporter(_encode_path(path))
+    importer.build_scene()
+    rows = []
+    for i, mesh in enumerate(importer.meshes):
+        # no need to copy the points out just for their bounds
+        rows.append((i, mesh.name, mesh.n_points, mesh.n_tris) +
+                    tuple(float(b) for b in mesh.bounds.ravel()) +
+                    (mesh.n_tcoord_sets, mesh.n_colour_sets,
+                     bool(mesh.textures)))
+    return rows
+
+
+def _probe(item):
+    root, rel = item
+    try:
+        return rel, _mesh_stats(op.join(root, rel)), None
+    except Exception as e:
+        return rel, [], '{}: {}'.format(type(e).__name__, e)
+
+
+def _scan(root, extensions):
+    found = {}
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            if op.splitext(filename)[1].lower().lstrip('.') in extensions:
+                path = op.join(dirpath, filename)
+                stat = os.stat(path)
+                found[op.relpath(path, root)] = (stat.st_mtime, stat.st_size)
+    return found
+
+
+def _connect(index_path):
+    connection = sqlite3.connect(index_path)
+    connection.execute('PRAGMA foreign_keys = ON')
+    connection.executescript(_SCHEMA)
+    return connection
+
+
+def _as_array(rows):
+    # fixed width strings keep the array compact and fast to filter
+    str_width = {'path': 1, 'name': 1}
+    for row in rows:
+        str_width['path'] = max(str_width['path'], len(row[0]))
+        str_width['name'] = max(str_width['name'], len(row[2]))
+    dtype = [(c, 'U{}'.format(str_width[c]) if c in str_width
+              else _MESH_DTYPES.get(c, np.float64)) for c in _MESH_COLUMNS]
+    rows = [tuple(np.nan if v is None else v for v in row) for row in rows]
+    return np.array(rows, dtype=dtype)
+
+
+def load_index(index_path):
+    r"""
+    Read a mesh index written by :func:`index_directory`, without looking
+    at the indexed files.
+
+    Parameters
+    ----------
+    index_path : string
+        Path of the index file.
+
+    Returns
+    -------
+    index : structured ndarray
+        One row per mesh, see :func:`index_directory`.
+    """
+    connection = _connect(index_path)
+    try:
+        rows = connection.execute(
+            'SELECT {} FROM meshes ORDER BY path, mesh_index'.format(
+                ', '.join(_MESH_COLUMNS))).fetchall()
+    finally:
+        connection.close()
+    return _as_array(rows)
+
+
+def index_directory(root, index_path=None, extensions=MESH_EXTENSIONS,
+                    n_threads=None):
+    r"""
+    Build, or bring up to date, an on-disk index of the meshes under a
+    directory so that datasets can be filtered without importing anything.
+
+    The index is an SQLite database. Only files that are new, or whose
+    modification time or size changed since they were last indexed, are
+    imported - in parallel, with the GIL released while assimp parses.
+    Files that have gone are dropped. Files that fail to import are recorded
+    (with the error) and not retried until they change.
+
+    Parameters
+    ----------
+    root : string
+        The directory to index, recursively.
+    index_path : string, optional
+        Where to keep the index. Defaults to ``INDEX_FILENAME`` in ``root``.
+    extensions : collection of string, optional
+        The lower case file extensions (without the dot) to index.
+    n_threads : int, optional
+        Number of files to import concurrently. Defaults to the number of
+        CPUs.
+
+    Returns
+    -------
+    index : structured ndarray
+        One row per triangle mesh with fields ``path`` (relative to
+        ``root``), ``mesh_index``, ``name``, ``n_points``, ``n_tris``, the
+        bounding box ``min_x`` ... ``max_z`` (NaN for empty meshes),
+        ``n_tcoord_sets``, ``n_colour_sets`` and ``has_texture``.
+    """
+    if index_path is None:
+        index_path = op.join(root, INDEX_FILENAME)
+    found = _scan(root, extensions)
+    connection = _connect(index_path)
+    try:
+        indexed = {path: (mtime, size) for path, mtime, size in
+                   connection.execute('SELECT path, mtime, size FROM files')}
+        gone = [(p,) for p in indexed if p not in found]
+        stale = sorted(p for p, stat in found.items()
+                       if indexed.get(p) != stat)
+        with connection:
+            connection.executemany('DELETE FROM files WHERE path = ?', gone)
+        pool = ThreadPool(n_threads)
+        try:
+            for rel, rows, error in pool.imap_unordered(
+                    _probe, [(root, p) for p in stale]):
+                mtime, size = found[rel]
+                with connection:
+                    connection.execute('DELETE FROM files WHERE path = ?',
+                                       (rel,))
+                    connection.execute('INSERT INTO files VALUES (?, ?, ?, ?)',
+                                       (rel, mtime, size, error))
+                    connection.executemany(
+                        'INSERT INTO meshes VALUES ({})'.format(
+                            ', '.join('?' * len(_MESH_COLUMNS))),
+                        [(rel,) + row for row in rows])
+        finally:
+            pool.terminate()
+            pool.join()
+    finally:
+        connection.close()
+    return load_index(index_path)
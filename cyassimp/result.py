@@ -0,0 +1,231 @@
+import os
+
+import numpy as np
+
+from .cyassimpwrapper import AIImporter, _cached_normals, _encode_path
+
+try:
+    from pickle import PickleBuffer
+except ImportError:
+    # protocol 5 (Python 3.8+) is not available - arrays pickle in-band
+    PickleBuffer = None
+
+# the arrays held by a MeshResult, in pickling order
+RESULT_ARRAYS = ('points', 'trilist', 'tcoords', 'colour_per_vertex')
+
+
+def _read_only(array):
+    # a read-only view, leaving the caller's array writeable
+    if array is not None:
+        array = np.ascontiguousarray(array).view()
+        array.flags.writeable = False
+    return array
+
+
+def _rebuild_array(buffer, dtype, shape):
+    array = np.frombuffer(buffer, dtype=dtype).reshape(shape)
+    array.flags.writeable = False
+    return array
+
+
+def _rebuild_result(name, topology_hash, *arrays):
+    return MeshResult(name, topology_hash,
+                      *[_rebuild_array(*a) if a is not None else None
+                        for a in arrays])
+
+
+class MeshResult(object):
+    r"""
+    The extracted arrays of a triangle mesh, detached from assimp.
+
+    Unlike :class:`AITriMeshImporter`, which wraps C++ objects, a
+    ``MeshResult`` is immutable (its arrays are read-only) and can be
+    pickled. With pickle protocol 5 the arrays are handed to pickle as
+    out-of-band :class:`pickle.PickleBuffer` objects, so frameworks that
+    pass a ``buffer_callback`` (Dask, Ray, ``multiprocessing`` with
+    protocol 5) can move them without copying, and unpickling wraps the
+    received buffers directly.
+
+    Parameters
+    ----------
+    name : string
+        The name of the mesh.
+    topology_hash : int
+        See :attr:`AITriMeshImporter.topology_hash`.
+    points : (``n_points``, 3) double ndarray
+    trilist : (``n_tris``, 3) unsigned int ndarray
+    tcoords : (``n_points``, 2) double ndarray or ``None``
+    colour_per_vertex : (``n_points``, 3) double ndarray or ``None``
+    """
+    __slots__ = ('name', 'topology_hash', '_normals') + RESULT_ARRAYS
+
+    def __init__(self, name, topology_hash, points, trilist, tcoords=None,
+                 colour_per_vertex=None):
+        set_ = super(MeshResult, self).__setattr__
+        set_('name', name)
+        set_('topology_hash', topology_hash)
+        set_('points', _read_only(points))
+        set_('trilist', _read_only(trilist))
+        set_('tcoords', _read_only(tcoords))
+        set_('colour_per_vertex', _read_only(colour_per_vertex))
+        set_('_normals', {})
+
+    @classmethod
+    def from_mesh(cls, mesh):
+        r"""
+        Extract the arrays of an imported mesh.
+
+        Parameters
+        ----------
+        mesh : :class:`AITriMeshImporter`
+            The mesh to extract.
+
+        Returns
+        -------
+        result : :class:`MeshResult`
+            The extracted mesh.
+        """
+        return cls(mesh.name, mesh.topology_hash, mesh.points, mesh.trilist,
+                   mesh.tcoords, mesh.colour_per_vertex)
+
+    @property
+    def n_points(self):
+        r"""
+        Number of points in the mesh.
+
+        :type: int
+        """
+        return self.points.shape[0]
+
+    @property
+    def n_tris(self):
+        r"""
+        Number of triangles in the triangle list.
+
+        :type: int
+        """
+        return self.trilist.shape[0]
+
+    def face_normals(self, dtype=np.float64):
+        r"""
+        The unit normal of each triangle, computed natively and cached. See
+        :meth:`AITriMeshImporter.face_normals`.
+
+        Parameters
+        ----------
+        dtype : float32 or float64, optional
+            The type of the normals.
+
+        Returns
+        -------
+        normals : (``n_tris``, 3) c-contiguous read-only ndarray
+            The face normals.
+        """
+        return _cached_normals(self._normals, lambda: self.points,
+                               lambda: self.trilist, None, dtype)
+
+    def vertex_normals(self, weighting='area', dtype=np.float64):
+        r"""
+        The unit normal of each point, computed natively and cached. See
+        :meth:`AITriMeshImporter.vertex_normals`.
+
+        Parameters
+        ----------
+        weighting : {'area', 'angle', 'uniform'}, optional
+            How the triangles around a point are weighted.
+        dtype : float32 or float64, optional
+            The type of the normals.
+
+        Returns
+        -------
+        normals : (``n_points``, 3) c-contiguous read-only ndarray
+            The vertex normals.
+        """
+        return _cached_normals(self._normals, lambda: self.points,
+                               lambda: self.trilist, weighting, dtype)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('MeshResult is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError('MeshResult is immutable')
+
+    def __reduce_ex__(self, protocol):
+        arrays = [getattr(self, field) for field in RESULT_ARRAYS]
+        if protocol < 5 or PickleBuffer is None:
+            return MeshResult, (self.name, self.topology_hash) + tuple(arrays)
+        return _rebuild_result, (self.name, self.topology_hash) + tuple(
+            (PickleBuffer(a), a.dtype.str, a.shape) if a is not None else None
+            for a in arrays)
+
+    def __repr__(self):
+        return 'MeshResult({!r}, n_points={}, n_tris={})'.format(
+            self.name, self.n_points, self.n_tris)
+
+
+def importer_for(source, hint='', mesh_filter=None):
+    r"""
+    Create an importer for a path, or for the contents of a file.
+
+    Parameters
+    ----------
+    source : string, path-like or bytes-like
+        A file path, or (as ``bytes``, ``bytearray`` or ``memoryview``) the
+        contents of a file. On Python 2, ``str`` is a path.
+    hint : string, optional
+        The file extension, used to pick a loader for contents.
+    mesh_filter : callable, optional
+        Passed to :class:`AIImporter`.
+
+    Returns
+    -------
+    importer : :class:`AIImporter`
+        The importer, before :meth:`AIImporter.build_scene`.
+    """
+    if isinstance(source, (bytearray, memoryview)) or (
+            isinstance(source, bytes) and not isinstance(source, str)):
+        return AIImporter.from_memory(source, hint=hint,
+                                      mesh_filter=mesh_filter)
+    if hasattr(os, 'fspath'):
+        source = os.fspath(source)
+    return AIImporter(_encode_path(source), mesh_filter=mesh_filter)
+
+
+def extract_results(importer):
+    r"""
+    Build the scene of an importer and extract each triangle mesh.
+
+    Parameters
+    ----------
+    importer : :class:`AIImporter`
+        The importer to run.
+
+    Returns
+    -------
+    meshes : list of :class:`MeshResult`
+        One result per triangle mesh.
+    """
+    importer.build_scene()
+    return [MeshResult.from_mesh(mesh) for mesh in importer.meshes]
+
+
+def load_meshes(source, hint='', mesh_filter=None):
+    r"""
+    Import every triangle mesh of a file (or of a file's contents).
+
+    Parameters
+    ----------
+    source : string, path-like or bytes-like
+        See :func:`importer_for`.
+    hint : string, optional
+        The file extension, used to pick a loader for contents.
+    mesh_filter : callable, optional
+        Passed to :class:`AIImporter`.
+
+    Returns
+    -------
+    meshes : list of :class:`MeshResult`
+        One result per triangle mesh.
+    """
+    return extract_results(importer_for(source, hint=hint,
+                                        mesh_filter=mesh_filter))
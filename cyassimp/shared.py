@@ -0,0 +1,283 @@
+import sys
+import multiprocessing
+
+import numpy as np
+
+from .cyassimpwrapper import AIImporter, _encode_path
+
+# the mesh arrays transported through shared memory
+SHARED_FIELDS = ('points', 'trilist', 'tcoords', 'colour_per_vertex')
+# arrays are placed in the block at offsets aligned to this many bytes
+_ALIGNMENT = 64
+
+
+def _shared_memory():
+    # Blocks are handed from a worker, which closes its handle on return, to
+    # the parent, which attaches later. On Windows a block is destroyed as
+    # soon as its last handle closes, so it would be gone by then.
+    if sys.platform == 'win32':
+        raise NotImplementedError('Shared memory transport is not supported '
+                                  'on Windows')
+    try:
+        from multiprocessing import shared_memory
+    except ImportError:
+        raise ImportError('Shared memory transport requires Python 3.8 or '
+                          'newer')
+    return shared_memory
+
+
+def _create_untracked(size):
+    # The block is created in a worker but owned by whichever process
+    # attaches to it, so the worker must not have it cleaned up on exit.
+    shared_memory = _shared_memory()
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(create=True, size=size,
+                                          track=False)
+    shm = shared_memory.SharedMemory(create=True, size=size)
+    from multiprocessing import resource_tracker
+    resource_tracker.unregister(shm._name, 'shared_memory')
+    return shm
+
+
+def _field_specs(mesh):
+    # field -> (shape, dtype) or None if not present, from the counts alone
+    n_points = mesh.n_points
+    f8 = np.dtype(np.float64)
+    return {'points': ((n_points, 3), f8),
+            'trilist': ((mesh.n_tris, 3), np.dtype(np.uint32)),
+            'tcoords': ((n_points, 2), f8) if mesh.n_tcoord_sets else None,
+            'colour_per_vertex': (((n_points, 3), f8) if mesh.n_colour_sets
+                                  else None)}
+
+
+class SharedMeshHandle(object):
+    r"""
+    A lightweight, picklable reference to a mesh whose arrays live in a
+    shared memory block. Returned by :func:`mesh_to_shared` and
+    :func:`load_shared` - call :meth:`attach` to get at the arrays.
+
+    Until it is attached, nobody owns the block: a handle that is never
+    attached must be freed with :meth:`unlink`. The block outlives the
+    process that created it, which Windows doesn't allow - shared memory
+    transport raises ``NotImplementedError`` there.
+    """
+
+    def __init__(self, block_name, name, fields):
+        self.block_name = block_name
+        self.name = name
+        # field -> (offset, shape, dtype str) or None if not present
+        self.fields = fields
+
+    def attach(self):
+        r"""
+        Map the shared block into this process without copying.
+
+        Returns
+        -------
+        mesh : :class:`SharedMesh`
+            The mesh, which now owns the block.
+        """
+        return SharedMesh(self)
+
+    def unlink(self):
+        r"""
+        Free the shared block without attaching to it.
+        """
+        self.attach().release()
+
+    def __repr__(self):
+        return 'SharedMeshHandle({!r}, {!r})'.format(self.block_name,
+                                                    self.name)
+
+
+class SharedMesh(object):
+    r"""
+    The arrays of a mesh (``points``, ``trilist``, ``tcoords`` and
+    ``colour_per_vertex``, the latter two possibly ``None``) as views on to
+    a shared memory block.
+
+    This object owns the block. :meth:`close` unmaps it from this process,
+    :meth:`unlink` frees it - after which no process can attach to it. Used
+    as a context manager, both happen on exit. The arrays must not be used
+    after :meth:`close`.
+    """
+
+    def __init__(self, handle):
+        self.name = handle.name
+        self._shm = _shared_memory().SharedMemory(name=handle.block_name)
+        for field in SHARED_FIELDS:
+            spec = handle.fields.get(field)
+            array = None
+            if spec is not None:
+                offset, shape, dtype = spec
+                array = np.ndarray(shape, dtype=dtype, buffer=self._shm.buf,
+                                   offset=offset)
+            setattr(self, field, array)
+
+    def close(self):
+        r"""
+        Drop the arrays and unmap the block from this process.
+        """
+        if self._shm is not None:
+            for field in SHARED_FIELDS:
+                setattr(self, field, None)
+            self._shm.close()
+
+    def unlink(self):
+        r"""
+        Free the shared block. Other processes that have it mapped keep
+        their mappings until they close them.
+        """
+        if self._shm is not None:
+            self._shm.unlink()
+
+    def release(self):
+        r"""
+        Close and unlink the block.
+        """
+        if self._shm is not None:
+            self.close()
+            self.unlink()
+            self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.release()
+
+
+def mesh_to_shared(mesh):
+    r"""
+    Copy the arrays of an imported mesh out of assimp straight into a new
+    shared memory block, sized from the mesh's counts, so no intermediate
+    arrays are built. For use inside worker processes - return the handle to
+    the parent, which attaches to it.
+
+    Parameters
+    ----------
+    mesh : :class:`AITriMeshImporter`
+        The mesh to share.
+
+    Returns
+    -------
+    handle : :class:`SharedMeshHandle`
+        A picklable handle on the block.
+
+    Raises
+    ------
+    NotImplementedError
+        On Windows, where the block would be destroyed on return.
+    """
+    fields = {}
+    size = 0
+    for field, spec in _field_specs(mesh).items():
+        if spec is None:
+            fields[field] = None
+            continue
+        shape, dtype = spec
+        size += -size % _ALIGNMENT
+        fields[field] = (size, shape, dtype.str)
+        size += int(np.prod(shape)) * dtype.itemsize
+    shm = _create_untracked(max(size, 1))
+    try:
+        # the arrays are copied out of assimp straight in to the block
+        for field, spec in fields.items():
+            if spec is not None:
+                offset, shape, dtype = spec
+                getattr(mesh, '_copy_' + field)(
+                    np.ndarray(shape, dtype=dtype, buffer=shm.buf,
+                               offset=offset))
+        handle = SharedMeshHandle(shm.name, mesh.name, fields)
+    except BaseException:
+        shm.unlink()
+        raise
+    finally:
+        shm.close()
+    return handle
+
+
+def import_to_shared(path, mesh_filter=None):
+    r"""
+    Import a file and copy each of its triangle meshes into shared memory.
+
+    Parameters
+    ----------
+    path : string
+        File path of the mesh.
+    mesh_filter : callable, optional
+        Passed to :class:`AIImporter`. Must be picklable to be used through
+        :func:`load_shared`.
+
+    Returns
+    -------
+    handles : list of :class:`SharedMeshHandle`
+        One handle per triangle mesh.
+
+    Raises
+    ------
+    NotImplementedError
+        On Windows - see :class:`SharedMeshHandle`.
+    """
+    _shared_memory()
+    importer = AIImporter(_encode_path(path), mesh_filter=mesh_filter)
+    importer.build_scene()
+    handles = []
+    try:
+        for mesh in importer.meshes:
+            handles.append(mesh_to_shared(mesh))
+    except BaseException:
+        for handle in handles:
+            handle.unlink()
+        raise
+    return handles
+
+
+def load_shared(paths, processes=None, mesh_filter=None):
+    r"""
+    Import files on a process pool, transporting the results back through
+    shared memory rather than pickling the arrays.
+
+    The caller owns every returned block and should release it, e.g.
+    ``with handle.attach() as mesh: ...``. If any file fails to import, the
+    blocks of the others are freed before the error is raised.
+
+    Parameters
+    ----------
+    paths : list of string
+        File paths of the meshes.
+    processes : int, optional
+        Number of worker processes. Defaults to the number of CPUs.
+    mesh_filter : callable, optional
+        Passed to :class:`AIImporter`. Must be picklable.
+
+    Returns
+    -------
+    handles : list of list of :class:`SharedMeshHandle`
+        The handles of the triangle meshes of each file, in order.
+
+    Raises
+    ------
+    NotImplementedError
+        On Windows - see :class:`SharedMeshHandle`.
+    """
+    _shared_memory()
+    pool = multiprocessing.Pool(processes)
+    try:
+        pending = [pool.apply_async(import_to_shared, (path, mesh_filter))
+                   for path in paths]
+        results, error = [], None
+        for result in pending:
+            try:
+                results.append(result.get())
+            except Exception as e:
+                error = error or e
+    finally:
+        pool.terminate()
+        pool.join()
+    if error is not None:
+        for handles in results:
+            for handle in handles:
+                handle.unlink()
+        raise error
+    return results
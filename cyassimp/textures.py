@@ -0,0 +1,134 @@
+import io
+import os.path as op
+import sys
+from multiprocessing.pool import ThreadPool
+
+import numpy as np
+
+from .cyassimpwrapper import AIImporter, _encode_path
+
+
+def _import_pil():
+    try:
+        from PIL import Image
+    except ImportError:
+        raise ImportError('Decoding textures requires Pillow - install it '
+                          'with `pip install pillow`')
+    return Image
+
+
+def _decode_image(image, downscale):
+    # draft lets JPEG decoders skip straight to a reduced scale, the resize
+    # takes care of the remainder (and of every other format)
+    width, height = image.size
+    size = (max(width // downscale, 1), max(height // downscale, 1))
+    if downscale > 1:
+        image.draft(image.mode, size)
+    if image.mode not in ('L', 'RGB', 'RGBA'):
+        image = image.convert('RGBA')
+    if image.size != size:
+        image = image.resize(size, _import_pil().BOX)
+    return np.asarray(image)
+
+
+def _decode_texture(importer, mesh_dir, path, downscale):
+    embedded = importer.embedded_texture(path)
+    if isinstance(embedded, np.ndarray) and downscale == 1:
+        return embedded
+    Image = _import_pil()
+    if isinstance(embedded, np.ndarray):
+        # uncompressed, but shrunk with the same filter as any other image
+        return _decode_image(Image.fromarray(embedded, 'RGBA'), downscale)
+    if embedded is not None:
+        source = io.BytesIO(embedded)
+    else:
+        source = op.join(mesh_dir, path)
+    with Image.open(source) as image:
+        return _decode_image(image, downscale)
+
+
+def _mesh_arrays(mesh):
+    return {'name': mesh.name,
+            'points': mesh.points,
+            'trilist': mesh.trilist,
+            'tcoords': mesh.tcoords,
+            'colour_per_vertex': mesh.colour_per_vertex,
+            'textures': mesh.textures}
+
+
+def _bake_colours(mesh, arrays, textures):
+    diffuse = mesh.textures.get('diffuse', [])
+    if mesh.n_tcoord_sets and diffuse and diffuse[0] in textures:
+        arrays['baked_colour_per_vertex'] = mesh.sample_texture(
+            textures[diffuse[0]])
+    else:
+        arrays['baked_colour_per_vertex'] = None
+
+
+def load_textured(path, texture_types=('diffuse',), downscale=1,
+                  n_threads=None, mesh_filter=None, bake_colours=False):
+    r"""
+    Import the meshes of a file together with their decoded textures.
+
+    As soon as assimp has resolved the materials, every referenced texture
+    (on disk or embedded in the file) is decoded on a thread pool, while the
+    mesh arrays are extracted on the calling thread. Each texture is decoded
+    once, however many meshes use it. Requires Pillow.
+
+    Parameters
+    ----------
+    path : string
+        File path of the mesh.
+    texture_types : tuple of string, optional
+        The texture types to decode, as named in
+        :attr:`AITriMeshImporter.textures`.
+    downscale : int, optional
+        Integer factor to shrink every texture by while decoding.
+    n_threads : int, optional
+        Number of textures to decode concurrently. Defaults to the number of
+        CPUs.
+    mesh_filter : callable, optional
+        Passed to :class:`AIImporter`.
+    bake_colours : bool, optional
+        If ``True``, also sample each mesh's first diffuse texture at its
+        texture coordinates (see :meth:`AITriMeshImporter.sample_texture`).
+
+    Returns
+    -------
+    meshes : list of dict
+        One dict per triangle mesh with ``name``, ``points``, ``trilist``,
+        ``tcoords``, ``colour_per_vertex`` and ``textures`` (texture type to
+        list of texture paths). With ``bake_colours``, also
+        ``baked_colour_per_vertex`` - an (``n_points``, 3) double array, or
+        ``None`` if the mesh has no tcoords or decoded diffuse texture.
+    textures : dict of string to (h, w, ...) uint8 ndarray
+        The decoded texture for each texture path in ``meshes``.
+    """
+    downscale = int(downscale)
+    if downscale < 1:
+        raise ValueError('downscale must be a positive integer')
+    if isinstance(path, bytes):
+        path = path.decode(sys.getfilesystemencoding())
+    importer = AIImporter(_encode_path(path), mesh_filter=mesh_filter)
+    importer.build_scene()
+    if bake_colours and 'diffuse' not in texture_types:
+        texture_types = tuple(texture_types) + ('diffuse',)
+    texture_paths = set()
+    for mesh in importer.meshes:
+        for texture_type in texture_types:
+            texture_paths.update(mesh.textures.get(texture_type, []))
+    mesh_dir = op.dirname(op.abspath(path))
+    pool = ThreadPool(n_threads)
+    try:
+        pending = {p: pool.apply_async(_decode_texture,
+                                       (importer, mesh_dir, p, downscale))
+                   for p in texture_paths}
+        meshes = [_mesh_arrays(mesh) for mesh in importer.meshes]
+        textures = {p: result.get() for p, result in pending.items()}
+    finally:
+        pool.terminate()
+        pool.join()
+    if bake_colours:
+        for mesh, arrays in zip(importer.meshes, meshes):
+            _bake_colours(mesh, arrays, textures)
+    return meshes, textures
@@ -7,7 +7,11 @@ import versioneer
 
 pyx_sources = [op.join('cyassimp', 'cyassimpwrapper.pyx')]
 cythonized_sources = [op.join('cyassimp', 'cyassimpwrapper.cpp')]
-external_sources = [op.join('cyassimp', 'cpp', 'assimpwrapper.cpp')]
+external_sources = [op.join('cyassimp', 'cpp', 'assimpwrapper.cpp'),
+                    op.join('cyassimp', 'cpp', 'bvh.cpp'),
+                    op.join('cyassimp', 'cpp', 'decimate.cpp'),
+                    op.join('cyassimp', 'cpp', 'normals.cpp'),
+                    op.join('cyassimp', 'cpp', 'fastparse.cpp')]
 
 # kwargs to be provided to distutils
 ext_kwargs = {